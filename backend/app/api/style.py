@@ -17,6 +17,7 @@ from app.services.style_analyzer import (
     analyze_chapter_tone,
     get_vocabulary_list,
     init_ai_vocabulary,
+    invalidate_vocabulary_index,
     batch_replace_words,
     get_chapter_analysis
 )
@@ -280,6 +281,7 @@ async def add_vocabulary(
     db.add(vocab)
     await db.commit()
     await db.refresh(vocab)
+    invalidate_vocabulary_index()
 
     logger.info(f"添加自定义词汇: {vocab.word}")
     return vocab.to_dict()
@@ -307,6 +309,7 @@ async def delete_vocabulary(
 
     await db.delete(vocab)
     await db.commit()
+    invalidate_vocabulary_index()
 
     logger.info(f"删除自定义词汇: {vocab.word}")
     return {"message": "删除成功"}
@@ -595,7 +598,7 @@ async def rewrite_stream(
             # 保存改写记录（如果提供了project_id）
             record_id = None
             if rewrite_data.project_id and accumulated_text:
-                record = await save_rewrite_record(
+                record_id = await save_rewrite_record(
                     db=db,
                     project_id=rewrite_data.project_id,
                     chapter_id=rewrite_data.chapter_id,
@@ -606,7 +609,6 @@ async def rewrite_stream(
                     trigger_issue=rewrite_data.issue,
                     ai_model=user_ai_service.default_model
                 )
-                record_id = record.id
 
             # 发送最终结果
             yield await SSEResponse.send_result({
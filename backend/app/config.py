@@ -65,6 +65,9 @@ class Settings(BaseSettings):
     database_slow_query_threshold: float = 1.0  # 慢查询阈值（秒）
     database_enable_metrics: bool = True  # 启用性能指标收集
     
+    # 文风检测配置
+    tone_analysis_background_save: bool = False  # 章节检测结果在后台任务中保存（默认在请求事务内同步保存；开启后响应更快，但保存结果稍后才可读到）
+    
     # AI服务配置
     openai_api_key: Optional[str] = None
     openai_base_url: Optional[str] = None
@@ -9,6 +9,12 @@ from fastapi import Request, HTTPException
 from app.config import settings
 from app.logger import get_logger
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = get_logger(__name__)
 
 # 创建基类
@@ -24,7 +30,12 @@ from app.models import (
     RegenerationTask, AIVocabulary, ChapterToneAnalysis, ProjectPatternAnalysis, RewriteRecord
 )
 # 导入新功能模型（设定追溯与矛盾检测、章节关系图谱）
-from app.models_new import EntitySnapshot, Conflict, ChapterLink, ThinkingChain
+from app.models_new import EntitySnapshot, Conflict, ChapterLink, ThinkingChain, ChapterContentHash
+
+def _orjson_dumps(value: Any) -> str:
+    """JSON列序列化（orjson，允许非字符串键以兼容标准库json的行为）"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
 
 # 引擎缓存：每个用户一个引擎
 _engine_cache: Dict[str, Any] = {}
@@ -72,6 +83,11 @@ async def get_engine(user_id: str):
                 "future": True,
             }
             
+            # JSON列（检测问题列表、统计数据等）使用 orjson 编解码
+            if ORJSON_AVAILABLE:
+                engine_args["json_serializer"] = _orjson_dumps
+                engine_args["json_deserializer"] = orjson.loads
+            
             if is_sqlite:
                 # SQLite 配置（使用 NullPool，不支持连接池参数）
                 engine_args["connect_args"] = {
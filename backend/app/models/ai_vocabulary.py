@@ -77,6 +77,7 @@ class ChapterToneAnalysis(Base):
     sentence_length_std = Column(Float, nullable=True, comment="句子长度标准差")
 
     # 元数据
+    content_hash = Column(String(64), nullable=True, comment="检测文本MD5哈希 (相同内容不重复写入)")
     detection_version = Column(String(10), default="1.0", comment="检测算法版本")
     created_at = Column(Text, server_default=func.now(), comment="检测时间")
 
@@ -123,6 +124,9 @@ class ProjectPatternAnalysis(Base):
     ngram_analysis = Column(JSON, nullable=True, comment="N-gram叙事结构分析")  # 新增
     suggestions = Column(JSON, nullable=False, comment="改进建议")
 
+    # 内容指纹 (所有章节内容哈希的汇总，用于跳过未变化项目的重复分析)
+    content_fingerprint = Column(String(64), nullable=True, comment="章节内容指纹")
+
     # 元数据
     detection_version = Column(String(10), default="2.0", comment="检测算法版本")
     created_at = Column(Text, server_default=func.now(), comment="检测时间")
@@ -208,9 +212,10 @@ class ChapterPatternCache(Base):
 
     # 内容指纹 (用于检测变化)
     content_hash = Column(String(64), nullable=False, comment="内容MD5哈希")
+    content_version = Column(Integer, nullable=True, comment="缓存对应的章节内容版本号")
 
     # 缓存的分析数据 (JSON)
-    templates = Column(JSON, nullable=False, comment="句子模板列表")
+    templates = Column(JSON, nullable=False, comment="句子模板 (按列存储: {\"text\": [...], \"template\": [...]})")
     sentence_count = Column(Integer, nullable=False, comment="句子数量")
     opening_type = Column(String(20), nullable=True, comment="开场类型")
     emotion_stats = Column(JSON, nullable=True, comment="情感词汇统计")
@@ -230,7 +235,8 @@ class ChapterPatternCache(Base):
             "chapter_id": self.chapter_id,
             "chapter_number": self.chapter_number,
             "content_hash": self.content_hash,
-            "templates": self.templates or [],
+            "content_version": self.content_version,
+            "templates": self.templates or {"text": [], "template": []},
             "sentence_count": self.sentence_count,
             "opening_type": self.opening_type,
             "emotion_stats": self.emotion_stats or {},
@@ -1,5 +1,5 @@
 """章节数据模型"""
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, event, inspect
 from sqlalchemy.sql import func
 from app.database import Base
 import uuid
@@ -14,6 +14,7 @@ class Chapter(Base):
     chapter_number = Column(Integer, nullable=False, comment="章节序号")
     title = Column(String(200), nullable=False, comment="章节标题")
     content = Column(Text, comment="章节内容")
+    content_version = Column(Integer, nullable=False, default=1, server_default="1", comment="内容版本号(内容每次修改时递增)")
     summary = Column(Text, comment="章节摘要")
     word_count = Column(Integer, default=0, comment="字数统计")
     status = Column(String(20), default="draft", comment="章节状态")
@@ -29,4 +30,16 @@ class Chapter(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
     
     def __repr__(self):
-        return f"<Chapter(id={self.id}, chapter_number={self.chapter_number}, title={self.title}, outline_id={self.outline_id})>"
\ No newline at end of file
+        return f"<Chapter(id={self.id}, chapter_number={self.chapter_number}, title={self.title}, outline_id={self.outline_id})>"
+
+
+@event.listens_for(Chapter.content, "set")
+def _bump_content_version(target, value, oldvalue, initiator):
+    """章节内容变化时递增内容版本号 (供分析缓存判断内容是否变化)
+
+    使用 SQL 表达式在 UPDATE 中原子递增，不需要预先加载当前版本号；
+    新建的章节使用列默认值
+    """
+    if value == oldvalue or not inspect(target).persistent:
+        return
+    target.content_version = Chapter.content_version + 1
@@ -1,5 +1,5 @@
 """章节版本历史模型 - 轻量级版本控制"""
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.database import Base
 import uuid
@@ -39,5 +39,9 @@ class ChapterVersion(Base):
     ai_model = Column(String(100), nullable=True, comment="AI模型")
     generation_prompt = Column(Text, nullable=True, comment="生成提示词（可选）")
 
+    __table_args__ = (
+        Index('idx_chapter_version_number', 'chapter_id', 'version_number'),
+    )
+
     def __repr__(self):
         return f"<ChapterVersion(id={self.id}, chapter_id={self.chapter_id}, version={self.version_number}, source={self.source}, title={self.title})>"
@@ -3,10 +3,12 @@ from .entity_snapshot import EntitySnapshot
 from .conflict import Conflict
 from .chapter_link import ChapterLink
 from .thinking_chain import ThinkingChain
+from .chapter_content_hash import ChapterContentHash
 
 __all__ = [
     "EntitySnapshot",      # 实体快照
     "Conflict",             # 矛盾检测
     "ChapterLink",          # 章节关系
     "ThinkingChain",        # 思维链
+    "ChapterContentHash",   # 章节内容哈希
 ]
@@ -0,0 +1,19 @@
+"""章节内容哈希模型 - 记录实体提取时的章节内容哈希，内容未变化的章节不再重复提取"""
+from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ChapterContentHash(Base):
+    """章节内容哈希表 - 每个章节一条，记录最近一次实体提取时的内容哈希"""
+    __tablename__ = "chapter_content_hashes"
+
+    chapter_id = Column(String(36), ForeignKey("chapters.id", ondelete="CASCADE"), primary_key=True, comment="章节ID")
+    project_id = Column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True, comment="项目ID")
+    content_hash = Column(String(32), nullable=False, comment="章节内容 blake2b 哈希（16字节十六进制）")
+    extraction_mode = Column(String(20), nullable=False, comment="提取方式: ai/rule_based（方式变化时需重新提取）")
+
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<ChapterContentHash(chapter_id={self.chapter_id}, hash={self.content_hash})>"
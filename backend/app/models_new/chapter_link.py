@@ -56,6 +56,8 @@ class ChapterLink(Base):
         Index('idx_chapter_relation', 'from_chapter_id', 'to_chapter_id'),  # 一对多关系索引
         Index('idx_link_type_filter', 'link_type'),
         Index('idx_importance_sort', 'importance_score'),
+        # 同一项目内两章之间的同类关系只保留一条，保存时 ON CONFLICT DO NOTHING
+        Index('uq_chapter_link', 'project_id', 'from_chapter_id', 'to_chapter_id', 'link_type', unique=True),
     )
 
     def __repr__(self):
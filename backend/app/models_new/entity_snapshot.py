@@ -48,6 +48,8 @@ class EntitySnapshot(Base):
     __table_args__ = (
         Index('idx_entity_lookup', 'project_id', 'entity_id', 'property_name'),
         Index('idx_confidence_filter', 'confidence'),
+        # 同一章节对同一实体属性只保留一条快照，批量保存时 ON CONFLICT DO NOTHING
+        Index('uq_entity_snapshot_source', 'project_id', 'entity_id', 'property_name', 'source_chapter_id', unique=True),
     )
 
     def __repr__(self):
@@ -2,14 +2,24 @@
 套路化检测服务 - 跨章节分析
 """
 import re
+import sys
+import uuid
+import heapq
+import asyncio
 import hashlib
+from bisect import bisect_left, bisect_right
 from collections import defaultdict, Counter
 from functools import lru_cache
-from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy import select, delete
+from itertools import product
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.chapter import Chapter
 from app.models.ai_vocabulary import ProjectPatternAnalysis, ChapterPatternCache
+from app.utils.keyword_matcher import KeywordMatcher
 from app.logger import get_logger
 
 logger = get_logger(__name__)
@@ -86,6 +96,17 @@ EMOTION_VOCABULARY = {
     }
 }
 
+# 扁平化的 (情感, 表达) 列表，下标即计数数组中的位置
+_EXPR_META: Tuple[Tuple[str, str], ...] = tuple(
+    (emotion, expr)
+    for emotion, config in EMOTION_VOCABULARY.items()
+    for expr in config["expressions"]
+)
+_EXPR_INDEX: Dict[str, int] = {expr: idx for idx, (_, expr) in enumerate(_EXPR_META)}
+
+# 全部情感表达编译为单个匹配器，一次扫描统计所有表达
+_EMOTION_MATCHER = KeywordMatcher(_EXPR_INDEX)
+
 # ============================================================
 # 动词语义归类表 (用于模板抽象化)
 # ============================================================
@@ -134,12 +155,31 @@ OPENING_KEYWORDS = {
 # 工具函数
 # ============================================================
 
+# 句末标点 (可带一个紧随的引号)
+_SENTENCE_END_RE = re.compile(r'[。！？!?]+"?')
+
+
 def split_sentences(text: str) -> List[str]:
-    """将文本分割成句子"""
-    pattern = r'[。！？!?]+"?'
-    sentences = re.split(pattern, text)
-    sentences = [s.strip() for s in sentences if s and len(s.strip()) > 3]
-    return sentences
+    """将文本分割成句子 (过滤去除空白后不超过3个字符的片段)"""
+    return [
+        sentence
+        for part in _SENTENCE_END_RE.split(text)
+        if len(sentence := part.strip()) > 3
+    ]
+
+
+# 每章开头/结尾各多少句视为开场句/结尾句
+EDGE_SENTENCE_COUNT = 3
+
+
+def is_opening_position(position: int) -> bool:
+    """句子位置是否属于章节开场"""
+    return position < EDGE_SENTENCE_COUNT
+
+
+def is_ending_position(position: int, sentence_count: int) -> bool:
+    """句子位置是否属于章节结尾 (句子数不足时不判定结尾)"""
+    return sentence_count > EDGE_SENTENCE_COUNT and position >= sentence_count - EDGE_SENTENCE_COUNT
 
 
 def simple_tokenize(sentence: str) -> List[Tuple[str, str]]:
@@ -493,77 +533,119 @@ def cluster_templates(templates: List[Dict]) -> List[List[Dict]]:
 # N-gram 模式检测 (检测连续句子的叙事结构套路)
 # ============================================================
 
+# 句子类型判定表: 对话标记字符 + 语义标签 -> 类型优先级 (数值越小优先级越高)
+_SENTENCE_TYPES = 'DTEAN'  # Dialogue 对话 / Thought 思维 / Emotion 情感 / Action 动作 / Narrative 叙述
+_DIALOGUE_MARKERS = frozenset(['「', '"', "'", '：'])
+_TYPE_TAG_RANK = {
+    '[言语]': 0,
+    '[思维]': 1,
+    '[情感]': 2, '[表情]': 2,
+    '[视觉]': 3, '[移动]': 3, '[手动]': 3, '[姿态]': 3, '[头动]': 3,
+}
+_TYPE_TAG_RE = re.compile('|'.join(re.escape(tag) for tag in _TYPE_TAG_RANK))
+_NARRATIVE_RANK = len(_SENTENCE_TYPES) - 1
+
+
 def extract_sentence_type(template: str) -> str:
     """从模板提取句子类型标签
 
     将复杂模板简化为类型标签，用于 N-gram 分析
+    优先级: 对话 > 思维 > 情感 > 动作 > 叙述
     """
-    # 检测主要特征
-    has_dialogue = any(marker in template for marker in ['「', '"', "'", '：'])
-    has_action = any(tag in template for tag in ['[视觉]', '[移动]', '[手动]', '[姿态]', '[头动]'])
-    has_emotion = '[情感]' in template or any(tag in template for tag in ['[表情]'])
-    has_speech = '[言语]' in template
-    has_thought = '[思维]' in template
-
-    # 生成类型标签
-    if has_dialogue or has_speech:
-        return 'D'  # Dialogue 对话
-    elif has_thought:
-        return 'T'  # Thought 思维
-    elif has_emotion:
-        return 'E'  # Emotion 情感
-    elif has_action:
-        return 'A'  # Action 动作
-    else:
-        return 'N'  # Narrative 叙述
+    # 对话标记: 一次集合运算代替逐个 in 扫描
+    if not _DIALOGUE_MARKERS.isdisjoint(template):
+        return 'D'
+
+    # 语义标签: 一次正则扫描取最高优先级
+    rank = min(
+        map(_TYPE_TAG_RANK.__getitem__, _TYPE_TAG_RE.findall(template)),
+        default=_NARRATIVE_RANK
+    )
+    return _SENTENCE_TYPES[rank]
+
+
+@lru_cache(maxsize=None)
+def _ngram_pattern_table(n: int) -> Dict[Tuple[str, ...], str]:
+    """N-gram 类型元组 -> 驻留的模式字符串 ('D→A→N')，5^n 个组合一次性生成"""
+    return {
+        combo: sys.intern('→'.join(combo))
+        for combo in product(_SENTENCE_TYPES, repeat=n)
+    }
 
 
-def extract_ngrams(templates: List[Dict], n: int = 2) -> List[Dict]:
-    """提取 N-gram 模式
+def _template_position(template: Dict) -> int:
+    """模板在章节中的句子位置 (排序键)"""
+    return template.get("position", 0)
+
+
+def extract_ngrams(templates: List[Dict], n: int = 2) -> Iterator[Tuple]:
+    """提取 N-gram 模式 (生成器)
+
+    每章模板按句子位置排序后再生成 N-gram；调用方传入的模板通常已有序，
+    此时排序只需一次线性扫描。
 
     Args:
         templates: 按章节和位置排序的模板列表
         n: N-gram 大小 (2 或 3)
 
-    Returns:
-        N-gram 模式列表
+    Yields:
+        (pattern, chapter_id, chapter_number, start_position, sentences) 元组
     """
     if len(templates) < n:
-        return []
+        return
 
-    # 按章节分组
+    # 按章节分组 (保持输入顺序)
     chapters = defaultdict(list)
     for t in templates:
         chapters[t.get("chapter_id")].append(t)
 
-    # 对每章按位置排序
-    for chapter_id in chapters:
-        chapters[chapter_id].sort(key=lambda x: x.get("position", 0))
+    pattern_table = _ngram_pattern_table(n)
 
-    ngrams = []
+    # 句子类型序列缓冲区在章节间复用
+    types = []
 
     for chapter_id, chapter_templates in chapters.items():
         if len(chapter_templates) < n:
             continue
 
+        # 对本章按位置排序 (已有序的输入为 O(n))
+        chapter_templates.sort(key=_template_position)
+
         # 提取句子类型序列
-        types = [extract_sentence_type(t.get("template", "")) for t in chapter_templates]
+        types.clear()
+        types.extend(extract_sentence_type(t.get("template", "")) for t in chapter_templates)
+        chapter_number = chapter_templates[0].get("chapter_number")
+
+        # 生成 N-gram (模式字符串查表获得，已驻留，避免每次 join)
+        type_windows = zip(*(types[k:] for k in range(n)))
+        for i, window in enumerate(type_windows):
+            yield (
+                pattern_table[window],
+                chapter_id,
+                chapter_number,
+                i,
+                tuple(t.get("text", "") for t in chapter_templates[i:i + n])
+            )
 
-        # 生成 N-gram
-        for i in range(len(types) - n + 1):
-            ngram_types = tuple(types[i:i + n])
-            ngram_templates = chapter_templates[i:i + n]
 
-            ngrams.append({
-                "pattern": '→'.join(ngram_types),
-                "types": ngram_types,
-                "chapter_id": chapter_id,
-                "chapter_number": chapter_templates[0].get("chapter_number"),
-                "start_position": i,
-                "sentences": [t.get("text", "") for t in ngram_templates]
-            })
+def _collect_ngram_stats(templates: List[Dict], n: int, max_examples: int = 3) -> Tuple[Counter, Dict[str, List]]:
+    """单次遍历 N-gram，同时统计频率并保留每种模式的前几个实例"""
+    counter = Counter()
+    examples = defaultdict(list)
+
+    for pattern, _, chapter_number, _, sentences in extract_ngrams(templates, n=n):
+        counter[pattern] += 1
+        pattern_examples = examples[pattern]
+        if len(pattern_examples) < max_examples:
+            pattern_examples.append({"chapter": chapter_number, "sentences": list(sentences)})
 
-    return ngrams
+    return counter, examples
+
+
+def _top_frequent(counter: Counter, k: int, min_count: int) -> List[Tuple[str, int]]:
+    """先按最小次数过滤，再取前 k 个高频项 (与 most_common 的并列顺序一致)"""
+    frequent = [item for item in counter.items() if item[1] >= min_count]
+    return heapq.nlargest(k, frequent, key=itemgetter(1))
 
 
 def analyze_ngram_patterns(templates: List[Dict]) -> Dict:
@@ -577,40 +659,31 @@ def analyze_ngram_patterns(templates: List[Dict]) -> Dict:
             "diversity_score": int  # 叙事多样性评分
         }
     """
-    # 提取 2-gram 和 3-gram
-    bigrams = extract_ngrams(templates, n=2)
-    trigrams = extract_ngrams(templates, n=3)
-
-    # 统计模式频率
-    bigram_counter = Counter(ng["pattern"] for ng in bigrams)
-    trigram_counter = Counter(ng["pattern"] for ng in trigrams)
+    # 统计 2-gram 和 3-gram 模式频率
+    bigram_counter, bigram_examples = _collect_ngram_stats(templates, n=2)
+    trigram_counter, trigram_examples = _collect_ngram_stats(templates, n=3)
 
     # 找出高频模式 (出现3次以上)
     repetitive_bigrams = []
-    for pattern, count in bigram_counter.most_common(10):
-        if count >= 3:
-            # 找出所有实例
-            examples = [ng for ng in bigrams if ng["pattern"] == pattern][:3]
-            repetitive_bigrams.append({
-                "pattern": pattern,
-                "count": count,
-                "description": _describe_ngram_pattern(pattern),
-                "examples": [{"chapter": ex["chapter_number"], "sentences": ex["sentences"]} for ex in examples]
-            })
+    for pattern, count in _top_frequent(bigram_counter, 10, min_count=3):
+        repetitive_bigrams.append({
+            "pattern": pattern,
+            "count": count,
+            "description": _describe_ngram_pattern(pattern),
+            "examples": bigram_examples[pattern]
+        })
 
     repetitive_trigrams = []
-    for pattern, count in trigram_counter.most_common(10):
-        if count >= 3:
-            examples = [ng for ng in trigrams if ng["pattern"] == pattern][:3]
-            repetitive_trigrams.append({
-                "pattern": pattern,
-                "count": count,
-                "description": _describe_ngram_pattern(pattern),
-                "examples": [{"chapter": ex["chapter_number"], "sentences": ex["sentences"]} for ex in examples]
-            })
+    for pattern, count in _top_frequent(trigram_counter, 10, min_count=3):
+        repetitive_trigrams.append({
+            "pattern": pattern,
+            "count": count,
+            "description": _describe_ngram_pattern(pattern),
+            "examples": trigram_examples[pattern]
+        })
 
     # 计算叙事多样性评分
-    total_bigrams = len(bigrams)
+    total_bigrams = sum(bigram_counter.values())
     unique_bigrams = len(bigram_counter)
 
     if total_bigrams > 0:
@@ -674,30 +747,73 @@ def analyze_emotion_in_text(text: str) -> Dict[str, List[str]]:
     """分析文本中的情感表达"""
     found = defaultdict(list)
 
-    for emotion, config in EMOTION_VOCABULARY.items():
-        for expr in config["expressions"]:
-            if expr in text:
-                if expr not in found[emotion]:
-                    found[emotion].append(expr)
+    # 遍历扁平化的 (情感, 表达) 列表，表达在词典中唯一，无需去重
+    for emotion, expr in _EXPR_META:
+        if expr in text:
+            found[emotion].append(expr)
 
     return dict(found)
 
 
 def count_emotion_expressions(chapters_content: List[str]) -> Dict[str, Counter]:
     """统计所有章节中的情感表达使用次数"""
-    emotion_counts = {emotion: Counter() for emotion in EMOTION_VOCABULARY.keys()}
+    # 按表达下标计数到定长数组，避免逐次的字典哈希
+    counts = [0] * len(_EXPR_META)
 
-    full_text = '\n'.join(chapters_content)
+    # 逐章扫描并累加，避免拼接出整本书大小的字符串
+    for chapter_text in chapters_content:
+        for expr, count in _EMOTION_MATCHER.count(chapter_text).items():
+            counts[_EXPR_INDEX[expr]] += count
 
-    for emotion, config in EMOTION_VOCABULARY.items():
-        for expr in config["expressions"]:
-            count = full_text.count(expr)
-            if count > 0:
-                emotion_counts[emotion][expr] = count
+    # 只在最后转换为按情感分组的 Counter
+    emotion_counts = {emotion: Counter() for emotion in EMOTION_VOCABULARY.keys()}
+    for (emotion, expr), count in zip(_EXPR_META, counts):
+        if count > 0:
+            emotion_counts[emotion][expr] = count
 
     return emotion_counts
 
 
+def find_repeated_patterns(
+    clusters: List[List[Dict]],
+    sentence_counts: Dict[str, int],
+    min_count: int = 3
+) -> List[Dict]:
+    """从聚类结果中找出重复模式 (按出现次数降序)
+
+    Args:
+        clusters: 模板聚类结果
+        sentence_counts: {chapter_id: 章节句子数}，用于判定结尾句
+        min_count: 最少出现次数
+    """
+    patterns = []
+    for cluster in clusters:
+        if len(cluster) < min_count:
+            continue
+
+        # 单次遍历簇成员: 收集涉及的章节，同时判定是否全部为开场/结尾句
+        chapter_set = set()
+        all_opening = True
+        all_ending = True
+        for c in cluster:
+            chapter_set.add(c["chapter_number"])
+            position = c["position"]
+            all_opening = all_opening and is_opening_position(position)
+            all_ending = all_ending and is_ending_position(position, sentence_counts.get(c["chapter_id"], 0))
+
+        patterns.append({
+            "template": cluster[0]["template"],
+            "count": len(cluster),
+            "examples": [c["text"] for c in cluster[:5]],
+            "chapters": sorted(chapter_set),
+            "is_opening_pattern": all_opening,
+            "is_ending_pattern": all_ending
+        })
+
+    patterns.sort(key=lambda x: x["count"], reverse=True)
+    return patterns
+
+
 # ============================================================
 # 核心分析函数
 # ============================================================
@@ -732,58 +848,95 @@ async def analyze_project_patterns(
             "current_chapters": len(chapters)
         }
 
-    # 2. 提取所有句子并标记来源
-    all_sentences = []
+    # 2. 内容指纹未变化时直接返回已保存的结果 (章节重新编号也会改变指纹，结果中含章节号)
+    content_chapters = [c for c in chapters if c.content]
+    fingerprint = compute_project_fingerprint(
+        [(c.id, c.chapter_number, c.content_version) for c in chapters]
+    )
+
+    saved = await db.execute(
+        select(ProjectPatternAnalysis).where(
+            ProjectPatternAnalysis.project_id == project_id,
+            ProjectPatternAnalysis.content_fingerprint == fingerprint,
+            ProjectPatternAnalysis.detection_version == DETECTION_VERSION
+        )
+    )
+    saved_analysis = saved.scalars().first()
+    if saved_analysis:
+        logger.info(f"项目 {project_id} 章节内容未变化，直接返回已保存的分析结果")
+        return _saved_analysis_result(saved_analysis)
+
+    # 3. 提取所有句子并标记来源 (按内容哈希复用未变化章节的模板)
+    cache_by_id = await _load_chapter_caches(db, [c.id for c in content_chapters])
+
     chapters_content = []
+    sentence_counts = {}
+    reused_count = 0
 
-    for chapter in chapters:
-        if not chapter.content:
-            continue
+    logger.info(f"开始分析项目 {project_id}，共 {len(chapters)} 章")
+    logger.info("[1/6] 开始句子模板化...")
 
+    # 内容未变化的章节直接复用缓存的模板，其余章节收集起来并发重新分析
+    chapter_templates_list = []
+    to_refresh = []  # [(下标, 章节), ...]
+    for chapter in content_chapters:
         chapters_content.append(chapter.content)
-        sentences = split_sentences(chapter.content)
+        cache = cache_by_id.get(chapter.id)
 
-        for i, sent in enumerate(sentences):
-            all_sentences.append({
-                "text": sent,
-                "chapter_id": chapter.id,
-                "chapter_number": chapter.chapter_number,
-                "chapter_title": chapter.title,
-                "position": i,
-                "is_opening": i < 3,
-                "is_ending": i >= len(sentences) - 3 if len(sentences) > 3 else False
-            })
+        if is_chapter_cache_valid(cache, chapter):
+            chapter_templates_list.append(cache.templates)
+            reused_count += 1
+        else:
+            to_refresh.append((len(chapter_templates_list), chapter))
+            chapter_templates_list.append(None)
+
+    if to_refresh:
+        analyses = await analyze_chapters_concurrently([chapter for _, chapter in to_refresh])
+        for (slot, _), analysis in zip(to_refresh, analyses):
+            chapter_templates_list[slot] = analysis["templates"]
+        await _upsert_chapter_caches(
+            db,
+            [(chapter, analysis) for (_, chapter), analysis in zip(to_refresh, analyses)],
+            cache_by_id
+        )
 
-    if not all_sentences:
+    for chapter, chapter_templates in zip(content_chapters, chapter_templates_list):
+        sentence_counts[chapter.id] = len(chapter_templates["text"])
+
+    # 总句数已知，按长度预分配后逐个填入
+    templates = [None] * sum(sentence_counts.values())
+    idx = 0
+
+    for chapter, chapter_templates in zip(content_chapters, chapter_templates_list):
+        chapter_id = chapter.id
+        chapter_number = chapter.chapter_number
+        chapter_title = chapter.title
+        for position, text, template in iter_templates(chapter_templates):
+            templates[idx] = {
+                "text": text,
+                "template": template,
+                "position": position,
+                "chapter_id": chapter_id,
+                "chapter_number": chapter_number,
+                "chapter_title": chapter_title
+            }
+            idx += 1
+
+    if not templates:
         return {
             "status": "no_content",
             "message": "章节内容为空"
         }
 
-    # 3. 句子模板化 (使用批量提取 + 缓存)
-    logger.info(f"开始分析项目 {project_id}，共 {len(chapters)} 章，{len(all_sentences)} 句")
-    logger.info("[1/6] 开始句子模板化...")
-
-    # 提取所有句子文本
-    sentence_texts = [sent["text"] for sent in all_sentences]
-
-    # 批量提取模板 (利用缓存加速)
-    template_strs = extract_templates_batch(sentence_texts)
-
-    # 构建模板列表
-    templates = []
-    for i, (sent, template) in enumerate(zip(all_sentences, template_strs)):
-        templates.append({
-            **sent,
-            "template": template
-        })
-        # 每处理 1000 句输出一次进度
-        if (i + 1) % 1000 == 0:
-            logger.info(f"[1/6] 模板化进度: {i + 1}/{len(all_sentences)}")
+    # 模板与句子共用同一批记录 (开场分析只读取 text/position/chapter_number)
+    all_sentences = templates
 
     # 输出缓存统计
     cache_info = get_template_cache_info()
-    logger.info(f"[1/6] 模板化完成，共 {len(templates)} 个模板 (缓存命中率: {cache_info['hit_rate']:.1%})")
+    logger.info(
+        f"[1/6] 模板化完成，共 {len(templates)} 个模板，复用 {reused_count}/{len(content_chapters)} 章 "
+        f"(缓存命中率: {cache_info['hit_rate']:.1%})"
+    )
 
     # 4. 聚类相似模板
     logger.info("[2/6] 开始模板聚类...")
@@ -791,37 +944,20 @@ async def analyze_project_patterns(
     logger.info(f"[2/6] 聚类完成，共 {len(clusters)} 个簇")
 
     # 5. 找出重复模式（出现3次以上）
-    patterns = []
-    for cluster in clusters:
-        if len(cluster) >= 3:
-            # 获取涉及的章节
-            chapter_numbers = list(set(c["chapter_number"] for c in cluster))
-            chapter_numbers.sort()
-
-            patterns.append({
-                "template": cluster[0]["template"],
-                "count": len(cluster),
-                "examples": [c["text"] for c in cluster[:5]],
-                "chapters": chapter_numbers,
-                "is_opening_pattern": all(c["is_opening"] for c in cluster),
-                "is_ending_pattern": all(c["is_ending"] for c in cluster)
-            })
+    patterns = find_repeated_patterns(clusters, sentence_counts)
 
-    # 按出现次数排序
-    patterns.sort(key=lambda x: x["count"], reverse=True)
     logger.info(f"[3/6] 发现 {len(patterns)} 个重复模式")
 
-    # 6. 分析开场模式
+    # 6-8. 开场模式 / 情感词汇多样性 / N-gram 叙事结构 三项分析互相独立且只读输入，
+    # 放到线程中并发执行，避免 CPU 密集计算阻塞事件循环
     logger.info("[4/6] 分析开场模式...")
-    opening_analysis = analyze_openings(all_sentences, len(chapters))
-
-    # 7. 分析情感词汇多样性
     logger.info("[5/6] 分析情感词汇多样性...")
-    emotion_diversity = analyze_emotion_diversity(chapters_content)
-
-    # 8. N-gram 叙事结构分析 (新增)
     logger.info("[6/6] N-gram 叙事结构分析...")
-    ngram_analysis = analyze_ngram_patterns(templates)
+    opening_analysis, emotion_diversity, ngram_analysis = await asyncio.gather(
+        asyncio.to_thread(analyze_openings, all_sentences, len(chapters)),
+        asyncio.to_thread(analyze_emotion_diversity, chapters_content),
+        asyncio.to_thread(analyze_ngram_patterns, templates)
+    )
 
     # 9. 计算套路化评分 (传入 N-gram 分析结果)
     score = calculate_pattern_score(
@@ -850,7 +986,7 @@ async def analyze_project_patterns(
     }
 
     # 12. 保存分析结果
-    await save_pattern_analysis(db, project_id, analysis_result)
+    await save_pattern_analysis(db, project_id, analysis_result, content_fingerprint=fingerprint)
     await db.commit()
 
     logger.info(f"项目 {project_id} 分析完成: score={score}, patterns={len(patterns)}")
@@ -990,6 +1126,15 @@ def analyze_emotion_diversity(chapters_content: List[str]) -> Dict:
     }
 
 
+# 评分扣分档位表: 阈值升序排列，档位下标由 bisect 一次求出
+# "大于阈值" 类使用 bisect_left，"小于阈值" 类使用 bisect_right
+_PATTERN_RATIO_TIERS = ((0.2, 0.3, 0.5), (1, 2, 3, 5))       # 重复比例 > 阈值
+_EMOTION_SCORE_TIERS = ((40, 60, 80), (20, 12, 6, 0))        # 情感多样性 < 阈值
+_NGRAM_DIVERSITY_TIERS = ((30, 50, 70), (15, 10, 5, 0))      # 叙事多样性 < 阈值
+_BIGRAM_COUNT_TIERS = ((1, 3, 5), (0, 2, 5, 8))              # 高频 bigram 数 > 阈值
+_TRIGRAM_COUNT_TIERS = ((1, 3), (0, 3, 7))                   # 高频 trigram 数 > 阈值
+
+
 def calculate_pattern_score(
     patterns: List[Dict],
     opening_analysis: Dict,
@@ -1008,17 +1153,12 @@ def calculate_pattern_score(
     score = 100
 
     # 1. 句式重复扣分 (最多扣30分)
-    pattern_penalty = 0
-    for pattern in patterns[:10]:
-        repeat_ratio = pattern["count"] / max(chapter_count, 1)
-        if repeat_ratio > 0.5:
-            pattern_penalty += 5
-        elif repeat_ratio > 0.3:
-            pattern_penalty += 3
-        elif repeat_ratio > 0.2:
-            pattern_penalty += 2
-        else:
-            pattern_penalty += 1
+    ratio_thresholds, ratio_penalties = _PATTERN_RATIO_TIERS
+    divisor = max(chapter_count, 1)
+    pattern_penalty = sum(
+        ratio_penalties[bisect_left(ratio_thresholds, pattern["count"] / divisor)]
+        for pattern in patterns[:10]
+    )
     score -= min(30, pattern_penalty)
 
     # 2. 开场单一扣分 (最多扣20分)
@@ -1033,12 +1173,8 @@ def calculate_pattern_score(
 
     # 3. 情感词汇单一扣分 (最多扣20分)
     emotion_score = emotion_diversity.get("diversity_score", 100)
-    if emotion_score < 40:
-        score -= 20
-    elif emotion_score < 60:
-        score -= 12
-    elif emotion_score < 80:
-        score -= 6
+    thresholds, penalties = _EMOTION_SCORE_TIERS
+    score -= penalties[bisect_right(thresholds, emotion_score)]
 
     # 4. N-gram 叙事结构扣分 (最多扣30分)
     if ngram_analysis:
@@ -1047,25 +1183,15 @@ def calculate_pattern_score(
         trigram_count = len(ngram_analysis.get("trigram_patterns", []))
 
         # 低多样性扣分
-        if ngram_diversity < 30:
-            score -= 15
-        elif ngram_diversity < 50:
-            score -= 10
-        elif ngram_diversity < 70:
-            score -= 5
+        thresholds, penalties = _NGRAM_DIVERSITY_TIERS
+        score -= penalties[bisect_right(thresholds, ngram_diversity)]
 
         # 高频重复模式扣分
-        if bigram_count > 5:
-            score -= 8
-        elif bigram_count > 3:
-            score -= 5
-        elif bigram_count > 1:
-            score -= 2
-
-        if trigram_count > 3:
-            score -= 7
-        elif trigram_count > 1:
-            score -= 3
+        thresholds, penalties = _BIGRAM_COUNT_TIERS
+        score -= penalties[bisect_left(thresholds, bigram_count)]
+
+        thresholds, penalties = _TRIGRAM_COUNT_TIERS
+        score -= penalties[bisect_left(thresholds, trigram_count)]
 
     return max(0, min(100, score))
 
@@ -1132,8 +1258,46 @@ def generate_pattern_suggestions(
     return suggestions
 
 
-async def save_pattern_analysis(db: AsyncSession, project_id: str, result: Dict):
-    """保存分析结果"""
+# 项目级分析结果版本 (与 ProjectPatternAnalysis.detection_version 对应)
+DETECTION_VERSION = "2.0"
+
+
+# analyze_project_patterns 返回结果中的分析字段 (不含 status)
+_ANALYSIS_RESULT_FIELDS = (
+    "score", "level", "chapters_analyzed", "patterns_found", "top_patterns",
+    "opening_analysis", "emotion_diversity", "ngram_analysis", "suggestions"
+)
+
+
+def compute_project_fingerprint(chapter_versions: List[Tuple[str, int, int]]) -> str:
+    """根据 [(chapter_id, chapter_number, content_version), ...] 计算项目内容指纹
+
+    章节号也计入指纹：章节重新编号而内容不变时，结果中的章节号同样需要更新。
+    章节分析算法版本也计入指纹，算法升级后旧结果自动失效
+    """
+    digest = hashlib.md5(ANALYSIS_VERSION.encode('utf-8'))
+    for chapter_id, chapter_number, content_version in chapter_versions:
+        digest.update(f"|{chapter_id}#{chapter_number}:{content_version}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _saved_analysis_result(analysis: ProjectPatternAnalysis) -> Dict[str, Any]:
+    """将已保存的分析记录还原为与重新分析相同结构的结果 (不含 id、created_at 等记录字段)"""
+    saved = analysis.to_dict()
+    return {"status": "success", **{key: saved[key] for key in _ANALYSIS_RESULT_FIELDS}}
+
+
+async def save_pattern_analysis(
+    db: AsyncSession,
+    project_id: str,
+    result: Dict,
+    content_fingerprint: Optional[str] = None
+):
+    """保存分析结果
+
+    Args:
+        content_fingerprint: 本次分析对应的内容指纹 (None 表示不可用于跳过重复分析)
+    """
     # 查找现有记录
     existing = await db.execute(
         select(ProjectPatternAnalysis).where(ProjectPatternAnalysis.project_id == project_id)
@@ -1151,7 +1315,8 @@ async def save_pattern_analysis(db: AsyncSession, project_id: str, result: Dict)
         analysis.emotion_diversity = result["emotion_diversity"]
         analysis.ngram_analysis = result.get("ngram_analysis")  # 新增
         analysis.suggestions = result["suggestions"]
-        analysis.detection_version = "2.0"  # 更新版本号
+        analysis.content_fingerprint = content_fingerprint
+        analysis.detection_version = DETECTION_VERSION  # 更新版本号
     else:
         # 创建
         analysis = ProjectPatternAnalysis(
@@ -1164,7 +1329,9 @@ async def save_pattern_analysis(db: AsyncSession, project_id: str, result: Dict)
             opening_analysis=result["opening_analysis"],
             emotion_diversity=result["emotion_diversity"],
             ngram_analysis=result.get("ngram_analysis"),  # 新增
-            suggestions=result["suggestions"]
+            suggestions=result["suggestions"],
+            content_fingerprint=content_fingerprint,
+            detection_version=DETECTION_VERSION
         )
         db.add(analysis)
 
@@ -1185,7 +1352,7 @@ async def get_pattern_analysis(db: AsyncSession, project_id: str) -> Optional[Di
 # 增量分析功能
 # ============================================================
 
-ANALYSIS_VERSION = "2.0"
+ANALYSIS_VERSION = "2.3"
 
 
 def compute_content_hash(content: str) -> str:
@@ -1193,6 +1360,35 @@ def compute_content_hash(content: str) -> str:
     return hashlib.md5(content.encode('utf-8')).hexdigest()
 
 
+def pack_templates(sentences: List[str], template_strs: List[str]) -> Dict[str, List[str]]:
+    """按列存储章节的句子与模板 (句子位置即列表下标)
+
+    相比逐句存储 {"text", "template", "position"} 字典，JSON 中不再重复键名，
+    缓存体积和解析开销都更小
+    """
+    return {"text": list(sentences), "template": list(template_strs)}
+
+
+def iter_templates(packed: Dict[str, List[str]]) -> Iterator[Tuple[int, str, str]]:
+    """遍历按列存储的章节模板，返回 (位置, 句子, 模板)"""
+    texts = packed["text"]
+    return zip(range(len(texts)), texts, packed["template"])
+
+
+def is_chapter_cache_valid(cache: Optional[ChapterPatternCache], chapter: Chapter) -> bool:
+    """缓存是否仍然有效: 章节内容版本号与分析算法版本均一致
+
+    内容版本号在章节内容修改时自动递增 (见 Chapter.content_version)，
+    只需比较整数，无需对章节全文重新计算哈希
+    """
+    return (
+        cache is not None
+        and cache.analysis_version == ANALYSIS_VERSION
+        and cache.content_version is not None
+        and cache.content_version == chapter.content_version
+    )
+
+
 def analyze_single_chapter(
     chapter_id: str,
     chapter_number: int,
@@ -1214,7 +1410,8 @@ def analyze_single_chapter(
         return {
             "chapter_id": chapter_id,
             "chapter_number": chapter_number,
-            "templates": [],
+            "content_hash": compute_content_hash(""),
+            "templates": pack_templates([], []),
             "sentence_count": 0,
             "opening_type": None,
             "emotion_stats": {}
@@ -1226,42 +1423,30 @@ def analyze_single_chapter(
     # 批量提取模板 (利用缓存)
     template_strs = extract_templates_batch(sentences)
 
-    # 构建模板列表
-    templates = []
-    for i, (sent, template) in enumerate(zip(sentences, template_strs)):
-        templates.append({
-            "text": sent,
-            "template": template,
-            "position": i,
-            "is_opening": i < 3,
-            "is_ending": i >= len(sentences) - 3 if len(sentences) > 3 else False
-        })
+    # 按列存储模板
+    templates = pack_templates(sentences, template_strs)
 
     # 分析开场类型
     opening_type = None
     if sentences:
         opening_type = analyze_opening_type(sentences[0])
 
-    # 统计情感词汇
+    # 统计情感词汇 (单次扫描匹配全部表达，只遍历命中的表达并按词典顺序输出)
+    expr_counts = _EMOTION_MATCHER.count(content)
     emotion_stats = {}
-    for emotion, config in EMOTION_VOCABULARY.items():
-        count = 0
-        found_expressions = []
-        for expr in config["expressions"]:
-            expr_count = content.count(expr)
-            if expr_count > 0:
-                count += expr_count
-                found_expressions.append({"expr": expr, "count": expr_count})
-        if count > 0:
-            emotion_stats[emotion] = {
-                "total": count,
-                "expressions": found_expressions
-            }
+    for expr in sorted(expr_counts, key=_EXPR_INDEX.__getitem__):
+        expr_count = expr_counts[expr]
+        stats = emotion_stats.setdefault(
+            _EXPR_META[_EXPR_INDEX[expr]][0], {"total": 0, "expressions": {}}
+        )
+        stats["total"] += expr_count
+        stats["expressions"][expr] = expr_count
 
     return {
         "chapter_id": chapter_id,
         "chapter_number": chapter_number,
         "chapter_title": title,
+        "content_hash": compute_content_hash(content),
         "templates": templates,
         "sentence_count": len(sentences),
         "opening_type": opening_type,
@@ -1269,10 +1454,176 @@ def analyze_single_chapter(
     }
 
 
+# 并发重新分析章节时每批的章节数 (限制同时驻留内存的分析结果)
+CHAPTER_ANALYSIS_BATCH_SIZE = 16
+
+
+async def analyze_chapters_concurrently(chapters: List[Chapter]) -> List[Dict]:
+    """在线程中按批并发分析多个章节，返回结果与输入顺序一致
+
+    analyze_single_chapter 为纯 CPU 计算，放到线程中执行避免阻塞事件循环
+    """
+    results = []
+    total = len(chapters)
+    for start in range(0, total, CHAPTER_ANALYSIS_BATCH_SIZE):
+        batch = chapters[start:start + CHAPTER_ANALYSIS_BATCH_SIZE]
+        results.extend(await asyncio.gather(*[
+            asyncio.to_thread(
+                analyze_single_chapter,
+                chapter.id,
+                chapter.chapter_number,
+                chapter.content or "",
+                chapter.title
+            )
+            for chapter in batch
+        ]))
+        logger.info(f"章节分析进度: {len(results)}/{total}")
+    return results
+
+
+async def _load_chapter_caches(db: AsyncSession, chapter_ids: List[str]) -> Dict[str, ChapterPatternCache]:
+    """批量加载章节缓存，返回 {chapter_id: cache}"""
+    if not chapter_ids:
+        return {}
+
+    result = await db.execute(
+        select(ChapterPatternCache).where(
+            ChapterPatternCache.chapter_id.in_(chapter_ids)
+        )
+    )
+    return {cache.chapter_id: cache for cache in result.scalars().all()}
+
+
+def _store_chapter_cache(
+    db: AsyncSession,
+    chapter: Chapter,
+    analysis: Dict,
+    cache: Optional[ChapterPatternCache] = None
+) -> ChapterPatternCache:
+    """写入章节缓存 (cache 为已查询到的记录，None 表示新建)
+
+    内容哈希取自分析结果 (在分析线程中随分析一起算出)，不再重复计算
+    """
+    content_hash = analysis["content_hash"]
+    if cache:
+        cache.content_hash = content_hash
+        cache.content_version = chapter.content_version
+        cache.chapter_number = chapter.chapter_number
+        cache.templates = analysis["templates"]
+        cache.sentence_count = analysis["sentence_count"]
+        cache.opening_type = analysis["opening_type"]
+        cache.emotion_stats = analysis["emotion_stats"]
+        cache.analysis_version = ANALYSIS_VERSION
+    else:
+        cache = ChapterPatternCache(
+            project_id=chapter.project_id,
+            chapter_id=chapter.id,
+            chapter_number=chapter.chapter_number,
+            content_hash=content_hash,
+            content_version=chapter.content_version,
+            templates=analysis["templates"],
+            sentence_count=analysis["sentence_count"],
+            opening_type=analysis["opening_type"],
+            emotion_stats=analysis["emotion_stats"],
+            analysis_version=ANALYSIS_VERSION
+        )
+        db.add(cache)
+
+    return cache
+
+
+async def _get_chapter_cache(
+    db: AsyncSession,
+    chapter_id: str,
+    cache_by_id: Optional[Dict[str, ChapterPatternCache]] = None
+) -> Optional[ChapterPatternCache]:
+    """获取章节缓存记录 (提供了批量预加载结果时不再查询数据库)"""
+    if cache_by_id is not None:
+        return cache_by_id.get(chapter_id)
+
+    result = await db.execute(
+        select(ChapterPatternCache).where(
+            ChapterPatternCache.chapter_id == chapter_id
+        )
+    )
+    return result.scalars().first()
+
+
+# 批量写入缓存时每条 INSERT 语句包含的行数 (避免超出数据库参数个数上限)
+CACHE_UPSERT_BATCH_SIZE = 200
+
+# 支持 INSERT ... ON CONFLICT DO UPDATE 的方言
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+async def _upsert_chapter_caches(
+    db: AsyncSession,
+    entries: List[Tuple[Chapter, Dict]],
+    cache_by_id: Dict[str, ChapterPatternCache]
+):
+    """批量写入章节缓存
+
+    使用 INSERT ... ON CONFLICT (chapter_id) DO UPDATE 一次写入多行，
+    不支持该语法的数据库退回逐条 ORM 写入
+
+    Args:
+        entries: [(章节, 分析结果), ...]
+        cache_by_id: 已加载的 {chapter_id: cache}，仅用于退回 ORM 写入
+    """
+    if not entries:
+        return
+
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        for chapter, analysis in entries:
+            _store_chapter_cache(db, chapter, analysis, cache_by_id.get(chapter.id))
+        return
+
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "project_id": chapter.project_id,
+            "chapter_id": chapter.id,
+            "chapter_number": chapter.chapter_number,
+            "content_hash": analysis["content_hash"],
+            "content_version": chapter.content_version,
+            "templates": analysis["templates"],
+            "sentence_count": analysis["sentence_count"],
+            "opening_type": analysis["opening_type"],
+            "emotion_stats": analysis["emotion_stats"],
+            "analysis_version": ANALYSIS_VERSION
+        }
+        for chapter, analysis in entries
+    ]
+
+    for start in range(0, len(rows), CACHE_UPSERT_BATCH_SIZE):
+        stmt = dialect_insert(ChapterPatternCache).values(rows[start:start + CACHE_UPSERT_BATCH_SIZE])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChapterPatternCache.chapter_id],
+            set_={
+                "chapter_number": excluded.chapter_number,
+                "content_hash": excluded.content_hash,
+                "content_version": excluded.content_version,
+                "templates": excluded.templates,
+                "sentence_count": excluded.sentence_count,
+                "opening_type": excluded.opening_type,
+                "emotion_stats": excluded.emotion_stats,
+                "analysis_version": excluded.analysis_version,
+                "updated_at": func.now()
+            }
+        )
+        await db.execute(stmt)
+
+
 async def get_or_create_chapter_cache(
     db: AsyncSession,
     chapter: Chapter,
-    force_refresh: bool = False
+    force_refresh: bool = False,
+    cache_by_id: Optional[Dict[str, ChapterPatternCache]] = None
 ) -> Dict:
     """获取或创建章节分析缓存
 
@@ -1280,24 +1631,19 @@ async def get_or_create_chapter_cache(
         db: 数据库会话
         chapter: 章节对象
         force_refresh: 是否强制刷新
+        cache_by_id: 批量预加载的 {chapter_id: cache}，提供时不再逐条查询
 
     Returns:
         章节分析结果
     """
     content = chapter.content or ""
-    content_hash = compute_content_hash(content)
 
-    # 查询现有缓存
-    if not force_refresh:
-        result = await db.execute(
-            select(ChapterPatternCache).where(
-                ChapterPatternCache.chapter_id == chapter.id
-            )
-        )
-        cache = result.scalars().first()
+    # 查询现有缓存 (强制刷新时也需要它来决定更新还是新建)
+    cache = await _get_chapter_cache(db, chapter.id, cache_by_id)
 
-        # 缓存有效：哈希匹配且版本一致
-        if cache and cache.content_hash == content_hash and cache.analysis_version == ANALYSIS_VERSION:
+    if not force_refresh:
+        # 缓存有效：内容版本与算法版本一致
+        if is_chapter_cache_valid(cache, chapter):
             logger.debug(f"使用缓存: 章节 {chapter.chapter_number}")
             return {
                 "chapter_id": chapter.id,
@@ -1318,37 +1664,69 @@ async def get_or_create_chapter_cache(
         chapter.title
     )
 
-    # 更新或创建缓存
-    result = await db.execute(
-        select(ChapterPatternCache).where(
-            ChapterPatternCache.chapter_id == chapter.id
-        )
-    )
-    cache = result.scalars().first()
+    # 更新或创建缓存 (复用上面查到的记录，不再重复查询)
+    _store_chapter_cache(db, chapter, analysis, cache)
 
-    if cache:
-        cache.content_hash = content_hash
-        cache.chapter_number = chapter.chapter_number
-        cache.templates = analysis["templates"]
-        cache.sentence_count = analysis["sentence_count"]
-        cache.opening_type = analysis["opening_type"]
-        cache.emotion_stats = analysis["emotion_stats"]
-        cache.analysis_version = ANALYSIS_VERSION
-    else:
-        cache = ChapterPatternCache(
-            project_id=chapter.project_id,
-            chapter_id=chapter.id,
-            chapter_number=chapter.chapter_number,
-            content_hash=content_hash,
-            templates=analysis["templates"],
-            sentence_count=analysis["sentence_count"],
-            opening_type=analysis["opening_type"],
-            emotion_stats=analysis["emotion_stats"],
-            analysis_version=ANALYSIS_VERSION
+    return analysis
+
+
+CHAPTER_STREAM_BATCH_SIZE = 32
+
+
+async def _collect_chapter_analyses(
+    db: AsyncSession,
+    chapters: List[Chapter],
+    chapter_analyses: List[Dict],
+    force_refresh: bool = False
+) -> Tuple[int, int]:
+    """处理一批章节：命中缓存的直接复用，其余在线程中并发分析并写回缓存
+
+    结果按章节顺序追加到 chapter_analyses
+
+    Returns:
+        (缓存命中数, 重新分析数)
+    """
+    cached_count = 0
+    cache_by_id = await _load_chapter_caches(db, [c.id for c in chapters if c.content])
+
+    to_refresh = []  # [(下标, 章节), ...]
+    for chapter in chapters:
+        if not chapter.content:
+            continue
+
+        # 检查是否需要刷新
+        if not force_refresh:
+            cache = cache_by_id.get(chapter.id)
+
+            if is_chapter_cache_valid(cache, chapter):
+                # 使用缓存
+                chapter_analyses.append({
+                    "chapter_id": chapter.id,
+                    "chapter_number": chapter.chapter_number,
+                    "chapter_title": chapter.title,
+                    "templates": cache.templates,
+                    "sentence_count": cache.sentence_count,
+                    "opening_type": cache.opening_type,
+                    "emotion_stats": cache.emotion_stats or {}
+                })
+                cached_count += 1
+                continue
+
+        # 需要重新分析，先占位保持章节顺序
+        to_refresh.append((len(chapter_analyses), chapter))
+        chapter_analyses.append(None)
+
+    if to_refresh:
+        analyses = await analyze_chapters_concurrently([chapter for _, chapter in to_refresh])
+        for (slot, _), analysis in zip(to_refresh, analyses):
+            chapter_analyses[slot] = analysis
+        await _upsert_chapter_caches(
+            db,
+            [(chapter, analysis) for (_, chapter), analysis in zip(to_refresh, analyses)],
+            cache_by_id
         )
-        db.add(cache)
 
-    return analysis
+    return cached_count, len(to_refresh)
 
 
 async def analyze_project_patterns_incremental(
@@ -1373,65 +1751,40 @@ async def analyze_project_patterns_incremental(
     Returns:
         分析结果
     """
-    # 1. 获取所有章节
+    # 1. 统计章节数 (章节正文随后分批流式读取，不一次性载入内存)
     result = await db.execute(
-        select(Chapter)
-        .where(Chapter.project_id == project_id)
-        .order_by(Chapter.chapter_number)
+        select(func.count(Chapter.id)).where(Chapter.project_id == project_id)
     )
-    chapters = result.scalars().all()
+    chapter_total = result.scalar() or 0
 
-    if len(chapters) < min_chapters:
+    if chapter_total < min_chapters:
         return {
             "status": "insufficient_data",
             "message": f"需要至少{min_chapters}个章节才能进行套路化分析",
-            "current_chapters": len(chapters)
+            "current_chapters": chapter_total
         }
 
-    logger.info(f"开始增量分析项目 {project_id}，共 {len(chapters)} 章")
+    logger.info(f"开始增量分析项目 {project_id}，共 {chapter_total} 章")
 
-    # 2. 获取或创建每个章节的缓存
+    # 2. 分批读取章节，逐批复用缓存或重新分析
     chapter_analyses = []
     cached_count = 0
     refreshed_count = 0
 
-    for i, chapter in enumerate(chapters):
-        if not chapter.content:
-            continue
-
-        # 检查是否需要刷新
-        content_hash = compute_content_hash(chapter.content)
-
-        if not force_refresh:
-            cache_result = await db.execute(
-                select(ChapterPatternCache).where(
-                    ChapterPatternCache.chapter_id == chapter.id
-                )
+    stream = await db.stream(
+        select(Chapter)
+        .where(Chapter.project_id == project_id)
+        .order_by(Chapter.chapter_number)
+        .execution_options(yield_per=CHAPTER_STREAM_BATCH_SIZE)
+    )
+    # 批量写缓存期间关闭自动 flush，各批的缓存写入最后随结果一起提交
+    with db.no_autoflush:
+        async for chapters in stream.scalars().partitions():
+            cached, refreshed = await _collect_chapter_analyses(
+                db, chapters, chapter_analyses, force_refresh
             )
-            cache = cache_result.scalars().first()
-
-            if cache and cache.content_hash == content_hash and cache.analysis_version == ANALYSIS_VERSION:
-                # 使用缓存
-                chapter_analyses.append({
-                    "chapter_id": chapter.id,
-                    "chapter_number": chapter.chapter_number,
-                    "chapter_title": chapter.title,
-                    "templates": cache.templates,
-                    "sentence_count": cache.sentence_count,
-                    "opening_type": cache.opening_type,
-                    "emotion_stats": cache.emotion_stats or {}
-                })
-                cached_count += 1
-                continue
-
-        # 需要重新分析
-        analysis = await get_or_create_chapter_cache(db, chapter, force_refresh=True)
-        chapter_analyses.append(analysis)
-        refreshed_count += 1
-
-        # 每处理 5 章输出一次进度
-        if refreshed_count % 5 == 0:
-            logger.info(f"[增量分析] 已分析 {refreshed_count} 章")
+            cached_count += cached
+            refreshed_count += refreshed
 
     logger.info(f"[增量分析] 完成: 缓存命中 {cached_count} 章, 重新分析 {refreshed_count} 章")
 
@@ -1442,33 +1795,32 @@ async def analyze_project_patterns_incremental(
         }
 
     # 3. 聚合所有章节的数据
-    all_templates = []
-    chapters_content = []
-    all_sentences = []
+    sentence_counts = {ca["chapter_id"]: ca["sentence_count"] for ca in chapter_analyses}
+    total_sentences = sum(sentence_counts.values())
+
+    # 总句数已知，按长度预分配后逐个填入
+    all_templates = [None] * total_sentences
+    idx = 0
 
     for ca in chapter_analyses:
-        # 收集模板
-        for t in ca["templates"]:
-            all_templates.append({
-                **t,
-                "chapter_id": ca["chapter_id"],
-                "chapter_number": ca["chapter_number"],
-                "chapter_title": ca.get("chapter_title", "")
-            })
+        chapter_id = ca["chapter_id"]
+        chapter_number = ca["chapter_number"]
+        chapter_title = ca.get("chapter_title", "")
+        for position, text, template in iter_templates(ca["templates"]):
+            all_templates[idx] = {
+                "text": text,
+                "template": template,
+                "position": position,
+                "chapter_id": chapter_id,
+                "chapter_number": chapter_number,
+                "chapter_title": chapter_title
+            }
+            idx += 1
 
-        # 收集句子（用于开场分析）
-        for t in ca["templates"]:
-            all_sentences.append({
-                "text": t["text"],
-                "chapter_id": ca["chapter_id"],
-                "chapter_number": ca["chapter_number"],
-                "position": t["position"],
-                "is_opening": t["is_opening"],
-                "is_ending": t["is_ending"]
-            })
+    # 模板与句子共用同一批记录 (开场分析只读取 text/position/chapter_number)
+    all_sentences = all_templates
 
-    total_sentences = sum(ca["sentence_count"] for ca in chapter_analyses)
-    logger.info(f"[增量分析] 聚合完成: {len(chapters)} 章, {total_sentences} 句")
+    logger.info(f"[增量分析] 聚合完成: {chapter_total} 章, {total_sentences} 句")
 
     # 4. 聚类分析
     logger.info("[增量分析] 开始模板聚类...")
@@ -1476,26 +1828,11 @@ async def analyze_project_patterns_incremental(
     logger.info(f"[增量分析] 聚类完成，共 {len(clusters)} 个簇")
 
     # 5. 找出重复模式
-    patterns = []
-    for cluster in clusters:
-        if len(cluster) >= 3:
-            chapter_numbers = list(set(c["chapter_number"] for c in cluster))
-            chapter_numbers.sort()
-
-            patterns.append({
-                "template": cluster[0]["template"],
-                "count": len(cluster),
-                "examples": [c["text"] for c in cluster[:5]],
-                "chapters": chapter_numbers,
-                "is_opening_pattern": all(c["is_opening"] for c in cluster),
-                "is_ending_pattern": all(c["is_ending"] for c in cluster)
-            })
-
-    patterns.sort(key=lambda x: x["count"], reverse=True)
+    patterns = find_repeated_patterns(clusters, sentence_counts)
     logger.info(f"[增量分析] 发现 {len(patterns)} 个重复模式")
 
     # 6. 分析开场模式
-    opening_analysis = analyze_openings(all_sentences, len(chapters))
+    opening_analysis = analyze_openings(all_sentences, chapter_total)
 
     # 7. 聚合情感词汇统计
     emotion_diversity = aggregate_emotion_stats(chapter_analyses)
@@ -1506,7 +1843,7 @@ async def analyze_project_patterns_incremental(
     # 9. 计算评分
     score = calculate_pattern_score(
         patterns, opening_analysis, emotion_diversity,
-        len(chapters), ngram_analysis
+        chapter_total, ngram_analysis
     )
     level = get_pattern_level(score)
 
@@ -1520,7 +1857,7 @@ async def analyze_project_patterns_incremental(
         "status": "success",
         "score": score,
         "level": level,
-        "chapters_analyzed": len(chapters),
+        "chapters_analyzed": chapter_total,
         "patterns_found": len(patterns),
         "top_patterns": patterns[:10],
         "opening_analysis": opening_analysis,
@@ -1548,8 +1885,7 @@ def aggregate_emotion_stats(chapter_analyses: List[Dict]) -> Dict:
 
     for ca in chapter_analyses:
         for emotion, stats in ca.get("emotion_stats", {}).items():
-            for expr_data in stats.get("expressions", []):
-                emotion_counts[emotion][expr_data["expr"]] += expr_data["count"]
+            emotion_counts[emotion].update(stats.get("expressions", {}))
 
     # 使用现有的分析逻辑
     result = {}
@@ -2,11 +2,21 @@
 文风检测服务 - AI腔调检测和套路化分析
 """
 import re
-import statistics
-from typing import List, Dict, Any, Optional
-from sqlalchemy import select, func
-from sqlalchemy.ext.asyncio import AsyncSession
+import copy
+import asyncio
+import hashlib
+import time
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from app.models.ai_vocabulary import AIVocabulary, ChapterToneAnalysis
+from app.utils.keyword_matcher import KeywordMatcher
+from app.config import settings
 from app.logger import get_logger
 
 logger = get_logger(__name__)
@@ -208,19 +218,14 @@ async def init_ai_vocabulary(db: AsyncSession):
             logger.info(f"AI词汇库已存在 {count} 条数据，跳过初始化")
             return count
 
-        # 插入初始数据
-        for vocab_data in INITIAL_VOCABULARY:
-            vocab = AIVocabulary(
-                word=vocab_data["word"],
-                category=vocab_data["category"],
-                severity=vocab_data["severity"],
-                alternatives=vocab_data["alternatives"],
-                description=vocab_data["description"],
-                is_system=1
-            )
-            db.add(vocab)
+        # 插入初始数据 (一条 INSERT 批量写入，不逐条构造 ORM 对象)
+        await db.execute(
+            insert(AIVocabulary),
+            [{**vocab_data, "is_system": 1} for vocab_data in INITIAL_VOCABULARY]
+        )
 
         await db.commit()
+        invalidate_vocabulary_index()
         logger.info(f"成功初始化 {len(INITIAL_VOCABULARY)} 条AI腔调词汇")
         return len(INITIAL_VOCABULARY)
 
@@ -230,6 +235,88 @@ async def init_ai_vocabulary(db: AsyncSession):
         raise
 
 
+# ============================================================
+# 进程内词汇索引 (检测时复用，词汇增删后失效)
+# ============================================================
+
+# entries: 词汇行快照 (Row，脱离会话可直接读取)；matcher/by_word: 对应的匹配器与索引
+# version: 词汇库版本号，每次失效递增，作为检测结果缓存键的一部分
+# token/checked_at: 加载时数据库中的版本标记及最近一次比对时间
+_VOCAB_INDEX: Dict[str, Any] = {
+    "entries": None, "matcher": None, "by_word": {}, "version": 0,
+    "token": None, "checked_at": 0.0,
+}
+
+# 多进程部署时词汇库可能被其他进程修改：每隔若干秒比对一次版本标记，间隔内直接复用
+VOCAB_VERSION_CHECK_INTERVAL = 5.0
+
+# 检测只需要的词汇字段 (不含统计、时间等列)
+_VOCAB_INDEX_COLUMNS = (
+    AIVocabulary.id,
+    AIVocabulary.word,
+    AIVocabulary.category,
+    AIVocabulary.severity,
+    AIVocabulary.alternatives,
+    AIVocabulary.description,
+)
+
+
+def invalidate_vocabulary_index():
+    """词汇库变更后调用，下次检测时重新加载"""
+    _VOCAB_INDEX["entries"] = None
+    _VOCAB_INDEX["version"] += 1
+    _TONE_RESULT_CACHE.clear()
+
+
+async def _fetch_vocabulary_token(db: AsyncSession) -> Tuple[int, Any]:
+    """词汇库版本标记：(词汇数, 最近更新时间)，增删改任一词汇都会使其变化"""
+    result = await db.execute(
+        select(func.count(AIVocabulary.id), func.max(AIVocabulary.updated_at))
+    )
+    return tuple(result.one())
+
+
+async def load_vocabulary_index(db: AsyncSession) -> Dict[str, Any]:
+    """获取进程内缓存的词汇索引，未加载时查询一次数据库 (词汇库为空时先初始化)
+
+    已加载时按 VOCAB_VERSION_CHECK_INTERVAL 间隔用一条聚合查询比对版本标记，
+    标记未变化则不重新读取词汇表。
+    """
+    now = time.monotonic()
+
+    if _VOCAB_INDEX["entries"] is not None:
+        if now - _VOCAB_INDEX["checked_at"] < VOCAB_VERSION_CHECK_INTERVAL:
+            return _VOCAB_INDEX
+
+        token = await _fetch_vocabulary_token(db)
+        _VOCAB_INDEX["checked_at"] = now
+        if token == _VOCAB_INDEX["token"]:
+            return _VOCAB_INDEX
+
+        logger.info("AI词汇库已在其他进程中变更，重新加载词汇索引")
+        invalidate_vocabulary_index()
+
+    # 先取版本标记再读词汇：两者之间若有修改，下次比对时会再次重新加载
+    token = await _fetch_vocabulary_token(db)
+    result = await db.execute(select(*_VOCAB_INDEX_COLUMNS))
+    entries = result.all()
+
+    if not entries:
+        await init_ai_vocabulary(db)
+        token = await _fetch_vocabulary_token(db)
+        result = await db.execute(select(*_VOCAB_INDEX_COLUMNS))
+        entries = result.all()
+
+    matcher, by_word = build_ai_vocab_automaton(entries)
+    _VOCAB_INDEX.update(
+        entries=entries, matcher=matcher, by_word=by_word,
+        token=token, checked_at=now
+    )
+    logger.info(f"AI词汇索引已加载: {len(entries)} 条")
+
+    return _VOCAB_INDEX
+
+
 async def get_vocabulary_list(db: AsyncSession, category: str = None) -> List[Dict]:
     """获取词汇库列表
 
@@ -272,34 +359,86 @@ def split_sentences(text: str) -> List[str]:
     return sentences
 
 
+@lru_cache(maxsize=256)
+def _compile_word_pattern(word: str) -> re.Pattern:
+    """按词汇缓存编译后的字面量正则"""
+    return re.compile(re.escape(word))
+
+
 def find_word_positions(text: str, word: str) -> List[Dict]:
     """查找词汇在文本中的所有位置
 
     Returns:
         位置列表 [{"start": int, "end": int, "context": str}, ...]
     """
-    positions = []
-    start = 0
+    text_len = len(text)
+
+    # 单次 finditer 扫描，上下文取前后各30个字符
+    return [
+        {
+            "start": m.start(),
+            "end": m.end(),
+            "context": text[max(0, m.start() - 30):min(text_len, m.end() + 30)]
+        }
+        for m in _compile_word_pattern(word).finditer(text)
+    ]
+
+
+# 连接词：使用过多时叙述显得生硬。单独用一个匹配器统计，
+# 不与词汇库共用，避免被覆盖它的较长词汇吞掉 (如 "与此同时" 中的 "同时")
+CONNECTORS = ("首先", "其次", "最后", "然后", "接着", "随后", "此外", "另外", "同时")
+_CONNECTOR_MATCHER = KeywordMatcher(CONNECTORS)
+
+
+@lru_cache(maxsize=4)
+def _compile_vocab_matcher(words: Tuple[str, ...]) -> KeywordMatcher:
+    """按词汇集合缓存匹配器，词汇库未变化时跨请求复用"""
+    return KeywordMatcher(words)
 
-    while True:
-        pos = text.find(word, start)
-        if pos == -1:
-            break
 
+def build_ai_vocab_automaton(vocab_rows: Sequence[Any]) -> Tuple[KeywordMatcher, Dict[str, Any]]:
+    """将整个词汇库编译为一个多关键词匹配器
+
+    匹配器只取决于词汇集合，以排序后的词汇元组为键缓存；
+    usage_count 等统计字段的变化不会使缓存失效。
+
+    Args:
+        vocab_rows: 词汇记录列表（需有 word 属性）
+
+    Returns:
+        (匹配器, 词汇 -> 词汇记录)
+    """
+    vocab_by_word = {row.word: row for row in vocab_rows if row.word}
+    words = tuple(sorted(vocab_by_word))
+    return _compile_vocab_matcher(words), vocab_by_word
+
+
+def scan_tone_keywords(
+    text: str,
+    matcher: KeywordMatcher
+) -> Tuple[Dict[str, List[Dict]], Counter]:
+    """扫描文本，收集词汇库命中位置和连接词次数
+
+    词汇库与连接词各用自己的匹配器，重叠只在同一词典内按"最左最长、互不重叠"处理：
+    词汇库中已被较长词汇覆盖的短词不重复计数，但词汇不会遮蔽连接词
+    (如 "与此同时" 中的 "同时" 仍计为一次连接词)。
+
+    Returns:
+        ({词汇: [{"start": int, "end": int, "context": str}, ...]}, 连接词计数)
+    """
+    positions = defaultdict(list)
+    text_len = len(text)
+
+    for start, word in matcher.finditer(text):
+        end = start + len(word)
         # 获取上下文（前后各30个字符）
-        context_start = max(0, pos - 30)
-        context_end = min(len(text), pos + len(word) + 30)
-        context = text[context_start:context_end]
-
-        positions.append({
-            "start": pos,
-            "end": pos + len(word),
-            "context": context
+        positions[word].append({
+            "start": start,
+            "end": end,
+            "context": text[max(0, start - 30):min(text_len, end + 30)]
         })
 
-        start = pos + len(word)
-
-    return positions
+    return positions, _CONNECTOR_MATCHER.count(text)
 
 
 def calculate_sentence_stats(sentences: List[str]) -> Dict:
@@ -313,17 +452,33 @@ def calculate_sentence_stats(sentences: List[str]) -> Dict:
             "max_length": 0
         }
 
-    lengths = [len(s) for s in sentences]
+    n = len(sentences)
+    lengths = np.fromiter(map(len, sentences), dtype=np.int64, count=n)
+
+    # 均值与样本标准差 (ddof=1，与 statistics.stdev 口径一致) 在数组上一次归约完成
+    mean = float(lengths.mean())
+    std_dev = float(lengths.std(ddof=1)) if n > 1 else 0
 
     return {
-        "count": len(sentences),
-        "avg_length": round(statistics.mean(lengths), 1),
-        "std_dev": round(statistics.stdev(lengths), 1) if len(lengths) > 1 else 0,
-        "min_length": min(lengths),
-        "max_length": max(lengths)
+        "count": n,
+        "avg_length": round(mean, 1),
+        "std_dev": round(std_dev, 1) if n > 1 else 0,
+        "min_length": int(lengths.min()),
+        "max_length": int(lengths.max())
     }
 
 
+@lru_cache(maxsize=128)
+def _text_sentence_stats(text: str) -> Tuple[Tuple[str, Any], ...]:
+    """按文本缓存分句与句子统计 (同一章节反复检测时直接命中)"""
+    return tuple(calculate_sentence_stats(split_sentences(text)).items())
+
+
+def get_text_sentence_stats(text: str) -> Dict:
+    """分句并计算句子统计信息，结果按文本缓存"""
+    return dict(_text_sentence_stats(text))
+
+
 def get_level_from_score(score: int) -> str:
     """根据分数获取评级"""
     if score >= 80:
@@ -340,6 +495,20 @@ def get_level_from_score(score: int) -> str:
 # 核心检测逻辑
 # ============================================================
 
+# 严重程度排序 (越小越靠前) 与每次出现的扣分，未知程度按 low 处理
+SEVERITY_RANK = {"high": 0, "medium": 1, "low": 2}
+SEVERITY_PENALTY = {"high": 8, "medium": 4, "low": 2}
+
+# 检测结果缓存：(文本哈希, 词汇库版本) -> (命中的词汇ID, 检测结果)，按最近使用淘汰
+TONE_RESULT_CACHE_SIZE = 256
+_TONE_RESULT_CACHE: "OrderedDict[Tuple[str, int], Tuple[Tuple[str, ...], Dict[str, Any]]]" = OrderedDict()
+
+
+def compute_text_hash(text: str) -> str:
+    """计算文本的MD5哈希 (与章节缓存的 content_hash 一致)"""
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
 async def analyze_chapter_tone(
     db: AsyncSession,
     text: str,
@@ -357,22 +526,36 @@ async def analyze_chapter_tone(
     Returns:
         检测结果
     """
-    # 1. 获取词汇库
-    result = await db.execute(select(AIVocabulary))
-    vocabulary = result.scalars().all()
+    # 1. 获取词汇库 (进程内缓存，命中时无需查询数据库)
+    vocab_index = await load_vocabulary_index(db)
+    vocabulary = vocab_index["entries"]
+
+    # 同一文本在词汇库未变化时结果相同：命中缓存则跳过扫描和统计，仍照常累加词汇使用次数
+    # (返回深拷贝，调用方修改结果不会影响缓存)
+    content_hash = compute_text_hash(text)
+    cache_key = (content_hash, vocab_index["version"])
+    cached = _TONE_RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        _TONE_RESULT_CACHE.move_to_end(cache_key)
+        cached_vocab_ids, cached_result = cached
+        await _increment_vocab_usage(db, cached_vocab_ids)
+        detection_result = copy.deepcopy(cached_result)
+        # 已保存过相同内容的结果时数据库不会重复写入
+        if chapter_id and project_id:
+            await _persist_tone_analysis(db, project_id, chapter_id, detection_result, content_hash, only_if_changed=True)
+        await db.commit()
+        return detection_result
 
-    if not vocabulary:
-        # 如果词汇库为空，先初始化
-        await init_ai_vocabulary(db)
-        result = await db.execute(select(AIVocabulary))
-        vocabulary = result.scalars().all()
+    matcher = vocab_index["matcher"]
 
-    # 2. 词汇匹配检测
+    # 2. 词汇匹配检测（整个词汇库一次扫描）
     issues = []
     matched_vocab_ids = []
 
+    vocab_positions, connector_counts = scan_tone_keywords(text, matcher)
+
     for vocab in vocabulary:
-        positions = find_word_positions(text, vocab.word)
+        positions = vocab_positions.get(vocab.word)
         if positions:
             issues.append({
                 "type": "vocabulary",
@@ -387,17 +570,10 @@ async def analyze_chapter_tone(
             matched_vocab_ids.append(vocab.id)
 
     # 3. 更新词汇使用次数
-    if matched_vocab_ids:
-        for vocab_id in matched_vocab_ids:
-            await db.execute(
-                AIVocabulary.__table__.update()
-                .where(AIVocabulary.id == vocab_id)
-                .values(usage_count=AIVocabulary.usage_count + 1)
-            )
+    await _increment_vocab_usage(db, matched_vocab_ids)
 
     # 4. 句子统计分析
-    sentences = split_sentences(text)
-    sentence_stats = calculate_sentence_stats(sentences)
+    sentence_stats = get_text_sentence_stats(text)
 
     # 检测句子长度均匀性问题
     if sentence_stats["std_dev"] < 8 and sentence_stats["count"] > 5:
@@ -410,16 +586,13 @@ async def analyze_chapter_tone(
             "suggestion": "尝试混合使用长短句，增加文字节奏感"
         })
 
-    # 5. 连接词检测
-    connectors = ["首先", "其次", "最后", "然后", "接着", "随后", "此外", "另外", "同时"]
-    connector_count = 0
-    connector_details = []
-
-    for conn in connectors:
-        count = text.count(conn)
-        if count > 0:
-            connector_count += count
-            connector_details.append({"word": conn, "count": count})
+    # 5. 连接词检测（次数已在 scan_tone_keywords 中统计）
+    connector_count = sum(connector_counts.values())
+    connector_details = [
+        {"word": conn, "count": connector_counts[conn]}
+        for conn in CONNECTORS
+        if connector_counts[conn] > 0
+    ]
 
     word_count = len(text)
     connector_ratio = connector_count / max(word_count, 1)
@@ -440,19 +613,13 @@ async def analyze_chapter_tone(
     score = 100
 
     for issue in issues:
-        if issue["severity"] == "high":
-            score -= issue.get("count", 1) * 8
-        elif issue["severity"] == "medium":
-            score -= issue.get("count", 1) * 4
-        else:
-            score -= issue.get("count", 1) * 2
+        score -= issue.get("count", 1) * SEVERITY_PENALTY.get(issue["severity"], 2)
 
     score = max(0, min(100, score))  # 限制在0-100
     level = get_level_from_score(score)
 
-    # 7. 按严重程度排序问题
-    severity_order = {"high": 0, "medium": 1, "low": 2}
-    issues.sort(key=lambda x: (severity_order.get(x["severity"], 3), -x.get("count", 0)))
+    # 7. 按严重程度排序问题 (排序键每个问题只计算一次)
+    issues.sort(key=lambda x: (SEVERITY_RANK.get(x["severity"], 3), -x.get("count", 0)))
 
     # 8. 构建结果
     detection_result = {
@@ -469,56 +636,163 @@ async def analyze_chapter_tone(
         "summary": _generate_summary(score, issues)
     }
 
-    # 9. 如果提供了章节ID，保存检测结果
+    # 9. 如果提供了章节ID，保存检测结果 (开启 tone_analysis_background_save 时放到后台任务)
     if chapter_id and project_id:
-        await save_tone_analysis(db, project_id, chapter_id, detection_result)
+        await _persist_tone_analysis(db, project_id, chapter_id, detection_result, content_hash)
 
     await db.commit()
 
-    return detection_result
+    _TONE_RESULT_CACHE[cache_key] = (tuple(matched_vocab_ids), detection_result)
+    if len(_TONE_RESULT_CACHE) > TONE_RESULT_CACHE_SIZE:
+        _TONE_RESULT_CACHE.popitem(last=False)
+
+    return copy.deepcopy(detection_result)
+
+
+async def _increment_vocab_usage(db: AsyncSession, vocab_ids: Sequence[str]):
+    """命中词汇的使用次数加一（一条 UPDATE ... WHERE id IN (...) 完成）
+
+    保持 updated_at 不变：使用次数不属于词汇内容变更，不应使其他进程的词汇索引失效
+    """
+    if vocab_ids:
+        await db.execute(
+            AIVocabulary.__table__.update()
+            .where(AIVocabulary.id.in_(vocab_ids))
+            .values(usage_count=AIVocabulary.usage_count + 1, updated_at=AIVocabulary.updated_at)
+        )
+
+
+async def _persist_tone_analysis(
+    db: AsyncSession,
+    project_id: str,
+    chapter_id: str,
+    result: Dict,
+    content_hash: str,
+    only_if_changed: bool = False
+):
+    """按配置在后台任务或当前会话中保存检测结果"""
+    if settings.tone_analysis_background_save:
+        _spawn_background_save(db, project_id, chapter_id, result, content_hash, only_if_changed)
+    else:
+        await save_tone_analysis(db, project_id, chapter_id, result, content_hash, only_if_changed)
+
+
+# 支持 INSERT ... ON CONFLICT 的方言
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
 
 
 async def save_tone_analysis(
     db: AsyncSession,
     project_id: str,
     chapter_id: str,
-    result: Dict
+    result: Dict,
+    content_hash: Optional[str] = None,
+    only_if_changed: bool = False
 ):
     """保存章节检测结果
 
-    如果已存在则更新，否则创建
+    如果已存在则更新，否则创建；支持的数据库上用一条
+    INSERT ... ON CONFLICT (chapter_id) DO UPDATE 完成，无需先查询。
+    only_if_changed 为 True 时，已保存记录的 content_hash 相同则不更新。
     """
-    # 查找现有记录
+    values = {
+        "score": result["score"],
+        "level": result["level"],
+        "issue_count": result["issue_count"],
+        "issues": result["issues"],
+        "word_count": result["stats"]["word_count"],
+        "sentence_count": result["stats"]["sentence_count"],
+        "avg_sentence_length": result["stats"]["avg_sentence_length"],
+        "sentence_length_std": result["stats"]["sentence_length_std"],
+        "content_hash": content_hash
+    }
+
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(ChapterToneAnalysis).values(
+            project_id=project_id,
+            chapter_id=chapter_id,
+            **values
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChapterToneAnalysis.chapter_id],
+            set_={key: stmt.excluded[key] for key in values},
+            where=(
+                ChapterToneAnalysis.content_hash.is_distinct_from(stmt.excluded.content_hash)
+                if only_if_changed else None
+            )
+        )
+        await db.execute(stmt)
+        return
+
+    # 其他数据库：查找现有记录后更新或创建
     existing = await db.execute(
         select(ChapterToneAnalysis).where(ChapterToneAnalysis.chapter_id == chapter_id)
     )
     analysis = existing.scalars().first()
 
     if analysis:
-        # 更新
-        analysis.score = result["score"]
-        analysis.level = result["level"]
-        analysis.issue_count = result["issue_count"]
-        analysis.issues = result["issues"]
-        analysis.word_count = result["stats"]["word_count"]
-        analysis.sentence_count = result["stats"]["sentence_count"]
-        analysis.avg_sentence_length = result["stats"]["avg_sentence_length"]
-        analysis.sentence_length_std = result["stats"]["sentence_length_std"]
+        if only_if_changed and analysis.content_hash == content_hash:
+            return
+        for key, value in values.items():
+            setattr(analysis, key, value)
     else:
-        # 创建
-        analysis = ChapterToneAnalysis(
-            project_id=project_id,
-            chapter_id=chapter_id,
-            score=result["score"],
-            level=result["level"],
-            issue_count=result["issue_count"],
-            issues=result["issues"],
-            word_count=result["stats"]["word_count"],
-            sentence_count=result["stats"]["sentence_count"],
-            avg_sentence_length=result["stats"]["avg_sentence_length"],
-            sentence_length_std=result["stats"]["sentence_length_std"]
+        db.add(ChapterToneAnalysis(project_id=project_id, chapter_id=chapter_id, **values))
+
+
+# 每个章节最近一次的后台保存任务 (同时作为强引用，避免任务在完成前被垃圾回收)
+_chapter_save_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _spawn_background_save(
+    db: AsyncSession,
+    project_id: str,
+    chapter_id: str,
+    result: Dict,
+    content_hash: Optional[str] = None,
+    only_if_changed: bool = False
+):
+    """在后台任务中用独立会话保存检测结果 (不与调用方共用会话)
+
+    同一章节的保存按提交顺序串行执行，先发起的检测结果不会覆盖后发起的
+    """
+    previous = _chapter_save_tasks.get(chapter_id)
+    task = asyncio.create_task(
+        _save_tone_analysis_with_own_session(
+            db.bind, project_id, chapter_id, result, content_hash, only_if_changed, previous
         )
-        db.add(analysis)
+    )
+    _chapter_save_tasks[chapter_id] = task
+
+    def _release(done: asyncio.Task):
+        if _chapter_save_tasks.get(chapter_id) is done:
+            del _chapter_save_tasks[chapter_id]
+
+    task.add_done_callback(_release)
+
+
+async def _save_tone_analysis_with_own_session(
+    bind,
+    project_id: str,
+    chapter_id: str,
+    result: Dict,
+    content_hash: Optional[str],
+    only_if_changed: bool,
+    previous: Optional[asyncio.Task] = None
+):
+    """独立会话中保存检测结果 (等待同章节上一次保存结束后再写入)，失败记录错误日志"""
+    if previous is not None:
+        await asyncio.wait([previous])
+    session_maker = async_sessionmaker(bind, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with session_maker() as session:
+            await save_tone_analysis(session, project_id, chapter_id, result, content_hash, only_if_changed)
+            await session.commit()
+    except Exception as e:
+        logger.error(f"后台保存文风检测结果失败: chapter_id={chapter_id}, {e}", exc_info=True)
 
 
 def _generate_summary(score: int, issues: List[Dict]) -> str:
@@ -526,9 +800,10 @@ def _generate_summary(score: int, issues: List[Dict]) -> str:
     if not issues:
         return "文本风格自然，未发现明显的AI腔调痕迹"
 
-    high_count = sum(1 for i in issues if i["severity"] == "high")
-    medium_count = sum(1 for i in issues if i["severity"] == "medium")
-    low_count = sum(1 for i in issues if i["severity"] == "low")
+    severity_counts = Counter(i["severity"] for i in issues)
+    high_count = severity_counts["high"]
+    medium_count = severity_counts["medium"]
+    low_count = severity_counts["low"]
 
     parts = []
     if high_count > 0:
@@ -575,7 +850,6 @@ async def batch_replace_words(
     Returns:
         替换后的文本
     """
-    # 按位置从后往前替换，避免位置偏移
     # 先收集所有替换位置
     all_replacements = []
 
@@ -591,26 +865,25 @@ async def batch_replace_words(
                 "end": pos["end"],
                 "replacement": replacement
             })
-        else:
-            # 替换所有出现
-            start = 0
-            while True:
-                pos = text.find(original, start)
-                if pos == -1:
-                    break
-                all_replacements.append({
-                    "start": pos,
-                    "end": pos + len(original),
-                    "replacement": replacement
-                })
-                start = pos + len(original)
-
-    # 按位置从后往前排序
-    all_replacements.sort(key=lambda x: x["start"], reverse=True)
-
-    # 执行替换
-    result = text
-    for r in all_replacements:
-        result = result[:r["start"]] + r["replacement"] + result[r["end"]:]
+        elif original:
+            # 替换所有出现（复用缓存的编译正则，单次扫描）
+            all_replacements.extend(
+                {"start": m.start(), "end": m.end(), "replacement": replacement}
+                for m in _compile_word_pattern(original).finditer(text)
+            )
 
-    return result
+    # 按位置从前往后排序，与前一处重叠的替换跳过
+    all_replacements.sort(key=lambda x: x["start"])
+
+    # 一次正向拼接：原文片段与替换文本交替，最后统一 join
+    parts = []
+    cursor = 0
+    for r in all_replacements:
+        if r["start"] < cursor:
+            continue
+        parts.append(text[cursor:r["start"]])
+        parts.append(r["replacement"])
+        cursor = r["end"]
+    parts.append(text[cursor:])
+
+    return "".join(parts)
@@ -1,9 +1,10 @@
 """
 智能改写服务 - AI辅助文风优化
 """
-from typing import AsyncGenerator, Dict, Any, List, Optional
+from string import Formatter
+from typing import AsyncGenerator, Callable, Dict, Any, List, Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert
 from app.services.ai_service import AIService
 from app.models.ai_vocabulary import RewriteRecord
 from app.logger import get_logger
@@ -76,13 +77,73 @@ PROMPT_RESTRUCTURE = """请改写以下段落，消除AI痕迹，使其更有个
 请直接输出改写后的段落，不要解释。"""
 
 
+def _compile_prompt(template: str) -> Callable[..., str]:
+    """预先把 Prompt 模板拆成字面量片段和字段名，渲染时只做一次拼接
+
+    模板中含格式说明或转换符时退回 str.format
+    """
+    parsed = list(Formatter().parse(template))
+    if any(spec or conversion for _, _, spec, conversion in parsed):
+        return template.format
+
+    parts = tuple((literal, field) for literal, field, _, _ in parsed)
+
+    def render(**fields: Any) -> str:
+        chunks = []
+        for literal, field in parts:
+            chunks.append(literal)
+            if field is not None:
+                chunks.append(str(fields[field]))
+        return "".join(chunks)
+
+    return render
+
+
+_render_replace = _compile_prompt(PROMPT_REPLACE)
+_render_rewrite = _compile_prompt(PROMPT_REWRITE)
+_render_restructure = _compile_prompt(PROMPT_RESTRUCTURE)
+
+
 # 常见的AI腔调词汇黑名单
-AI_BANNED_WORDS = [
+AI_BANNED_WORDS = (
     "不禁", "不由得", "不由自主", "缓缓", "微微", "淡淡的", "轻轻地", "静静地",
     "默默地", "深深地", "心中涌起", "心头一紧", "心中一暖", "眼眶泛红", "嘴角上扬",
     "就在这时", "话音刚落", "与此同时", "值得注意的是", "需要指出的是",
     "综上所述", "由此可见", "不难发现", "显而易见"
-]
+)
+
+# Prompt 中最多列出的禁用词数量 (限制长度)
+BANNED_WORDS_LIMIT_REWRITE = 20
+BANNED_WORDS_LIMIT_RESTRUCTURE = 15
+
+# 未提供额外禁用词时 (最常见情况) 直接使用预先拼好的字符串
+_DEFAULT_BANNED_REWRITE = "、".join(AI_BANNED_WORDS[:BANNED_WORDS_LIMIT_REWRITE])
+_DEFAULT_BANNED_RESTRUCTURE = "、".join(AI_BANNED_WORDS[:BANNED_WORDS_LIMIT_RESTRUCTURE])
+
+
+def _join_banned_words(banned_words: Optional[List[str]], limit: int, default: str) -> str:
+    """拼接 Prompt 中的禁用词列表，无额外禁用词时复用预先拼好的字符串"""
+    if not banned_words:
+        return default
+    return "、".join((AI_BANNED_WORDS + tuple(banned_words))[:limit])
+
+
+# 整段改写 Prompt 中最多列出的问题数量
+RESTRUCTURE_ISSUES_LIMIT = 5
+
+
+def _format_issues_text(issue: Union[Dict, List[Dict]]) -> str:
+    """将问题 (单个或列表) 拼成 "- 词汇：说明" 多行文本
+
+    所有片段依次写入同一个列表，最后只拼接一次，不为每行生成中间字符串
+    """
+    issues = issue[:RESTRUCTURE_ISSUES_LIMIT] if isinstance(issue, list) else (issue,)
+    parts = []
+    for item in issues:
+        parts += ("- ", item.get("word", ""), "：", item.get("description", ""), "\n")
+    if parts:
+        parts.pop()  # 去掉末尾换行
+    return "".join(parts)
 
 
 # ============================================================
@@ -117,51 +178,47 @@ async def rewrite_text_stream(
     Yields:
         改写后的文本片段
     """
-    # 合并禁用词列表
-    all_banned = AI_BANNED_WORDS.copy()
-    if banned_words:
-        all_banned.extend(banned_words)
-
     # 构建prompt
     if rewrite_type == "replace" and issue:
-        prompt = PROMPT_REPLACE.format(
+        prompt = _render_replace(
             word=issue.get("word", ""),
             sentence=text,
             context=context or "无",
             alternatives=", ".join(issue.get("alternatives", ["更自然的表达"]))
         )
     elif rewrite_type == "rewrite" and issue:
-        prompt = PROMPT_REWRITE.format(
+        prompt = _render_rewrite(
             sentence=text,
             issue_description=issue.get("description", "存在AI腔调"),
-            banned_words="、".join(all_banned[:20]),  # 限制长度
+            banned_words=_join_banned_words(
+                banned_words, BANNED_WORDS_LIMIT_REWRITE, _DEFAULT_BANNED_REWRITE
+            ),
             context=context or "无"
         )
     elif rewrite_type == "restructure":
         # 整段改写
-        issues_text = ""
-        if issue:
-            if isinstance(issue, list):
-                issues_text = "\n".join([f"- {i.get('word', '')}：{i.get('description', '')}" for i in issue[:5]])
-            else:
-                issues_text = f"- {issue.get('word', '')}：{issue.get('description', '')}"
+        issues_text = _format_issues_text(issue) if issue else ""
 
         style_ref = ""
         if style_sample:
             style_ref = f"\n参考风格：\n{style_sample}\n"
 
-        prompt = PROMPT_RESTRUCTURE.format(
+        prompt = _render_restructure(
             paragraph=text,
             issues=issues_text or "句式单一、表达套路化",
-            banned_expressions="、".join(all_banned[:15]),
+            banned_expressions=_join_banned_words(
+                banned_words, BANNED_WORDS_LIMIT_RESTRUCTURE, _DEFAULT_BANNED_RESTRUCTURE
+            ),
             style_reference=style_ref
         )
     else:
         # 默认使用通用改写
-        prompt = PROMPT_REWRITE.format(
+        prompt = _render_rewrite(
             sentence=text,
             issue_description="存在AI腔调痕迹",
-            banned_words="、".join(all_banned[:20]),
+            banned_words=_join_banned_words(
+                banned_words, BANNED_WORDS_LIMIT_REWRITE, _DEFAULT_BANNED_REWRITE
+            ),
             context=context or "无"
         )
 
@@ -211,7 +268,7 @@ async def save_rewrite_record(
     trigger_type: str,
     trigger_issue: Optional[Dict] = None,
     ai_model: Optional[str] = None
-) -> RewriteRecord:
+) -> str:
     """
     保存改写记录
 
@@ -227,25 +284,27 @@ async def save_rewrite_record(
         ai_model: 使用的AI模型
 
     Returns:
-        保存的记录
+        记录ID
     """
-    record = RewriteRecord(
-        project_id=project_id,
-        chapter_id=chapter_id,
-        original_text=original_text,
-        rewritten_text=rewritten_text,
-        rewrite_type=rewrite_type,
-        trigger_type=trigger_type,
-        trigger_issue=trigger_issue,
-        ai_model=ai_model,
-        status="pending"
+    # 直接执行 INSERT ... RETURNING，不构造 ORM 对象
+    result = await db.execute(
+        insert(RewriteRecord).values(
+            project_id=project_id,
+            chapter_id=chapter_id,
+            original_text=original_text,
+            rewritten_text=rewritten_text,
+            rewrite_type=rewrite_type,
+            trigger_type=trigger_type,
+            trigger_issue=trigger_issue,
+            ai_model=ai_model,
+            status="pending"
+        ).returning(RewriteRecord.id)
     )
-    db.add(record)
+    record_id = result.scalar_one()
     await db.commit()
-    await db.refresh(record)
 
-    logger.info(f"保存改写记录: id={record.id}, type={rewrite_type}")
-    return record
+    logger.info(f"保存改写记录: id={record_id}, type={rewrite_type}")
+    return record_id
 
 
 async def update_rewrite_status(
@@ -11,6 +11,9 @@ from app.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 版本列表中正文预览的字符数
+PREVIEW_LENGTH = 200
+
 
 class VersionControlService:
     """轻量级版本控制服务 - 核心功能：自动备份、一键恢复"""
@@ -76,7 +79,7 @@ class VersionControlService:
 
         db.add(version)
         await db.commit()
-        await db.refresh(version)
+        # id 由客户端生成，无需 refresh 回查
 
         logger.info(f"版本创建成功: chapter_id={chapter_id}, version={version_number}, source={source}, title='{chapter.title}'")
         return version.id
@@ -146,15 +149,23 @@ class VersionControlService:
         Returns:
             版本列表
         """
+        # 只查询列表需要的列，正文只截取预览所需的前 201 个字符
         result = await db.execute(
-            select(ChapterVersion)
+            select(
+                ChapterVersion.id,
+                ChapterVersion.version_number,
+                ChapterVersion.word_count,
+                ChapterVersion.source,
+                ChapterVersion.created_at,
+                ChapterVersion.ai_provider,
+                ChapterVersion.ai_model,
+                func.substr(ChapterVersion.content, 1, PREVIEW_LENGTH + 1).label("preview")
+            )
             .where(ChapterVersion.chapter_id == chapter_id)
             .order_by(ChapterVersion.created_at.desc())
             .limit(limit)
         )
 
-        versions = result.scalars().all()
-
         return [
             {
                 "id": v.id,
@@ -164,9 +175,9 @@ class VersionControlService:
                 "created_at": v.created_at.isoformat(),
                 "ai_provider": v.ai_provider,
                 "ai_model": v.ai_model,
-                "preview": (v.content or "")[:200] + "..." if len(v.content or "") > 200 else v.content
+                "preview": (v.preview or "")[:PREVIEW_LENGTH] + "..." if len(v.preview or "") > PREVIEW_LENGTH else v.preview
             }
-            for v in versions
+            for v in result.mappings()
         ]
 
     async def get_version(self, db: AsyncSession, version_id: str) -> Optional[ChapterVersion]:
@@ -194,12 +205,13 @@ class VersionControlService:
         Returns:
             下一个版本号
         """
+        # 取已有最大版本号 (走 chapter_id + version_number 索引，无需统计全部版本行)
         result = await db.execute(
-            select(func.count())
+            select(func.max(ChapterVersion.version_number))
             .where(ChapterVersion.chapter_id == chapter_id)
         )
-        count = result.scalar() or 0
-        return count + 1
+        max_version = result.scalar() or 0
+        return max_version + 1
 
 
 # 单例
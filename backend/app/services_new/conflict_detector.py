@@ -1,19 +1,35 @@
 """矛盾检测服务 - 精准检测设定冲突"""
+import asyncio
 import json
 import re
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from dataclasses import dataclass
 from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, tuple_
 
 from app.models_new import EntitySnapshot, Conflict
 from app.models.chapter import Chapter
 from app.services.ai_service import AIService
 from app.logger import get_logger
 
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = get_logger(__name__)
 
 # 中文数字映射
@@ -23,9 +39,18 @@ CN_NUM_MAP = {
     '百': 100, '千': 1000, '万': 10000
 }
 
+# 预编译的正则 (标准化与数字提取在两两比较中被反复调用)
+# 标准化保留 re.sub：中文文本上 str.translate 删除表需逐字查字典，实测反而更慢
+_NORM_RE = re.compile(r'[\s，。！？、（）()""\'\'：:；;～~]+')
+_ARABIC_RE = re.compile(r'(\d+\.?\d*)')
+_CN_RE = re.compile(r'([零一二两三四五六七八九十百千万]+)')
+# 不含数字时 float() 仍可接受的写法
+_FLOAT_WORDS = frozenset({"inf", "infinity", "nan"})
+
 
+@lru_cache(maxsize=4096)
 def chinese_to_number(cn_str: str) -> Optional[int]:
-    """将中文数字转换为阿拉伯数字"""
+    """将中文数字转换为阿拉伯数字 (结果缓存：数值属性里的中文数字高度重复)"""
     if not cn_str:
         return None
     try:
@@ -57,17 +82,21 @@ def extract_number(value: str) -> Optional[float]:
     """从字符串中提取数字"""
     if not value:
         return None
+    text = value if isinstance(value, str) else str(value)
+    if text.isdecimal():
+        return float(text)
     
-    try:
-        return float(value)
-    except ValueError:
-        pass
-    
-    num_match = re.search(r'(\d+\.?\d*)', str(value))
+    # 先找数字：不含数字的文本 (多数中文描述) 不必再让 float() 抛异常
+    num_match = _ARABIC_RE.search(text)
     if num_match:
-        return float(num_match.group(1))
+        try:
+            return float(text)
+        except ValueError:
+            return float(num_match.group(1))
+    if text.strip().lstrip('+-').lower() in _FLOAT_WORDS:
+        return float(text)
     
-    cn_match = re.search(r'([零一二两三四五六七八九十百千万]+)', str(value))
+    cn_match = _CN_RE.search(text)
     if cn_match:
         num = chinese_to_number(cn_match.group(1))
         if num:
@@ -76,22 +105,110 @@ def extract_number(value: str) -> Optional[float]:
     return None
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def extract_json_object(content: str) -> Optional[Dict[str, Any]]:
+    """从AI响应中提取第一个完整的 JSON 对象 (支持嵌套，前后可夹杂说明文字)，找不到时返回 None"""
+    try:
+        data = orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+
+    # 从每个 "{" 起尝试解码，raw_decode 会自行匹配嵌套括号并忽略其后的多余文字
+    start = content.find("{")
+    while start != -1:
+        try:
+            data, _ = _JSON_DECODER.raw_decode(content, start)
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+        start = content.find("{", start + 1)
+    return None
+
+
 def normalize_text(text: str) -> str:
     """标准化文本用于比较"""
     if not text:
         return ""
-    # 移除标点、空格，转小写
-    return re.sub(r'[\s，。！？、（）()""\'\'：:；;～~]+', '', str(text).lower().strip())
+    return _normalize_str(text if isinstance(text, str) else str(text))
+
+
+@lru_cache(maxsize=8192)
+def _normalize_str(text: str) -> str:
+    """按字符串缓存标准化结果 (同一属性值在两两比较中会被反复标准化)"""
+    # 移除标点、空格，转小写 (正则中的 \s 与 strip 去除的空白字符完全相同，无需再 strip)
+    return _NORM_RE.sub('', text.lower())
+
 
+class ExclusiveValueIndex:
+    """互斥值索引 - 一次扫描求出文本所属的全部互斥类别
 
-def semantic_similarity(str1: str, str2: str) -> float:
+    类别为 (互斥组序号, 侧 0/1)。文本与某侧任一取值存在包含关系 (任一方向) 即属于该类别：
+    - "取值是文本的子串"：所有取值按长度降序组成一个前瞻正则，逐位置取最长匹配；
+      同一位置能匹配的较短取值必是最长匹配的前缀，其类别已预先并入
+    - "文本是取值的子串"：预先把所有取值的全部子串映射到类别，一次字典查找
+    """
+
+    __slots__ = ("_pattern", "_prefix_classes", "_substring_classes")
+
+    def __init__(self, exclusive_pairs: Iterable[Tuple[Iterable[str], Iterable[str]]]):
+        word_classes: Dict[str, set] = {}
+        for pair_index, sides in enumerate(exclusive_pairs):
+            for side, values in enumerate(sides):
+                for word in values:
+                    if word:
+                        word_classes.setdefault(word, set()).add((pair_index, side))
+
+        words = sorted(word_classes, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(map(re.escape, words)) + "))") if words else None
+
+        # 最长匹配 -> 其自身及所有作为其前缀的取值的类别
+        self._prefix_classes: Dict[str, frozenset] = {
+            word: frozenset().union(*(word_classes[word[:k]] for k in range(1, len(word) + 1) if word[:k] in word_classes))
+            for word in words
+        }
+
+        # 取值的任一子串 (含空串) -> 包含该子串的取值的类别
+        substring_classes: Dict[str, set] = {}
+        for word, classes in word_classes.items():
+            for start in range(len(word) + 1):
+                for end in range(start, len(word) + 1):
+                    substring_classes.setdefault(word[start:end], set()).update(classes)
+        self._substring_classes: Dict[str, frozenset] = {k: frozenset(v) for k, v in substring_classes.items()}
+
+    def classes(self, norm_value: str) -> frozenset:
+        """标准化文本所属的互斥类别集合"""
+        found = self._substring_classes.get(norm_value, frozenset())
+        if self._pattern is not None:
+            prefix_classes = self._prefix_classes
+            for match in self._pattern.finditer(norm_value):
+                found = found | prefix_classes[match.group(1)]
+        return found
+
+
+def semantic_similarity(str1: str, str2: str, score_cutoff: Optional[float] = None) -> float:
     """计算语义相似度"""
     if not str1 or not str2:
         return 0.0
     
-    clean1 = normalize_text(str1)
-    clean2 = normalize_text(str2)
-    
+    return normalized_similarity(normalize_text(str1), normalize_text(str2), score_cutoff=score_cutoff)
+
+
+def normalized_similarity(
+    clean1: str,
+    clean2: str,
+    ratio: Optional[float] = None,
+    score_cutoff: Optional[float] = None
+) -> float:
+    """计算已标准化文本的相似度 (ratio 为预先算好的编辑相似度，可选)
+
+    给定 score_cutoff 时，相似度不超过该值的组合只保证返回值不超过 score_cutoff
+    (调用方只做"大于阈值"判断)，可据长度上界提前返回，省去逐字比较
+    """
     if clean1 == clean2:
         return 1.0
     
@@ -99,7 +216,37 @@ def semantic_similarity(str1: str, str2: str) -> float:
     if clean1 in clean2 or clean2 in clean1:
         return 0.9
     
-    return SequenceMatcher(None, clean1, clean2).ratio()
+    if ratio is not None:
+        return ratio
+    if score_cutoff is not None:
+        # 编辑相似度 2*M/T 不会超过 2*min(len)/T，长度悬殊的组合 (如 "男" vs "一位身材魁梧的男性武者") 直接返回上界
+        len1, len2 = len(clean1), len(clean2)
+        bound = 2.0 * min(len1, len2) / (len1 + len2)
+        if bound <= score_cutoff:
+            return bound
+    # rapidfuzz 为 C++ 位并行实现，取值与 SequenceMatcher.ratio 同为 2*M/T (0-100)
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.ratio(clean1, clean2, score_cutoff=(score_cutoff or 0.0) * 100.0) / 100.0
+    matcher = SequenceMatcher(None, clean1, clean2)
+    if score_cutoff is not None:
+        upper = matcher.quick_ratio()
+        if upper <= score_cutoff:
+            return upper
+    return matcher.ratio()
+
+
+def pairwise_ratios(values: List[str], score_cutoff: float = 0.0) -> Optional[List[List[float]]]:
+    """一次计算一组文本两两之间的编辑相似度矩阵 (0-1)
+
+    rapidfuzz 可用时由 process.cdist 在 C++ 中完成全部比较 (低于 score_cutoff 的记为0)；
+    不可用时返回 None，由调用方逐对计算
+    """
+    if not RAPIDFUZZ_AVAILABLE:
+        return None
+    matrix = process.cdist(
+        values, values, scorer=fuzz.ratio, dtype=np.float64, score_cutoff=score_cutoff * 100.0
+    )
+    return (matrix / 100.0).tolist()
 
 
 @dataclass
@@ -119,6 +266,13 @@ class ConflictDetail:
 class ConflictDetector:
     """精准矛盾检测器 - 只报告真正的矛盾"""
 
+    # 相似度高于此值视为同义表达，不是矛盾
+    SYNONYM_SIMILARITY = 0.7
+    # 非互斥值相似度高于此值视为不同描述，不是矛盾
+    RELATED_SIMILARITY = 0.4
+    # AI二次验证的最大并发数
+    AI_VERIFY_CONCURRENCY = 8
+
     # 只检测这些关键属性的矛盾（其他属性太主观，容易误报）
     CHECKABLE_PROPS = {
         # 身份类 - 通常不会变
@@ -145,6 +299,11 @@ class ConflictDetector:
         ({"正派", "正道", "正义"}, {"邪派", "邪道", "邪恶", "魔道"}),
         ({"敌人", "敌方", "对手"}, {"朋友", "友方", "盟友", "伙伴"}),
     ]
+
+    # 预先标准化并建立索引的互斥值 (常量只需处理一次)
+    _EXCLUSIVE_INDEX = ExclusiveValueIndex(
+        [(map(normalize_text, set_1), map(normalize_text, set_2)) for set_1, set_2 in MUTUALLY_EXCLUSIVE]
+    )
     
     # 完全忽略的属性（太主观或经常变化）
     IGNORE_PROPS = {
@@ -157,59 +316,106 @@ class ConflictDetector:
         "thought", "想法", "attitude", "态度",
     }
 
+    # 跨属性检测的喜好/厌恶属性 (支持中英文属性名)
+    LIKE_PROPS = frozenset({'likes', '喜欢', '喜好', '爱好', 'love'})
+    DISLIKE_PROPS = frozenset({'dislikes', '讨厌', '厌恶', '憎恨', 'hate'})
+
+    # 属性名筛选：忽略词与可检查词合并为一个正则，一次扫描完成分类。
+    # 用前瞻逐位置匹配且忽略词在前，任一位置出现忽略词都会命中 ig 分组
+    _PROP_CLASSIFY_RE = re.compile(
+        "(?=(?P<ig>" + "|".join(map(re.escape, sorted(IGNORE_PROPS, key=len, reverse=True))) + ")"
+        "|(?P<ck>" + "|".join(map(re.escape, sorted(CHECKABLE_PROPS, key=len, reverse=True))) + "))"
+    )
+
     def __init__(self, ai_service: AIService = None):
         self.ai_service = ai_service
         # 提高置信度阈值，只检测高置信度的设定
         self.min_confidence = 0.75
         self._chapter_order_cache: Dict[str, int] = {}
+        # AI验证结果: (标准化值较小者, 较大者, 属性名) -> 验证任务，相同取值对只请求一次
+        self._ai_verify_cache: Dict[Tuple[str, str, str], "asyncio.Task[Tuple[bool, str]]"] = {}
+
+    # 流式读取快照时每批的行数
+    SNAPSHOT_STREAM_BATCH_SIZE = 500
 
     async def detect_all(self, project_id: str, db: AsyncSession) -> List[Conflict]:
         """检测项目中的真正矛盾"""
-        # 只获取高置信度的快照
-        result = await db.execute(
-            select(EntitySnapshot).where(
+        logger.info(f"开始精准矛盾检测: project_id={project_id}")
+
+        # 只获取高置信度的快照，同时 JOIN 出来源章节的顺序 (无需再单独查询章节)；
+        # 按实体+属性排序后同组快照连续到达，流式读取并逐组筛查，不在内存中保留全部快照
+        stream = await db.stream(
+            select(EntitySnapshot, Chapter.chapter_number)
+            .outerjoin(Chapter, Chapter.id == EntitySnapshot.source_chapter_id)
+            .where(
                 EntitySnapshot.project_id == project_id,
                 EntitySnapshot.confidence >= self.min_confidence
             ).order_by(EntitySnapshot.entity_id, EntitySnapshot.property_name)
+            .execution_options(yield_per=self.SNAPSHOT_STREAM_BATCH_SIZE)
         )
-        snapshots = result.scalars().all()
 
-        logger.info(f"开始精准矛盾检测: project_id={project_id}, 高置信度快照={len(snapshots)}")
+        # 检测同属性矛盾：先用规则逐组筛出候选，再统一 (并发) 做AI验证
+        candidates = []
+        cross_snapshots: List[EntitySnapshot] = []
+        snapshot_count = 0
+        group_key: Optional[Tuple[str, str]] = None
+        group_snapshots: List[EntitySnapshot] = []
+        # 组内首个标准化取值及是否出现过不同取值：取值全部相同的组不可能有矛盾，直接跳过
+        group_first_value: Optional[str] = None
+        group_varied = False
+        order_cache = self._chapter_order_cache
+
+        async for snapshot, chapter_number in stream:
+            snapshot_count += 1
+            if snapshot.source_chapter_id:
+                order_cache[snapshot.source_chapter_id] = chapter_number or 0
 
-        # 按实体+属性分组
-        snapshot_groups: Dict[str, List[EntitySnapshot]] = {}
-        for snapshot in snapshots:
             prop_lower = snapshot.property_name.lower()
+
+            # 跨属性检测只用到喜好/厌恶类快照
+            if prop_lower in self.LIKE_PROPS or prop_lower in self.DISLIKE_PROPS:
+                cross_snapshots.append(snapshot)
             
-            # 跳过忽略的属性
-            if any(ig in prop_lower for ig in self.IGNORE_PROPS):
-                continue
-            
-            # 只检测可检查的属性
-            if not any(cp in prop_lower for cp in self.CHECKABLE_PROPS):
+            # 跳过忽略的属性，只检测可检查的属性
+            if not self._is_checkable_property(prop_lower):
                 continue
-                
-            key = f"{snapshot.entity_id}:{snapshot.property_name}"
-            if key not in snapshot_groups:
-                snapshot_groups[key] = []
-            snapshot_groups[key].append(snapshot)
 
-        # 检测同属性矛盾
-        conflicts = []
-        for key, group_snapshots in snapshot_groups.items():
-            if len(group_snapshots) < 2:
-                continue
+            # 按实体+属性分组，上一组读完即筛查
+            key = (snapshot.entity_id, snapshot.property_name)
+            if key != group_key:
+                if group_varied:
+                    candidates.extend(await self._screen_group(group_snapshots, db))
+                group_key, group_snapshots = key, []
+                group_first_value = normalize_text(snapshot.property_value)
+                group_varied = False
+            elif not group_varied:
+                group_varied = normalize_text(snapshot.property_value) != group_first_value
+            group_snapshots.append(snapshot)
+
+        if group_varied:
+            candidates.extend(await self._screen_group(group_snapshots, db))
+
+        logger.info(f"高置信度快照={snapshot_count}, 待确认候选={len(candidates)}")
 
-            group_conflicts = await self._detect_in_group(group_snapshots, project_id, db)
-            conflicts.extend(group_conflicts)
+        conflicts = await self._confirm_candidates(candidates, project_id)
             
         # 检测跨属性矛盾 (新增)
-        cross_conflicts = await self._detect_cross_property_conflicts(snapshots, project_id, db)
+        cross_conflicts = await self._detect_cross_property_conflicts(cross_snapshots, project_id, db)
         conflicts.extend(cross_conflicts)
 
         logger.info(f"精准检测完成: 发现 {len(conflicts)} 个真正的矛盾")
         return conflicts
 
+    @classmethod
+    def _is_checkable_property(cls, prop_lower: str) -> bool:
+        """属性名不含任何忽略词且含有可检查词"""
+        checkable = False
+        for match in cls._PROP_CLASSIFY_RE.finditer(prop_lower):
+            if match.lastgroup == "ig":
+                return False
+            checkable = True
+        return checkable
+
     async def _detect_cross_property_conflicts(
         self,
         snapshots: List[EntitySnapshot],
@@ -235,9 +441,9 @@ class ConflictDetector:
             for s in entity_snapshots:
                 prop = s.property_name.lower()
                 # 支持中英文属性名
-                if prop in ['likes', '喜欢', '喜好', '爱好', 'love']:
+                if prop in self.LIKE_PROPS:
                     likes_snapshots.append(s)
-                elif prop in ['dislikes', '讨厌', '厌恶', '憎恨', 'hate']:
+                elif prop in self.DISLIKE_PROPS:
                     dislikes_snapshots.append(s)
             
             if not likes_snapshots or not dislikes_snapshots:
@@ -279,21 +485,22 @@ class ConflictDetector:
                         
         return conflicts
 
-    async def _detect_in_group(
+    async def _screen_group(
         self,
         snapshots: List[EntitySnapshot],
-        project_id: str,
         db: AsyncSession
-    ) -> List[Conflict]:
-        """检测同一实体同一属性的矛盾"""
-        conflicts = []
+    ) -> List[Tuple[EntitySnapshot, EntitySnapshot, str, bool]]:
+        """用规则筛查同一实体同一属性的取值，返回候选矛盾 [(快照A, 快照B, 属性名, 是否互斥), ...]"""
+        candidates = []
         property_name = snapshots[0].property_name.lower()
 
-        # 按章节排序
-        sorted_snapshots = []
-        for s in snapshots:
-            order = await self._get_chapter_order(s.source_chapter_id, db) if s.source_chapter_id else 0
-            sorted_snapshots.append((order, s))
+        # 按章节排序 (detect_all 查询快照时已带出章节顺序，此处通常无需查询)
+        await self._prefetch_chapter_orders((s.source_chapter_id for s in snapshots), db)
+        order_cache = self._chapter_order_cache
+        sorted_snapshots = [
+            (order_cache[s.source_chapter_id] if s.source_chapter_id else 0, s)
+            for s in snapshots
+        ]
         sorted_snapshots.sort(key=lambda x: x[0])
 
         # 去重：合并完全相同的值
@@ -304,36 +511,87 @@ class ConflictDetector:
                 unique_values[norm_value] = (order, snapshot)
 
         if len(unique_values) < 2:
-            return conflicts
+            return candidates
 
-        # 比较不同的值
+        # 比较不同的值：相似度矩阵与互斥归属均按组一次算好，
+        # 相似度过高 (同义) 或非互斥且中等相似的组合不可能构成矛盾，直接跳过
+        norm_values = list(unique_values)
         values_list = list(unique_values.values())
+        ratios = pairwise_ratios(norm_values, score_cutoff=self.RELATED_SIMILARITY)
+        memberships = [self._exclusive_membership(v) for v in norm_values]
+
         for i in range(len(values_list)):
+            order_a, snapshot_a = values_list[i]
             for j in range(i + 1, len(values_list)):
-                order_a, snapshot_a = values_list[i]
                 order_b, snapshot_b = values_list[j]
+
+                if not snapshot_a.property_value or not snapshot_b.property_value:
+                    similarity = 0.0
+                else:
+                    similarity = normalized_similarity(
+                        norm_values[i], norm_values[j], ratios[i][j] if ratios else None,
+                        score_cutoff=self.RELATED_SIMILARITY
+                    )
+                if similarity > self.SYNONYM_SIMILARITY:
+                    continue
+
+                is_exclusive = self._memberships_exclusive(memberships[i], memberships[j])
+                if not is_exclusive and similarity > self.RELATED_SIMILARITY:
+                    continue
                 
-                conflict = await self._check_conflict(
-                    snapshot_a, snapshot_b, 
-                    order_a, order_b,
-                    property_name, project_id, db
+                is_exclusive = self._screen_conflict(
+                    snapshot_a, snapshot_b,
+                    order_a, order_b, property_name,
+                    similarity=similarity, is_exclusive=is_exclusive
                 )
-                if conflict:
-                    conflicts.append(conflict)
+                if is_exclusive is not None:
+                    candidates.append((snapshot_a, snapshot_b, property_name, is_exclusive))
 
-        return conflicts
+        return candidates
 
-    async def _check_conflict(
+    async def _confirm_candidates(
+        self,
+        candidates: List[Tuple[EntitySnapshot, EntitySnapshot, str, bool]],
+        project_id: str
+    ) -> List[Conflict]:
+        """对非互斥的候选矛盾做AI二次验证 (并发、限流)，为确认的矛盾创建记录"""
+        confirmed = [True] * len(candidates)
+
+        pending = [i for i, candidate in enumerate(candidates) if not candidate[3]]
+        if self.ai_service and pending:
+            semaphore = asyncio.Semaphore(self.AI_VERIFY_CONCURRENCY)
+
+            async def verify(snapshot_a: EntitySnapshot, snapshot_b: EntitySnapshot, property_name: str):
+                async with semaphore:
+                    return await self._verify_with_ai(snapshot_a, snapshot_b, property_name)
+
+            results = await asyncio.gather(*(verify(*candidates[i][:3]) for i in pending))
+            for i, (is_conflict, reason) in zip(pending, results):
+                if not is_conflict:
+                    snapshot_a, _, property_name, _ = candidates[i]
+                    logger.debug(f"AI判定非矛盾: {snapshot_a.entity_name}.{property_name} - {reason}")
+                    confirmed[i] = False
+
+        return [
+            self._build_conflict(snapshot_a, snapshot_b, property_name, project_id, is_exclusive)
+            for (snapshot_a, snapshot_b, property_name, is_exclusive), ok in zip(candidates, confirmed)
+            if ok
+        ]
+
+    def _screen_conflict(
         self,
         snapshot_a: EntitySnapshot,
         snapshot_b: EntitySnapshot,
         order_a: int,
         order_b: int,
         property_name: str,
-        project_id: str,
-        db: AsyncSession
-    ) -> Optional[Conflict]:
-        """精准判断两个值是否矛盾（支持多维属性分层）"""
+        similarity: Optional[float] = None,
+        is_exclusive: Optional[bool] = None
+    ) -> Optional[bool]:
+        """不调用AI的规则判断：确定不矛盾时返回 None，否则返回两个值是否互斥
+
+        similarity / is_exclusive 可由调用方按组预先算好传入，未传入时在此计算
+        """
         
         # === 核心革新：基于层级的过滤逻辑 ===
         layer_a = getattr(snapshot_a, 'layer', 'Intrinsic')
@@ -359,12 +617,14 @@ class ConflictDetector:
         value_b = snapshot_b.property_value
         
         # 4. 高相似度 = 不矛盾（可能是同义表达）
-        similarity = semantic_similarity(value_a, value_b)
-        if similarity > 0.7:
+        if similarity is None:
+            similarity = semantic_similarity(value_a, value_b, score_cutoff=self.RELATED_SIMILARITY)
+        if similarity > self.SYNONYM_SIMILARITY:
             return None
         
         # 5. 检查是否为互斥值
-        is_exclusive = self._check_mutually_exclusive(value_a, value_b)
+        if is_exclusive is None:
+            is_exclusive = self._check_mutually_exclusive(value_a, value_b)
         
         # 6. 数值类属性特殊处理
         if self._is_numeric_property(property_name):
@@ -388,17 +648,24 @@ class ConflictDetector:
                         return None
         
         # 7. 如果不是互斥值，且相似度在中等范围，可能只是不同描述
-        if not is_exclusive and similarity > 0.4:
+        if not is_exclusive and similarity > self.RELATED_SIMILARITY:
             return None
         
-        # 8. 使用AI二次验证（如果可用）
-        if self.ai_service and not is_exclusive:
-            is_conflict, reason = await self._verify_with_ai(snapshot_a, snapshot_b, property_name)
-            if not is_conflict:
-                logger.debug(f"AI判定非矛盾: {snapshot_a.entity_name}.{property_name} - {reason}")
-                return None
-        
-        # 9. 确认是矛盾，创建记录
+        return is_exclusive
+
+    def _build_conflict(
+        self,
+        snapshot_a: EntitySnapshot,
+        snapshot_b: EntitySnapshot,
+        property_name: str,
+        project_id: str,
+        is_exclusive: bool
+    ) -> Conflict:
+        """9. 确认是矛盾，创建记录"""
+        layer_a = getattr(snapshot_a, 'layer', 'Intrinsic')
+        layer_b = getattr(snapshot_b, 'layer', 'Intrinsic')
+        value_a = snapshot_a.property_value
+        value_b = snapshot_b.property_value
         severity = "critical" if is_exclusive else "warning"
         
         # 调整描述，增加层级信息
@@ -429,25 +696,27 @@ class ConflictDetector:
 
     def _check_mutually_exclusive(self, value_a: str, value_b: str) -> bool:
         """检查两个值是否互斥"""
-        norm_a = normalize_text(value_a)
-        norm_b = normalize_text(value_b)
-        
-        for set_1, set_2 in self.MUTUALLY_EXCLUSIVE:
-            a_in_1 = any(normalize_text(v) in norm_a or norm_a in normalize_text(v) for v in set_1)
-            a_in_2 = any(normalize_text(v) in norm_a or norm_a in normalize_text(v) for v in set_2)
-            b_in_1 = any(normalize_text(v) in norm_b or norm_b in normalize_text(v) for v in set_1)
-            b_in_2 = any(normalize_text(v) in norm_b or norm_b in normalize_text(v) for v in set_2)
-            
-            # 一个在集合1，另一个在集合2 = 互斥
-            if (a_in_1 and b_in_2) or (a_in_2 and b_in_1):
-                return True
-        
-        return False
+        return self._memberships_exclusive(
+            self._exclusive_membership(normalize_text(value_a)),
+            self._exclusive_membership(normalize_text(value_b))
+        )
+
+    def _exclusive_membership(self, norm_value: str) -> frozenset:
+        """标准化后的值所属的互斥类别: {(互斥组序号, 侧 0/1), ...}"""
+        return self._EXCLUSIVE_INDEX.classes(norm_value)
+
+    @staticmethod
+    def _memberships_exclusive(membership_a: frozenset, membership_b: frozenset) -> bool:
+        """一个在集合1，另一个在集合2 = 互斥"""
+        return any((pair_index, 1 - side) in membership_b for pair_index, side in membership_a)
+
+    # 数值类属性关键词 (编译为单个正则，每对比较只需一次扫描)
+    NUMERIC_KEYWORDS = ("age", "年龄", "height", "身高", "weight", "体重", "level", "等级")
+    _NUMERIC_PROP_RE = re.compile("|".join(map(re.escape, NUMERIC_KEYWORDS)))
 
     def _is_numeric_property(self, property_name: str) -> bool:
         """判断是否为数值属性"""
-        numeric_keywords = ["age", "年龄", "height", "身高", "weight", "体重", "level", "等级"]
-        return any(k in property_name.lower() for k in numeric_keywords)
+        return self._NUMERIC_PROP_RE.search(property_name.lower()) is not None
 
     async def _verify_with_ai(
         self,
@@ -455,9 +724,36 @@ class ConflictDetector:
         snapshot_b: EntitySnapshot,
         property_name: str
     ) -> Tuple[bool, str]:
-        """使用AI验证是否真的矛盾"""
+        """使用AI验证是否真的矛盾
+
+        结果按 (标准化取值对, 属性名) 缓存，与顺序无关；同一取值对并发请求时共用一次AI调用
+        """
+        norm_a = normalize_text(snapshot_a.property_value)
+        norm_b = normalize_text(snapshot_b.property_value)
+        key = (min(norm_a, norm_b), max(norm_a, norm_b), property_name)
+
+        task = self._ai_verify_cache.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request_ai_verification(snapshot_a, snapshot_b, property_name))
+            self._ai_verify_cache[key] = task
+
         try:
-            prompt = f"""判断以下两个描述是否存在【真正的逻辑矛盾】。
+            return await asyncio.shield(task)
+        except Exception as e:
+            # 失败结果不缓存，下次重新请求
+            if self._ai_verify_cache.get(key) is task:
+                del self._ai_verify_cache[key]
+            logger.error(f"AI验证失败: {str(e)}")
+            return True, str(e)
+
+    async def _request_ai_verification(
+        self,
+        snapshot_a: EntitySnapshot,
+        snapshot_b: EntitySnapshot,
+        property_name: str
+    ) -> Tuple[bool, str]:
+        """请求AI判断两个描述是否矛盾，响应无法解析时抛出异常"""
+        prompt = f"""判断以下两个描述是否存在【真正的逻辑矛盾】。
 
 角色/实体: {snapshot_a.entity_name}
 属性: {property_name}
@@ -472,24 +768,15 @@ class ConflictDetector:
 
 请只回答JSON：{{"is_conflict": true/false, "reason": "一句话说明"}}"""
 
-            result = await self.ai_service.generate_text(prompt=prompt, temperature=0.1)
-            
-            content = result.get("content", "") if isinstance(result, dict) else str(result)
-            
-            try:
-                data = json.loads(content)
-            except:
-                match = re.search(r'\{[^}]+\}', content)
-                if match:
-                    data = json.loads(match.group(0))
-                else:
-                    return True, "AI响应解析失败"
-            
-            return data.get("is_conflict", True), data.get("reason", "")
-            
-        except Exception as e:
-            logger.error(f"AI验证失败: {str(e)}")
-            return True, str(e)
+        result = await self.ai_service.generate_text(prompt=prompt, temperature=0.1)
+        
+        content = result.get("content", "") if isinstance(result, dict) else str(result)
+        
+        data = extract_json_object(content)
+        if data is None:
+            raise ValueError("AI响应解析失败")
+        
+        return data.get("is_conflict", True), data.get("reason", "")
 
     def _generate_suggestion(self, property_name: str, value_a: str, value_b: str) -> str:
         """生成解决建议"""
@@ -550,20 +837,59 @@ class ConflictDetector:
         }
         return display_map.get(property_name.lower(), property_name)
 
-    async def _get_chapter_order(self, chapter_id: str, db: AsyncSession) -> int:
-        """获取章节顺序"""
-        if not chapter_id:
-            return 0
-        if chapter_id in self._chapter_order_cache:
-            return self._chapter_order_cache[chapter_id]
-        
-        result = await db.execute(
-            select(Chapter.chapter_number).where(Chapter.id == chapter_id)
+    # 单次 IN 查询的最大章节ID数量
+    CHAPTER_ORDER_BATCH_SIZE = 500
+
+    async def _prefetch_chapter_orders(self, chapter_ids: Iterable[str], db: AsyncSession):
+        """批量加载章节顺序到缓存 (一次 IN 查询代替逐个查询，不存在的章节记为0)"""
+        missing = list({cid for cid in chapter_ids if cid and cid not in self._chapter_order_cache})
+        for start in range(0, len(missing), self.CHAPTER_ORDER_BATCH_SIZE):
+            batch = missing[start:start + self.CHAPTER_ORDER_BATCH_SIZE]
+            result = await db.execute(
+                select(Chapter.id, Chapter.chapter_number).where(Chapter.id.in_(batch))
+            )
+            orders = dict(result.all())
+            for cid in batch:
+                self._chapter_order_cache[cid] = orders.get(cid, 0)
+
+    # 单次 IN 查询的最大矛盾键数量 (每个键正反两个方向，各4个参数)
+    CONFLICT_KEY_BATCH_SIZE = 100
+
+    async def _load_existing_conflict_keys(
+        self,
+        project_id: str,
+        candidate_keys: List[Tuple[str, str, str, str]],
+        db: AsyncSession
+    ) -> set:
+        """只查询候选矛盾 (含快照对调方向) 中已存在的键，不加载整个项目的矛盾"""
+        key_columns = tuple_(
+            Conflict.entity_id,
+            Conflict.property_name,
+            Conflict.snapshot_a_id,
+            Conflict.snapshot_b_id
         )
-        row = result.first()
-        order = row[0] if row else 0
-        self._chapter_order_cache[chapter_id] = order
-        return order
+        existing_keys = set()
+        for start in range(0, len(candidate_keys), self.CONFLICT_KEY_BATCH_SIZE):
+            batch = candidate_keys[start:start + self.CONFLICT_KEY_BATCH_SIZE]
+            lookup_keys = list({
+                k for entity_id, prop, a_id, b_id in batch
+                for k in ((entity_id, prop, a_id, b_id), (entity_id, prop, b_id, a_id))
+            })
+            result = await db.execute(
+                select(
+                    Conflict.entity_id,
+                    Conflict.property_name,
+                    Conflict.snapshot_a_id,
+                    Conflict.snapshot_b_id
+                ).where(
+                    Conflict.project_id == project_id,
+                    key_columns.in_(lookup_keys)
+                )
+            )
+            for entity_id, prop, a_id, b_id in result.all():
+                existing_keys.add((entity_id, prop, a_id, b_id))
+                existing_keys.add((entity_id, prop, b_id, a_id))
+        return existing_keys
 
     async def save_conflicts(self, conflicts: List[Conflict], db: AsyncSession) -> Tuple[int, List[str]]:
         """保存矛盾"""
@@ -573,32 +899,22 @@ class ConflictDetector:
         error_ids = []
         project_id = conflicts[0].project_id
 
-        # 预加载已存在的矛盾
-        existing_result = await db.execute(
-            select(
-                Conflict.entity_id,
-                Conflict.property_name,
-                Conflict.snapshot_a_id,
-                Conflict.snapshot_b_id
-            ).where(Conflict.project_id == project_id)
-        )
-        existing_keys = set()
-        for row in existing_result.all():
-            existing_keys.add(f"{row[0]}:{row[1]}:{row[2]}:{row[3]}")
-            existing_keys.add(f"{row[0]}:{row[1]}:{row[3]}:{row[2]}")
+        candidate_keys = [
+            (c.entity_id, c.property_name, c.snapshot_a_id, c.snapshot_b_id)
+            for c in conflicts
+        ]
+        existing_keys = await self._load_existing_conflict_keys(project_id, candidate_keys, db)
 
         # 筛选新矛盾
         new_conflicts = []
-        for conflict in conflicts:
-            key = f"{conflict.entity_id}:{conflict.property_name}:{conflict.snapshot_a_id}:{conflict.snapshot_b_id}"
+        for conflict, key in zip(conflicts, candidate_keys):
             if key not in existing_keys:
                 new_conflicts.append(conflict)
                 existing_keys.add(key)
 
         if new_conflicts:
             try:
-                for c in new_conflicts:
-                    db.add(c)
+                db.add_all(new_conflicts)
                 await db.commit()
                 logger.info(f"保存矛盾: {len(new_conflicts)} 条")
             except Exception as e:
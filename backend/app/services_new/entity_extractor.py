@@ -1,13 +1,18 @@
 """实体提取服务 - 从章节内容中提取角色/地点/物品的属性和设定"""
+import asyncio
+import hashlib
 import json
 import re
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from app.models_new import EntitySnapshot
+from app.models_new import EntitySnapshot, ChapterContentHash
 from app.models.chapter import Chapter
 from app.models.character import Character
 from app.services.ai_service import AIService
@@ -15,6 +20,34 @@ from app.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 提取过程中的快照以字段字典表示 (列名 -> 值)，保存时直接批量插入，
+# 不必为每条 (包括去重丢弃的) 记录构造 ORM 对象
+SnapshotRow = Dict[str, Any]
+
+# 支持 ON CONFLICT 的方言：重复快照交给唯一索引 uq_entity_snapshot_source 去重，
+# 章节内容哈希按主键 upsert
+_DIALECT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+_SNAPSHOT_UNIQUE_KEYS = ("project_id", "entity_id", "property_name", "source_chapter_id")
+# 插入时显式写入的列 (created_at/updated_at 由数据库默认值填充)
+_SNAPSHOT_INSERT_COLUMNS = tuple(c for c in EntitySnapshot.__table__.columns if c.server_default is None)
+
+
+def snapshot_insert_row(snapshot: SnapshotRow) -> Dict[str, Any]:
+    """将快照字段字典补全为包含全部插入列的字典，未给出的字段取列的默认值
+
+    不同来源 (AI/各类规则) 的快照字段不尽相同，executemany 要求每行的键一致
+    """
+    row = {}
+    for column in _SNAPSHOT_INSERT_COLUMNS:
+        value = snapshot.get(column.key)
+        if value is None and column.default is not None:
+            value = column.default.arg(None) if column.default.is_callable else column.default.arg
+        row[column.key] = value
+    return row
+
 # 中文数字映射
 CN_NUM_MAP = {
     '零': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
@@ -22,9 +55,105 @@ CN_NUM_MAP = {
     '百': 100, '千': 1000, '万': 10000
 }
 
+# 预编译的正则 (每个章节都要对全文反复扫描，避免每次调用重新查找/编译)
+_AGE_DIGIT_RE = re.compile(r'(\d+)')
+_AGE_CN_RE = re.compile(r'([零一二两三四五六七八九十百]+)')
+
+# 以下模式大多以 [\u4e00-\u9fa5]{2,N} 开头，正则引擎会在每个汉字位置尝试匹配；
+# 每个模式附带"必含关键词"，章节中一个都不出现时整个模式跳过 (str 的 in 查找远快于正则逐位尝试)
+
+# 年龄模式（增强版）: (必含关键词, 正则, 从匹配中取出 (名字, 年龄))
+_AGE_PATTERNS = [
+    # 阿拉伯数字: 小明20岁、今年20岁的小明
+    (("岁",), re.compile(r'([\u4e00-\u9fa5]{2,4})(\d{1,3})岁'), lambda m: (m.group(1), m.group(2))),
+    (("岁的",), re.compile(r'(\d{1,3})岁的([\u4e00-\u9fa5]{2,4})'), lambda m: (m.group(2), m.group(1))),
+    # 中文数字: 二十岁、二十多岁
+    (("岁",), re.compile(r'([\u4e00-\u9fa5]{2,4})[今年是有]?([零一二两三四五六七八九十百]+)多?岁'),
+     lambda m: (m.group(1), chinese_to_number(m.group(2)))),
+    (("岁的",), re.compile(r'([零一二两三四五六七八九十百]+)多?岁的([\u4e00-\u9fa5]{2,4})'),
+     lambda m: (m.group(2), chinese_to_number(m.group(1)))),
+]
+
+# 性别模式（增强版）: (必含关键词, 正则, 从匹配中取出 (名字, 性别))
+_GENDER_PATTERNS = [
+    (("男", "女"), re.compile(r'([\u4e00-\u9fa5]{2,4})是[个一位名]?(男|女)[性人子的]'), lambda m: (m.group(1), m.group(2))),
+    (("主角", "人角"), re.compile(r'(男|女)[主人]角([\u4e00-\u9fa5]{2,4})'), lambda m: (m.group(2), m.group(1))),
+    (("男孩", "女孩"), re.compile(r'([\u4e00-\u9fa5]{2,4})[,，]?[这那]个?(男|女)孩'), lambda m: (m.group(1), m.group(2))),
+    (("他叫", "她叫"), re.compile(r'(他|她)叫([\u4e00-\u9fa5]{2,4})'), lambda m: (m.group(2), "男" if m.group(1) == "他" else "女")),
+]
+
+# 喜好模式: (必含关键词, 正则, 喜好/厌恶)
+# 例如: "张三最喜欢吃苹果", "李四讨厌下雨"
+_PREFERENCE_PATTERNS = [
+    (("喜欢", "爱", "沉迷", "钟爱"),
+     re.compile(r'([\u4e00-\u9fa5]{2,4})(?:最?喜欢|最?爱|沉迷|钟爱)(?:吃|喝|玩|看)?([\u4e00-\u9fa5]{2,10})'), "like"),
+    (("讨厌", "恨", "厌恶", "反感"),
+     re.compile(r'([\u4e00-\u9fa5]{2,4})(?:最?讨厌|最?恨|厌恶|反感)(?:吃|喝|玩|看)?([\u4e00-\u9fa5]{2,10})'), "dislike"),
+]
+
+# 地点后缀（扩展）
+LOCATION_SUFFIXES = [
+    "村", "镇", "城", "市", "省", "国", "州", "府", "县",
+    "森林", "山", "山脉", "河", "河流", "湖", "海", "岛", "洲",
+    "堡", "殿", "宫", "府", "阁", "楼", "塔", "庙", "寺", "观",
+    "学院", "学校", "宗门", "门派", "帮", "会", "盟",
+    "谷", "洞", "穴", "崖", "峰", "岭"
+]
+# 所有后缀合并为一个交替式 (长后缀在前)，一次扫描全文
+_LOCATION_RE = re.compile(
+    r'([\u4e00-\u9fa5]{2,6}(?:'
+    + '|'.join(map(re.escape, sorted(set(LOCATION_SUFFIXES), key=len, reverse=True)))
+    + r'))'
+)
+
+# 规则模式（增强）: (必含关键词, 正则)
+_RULE_PATTERNS = [
+    (("规则", "法则", "定律", "禁忌", "铁律"), re.compile(r'([\u4e00-\u9fa5]{2,20}(?:规则|法则|定律|禁忌|铁律))')),
+    (("修炼", "晋级", "突破"), re.compile(r'((?:修炼|晋级|突破)[\u4e00-\u9fa5]{2,30})')),
+    (("境界",), re.compile(r'([\u4e00-\u9fa5]{2,10}境界[\u4e00-\u9fa5]{0,20})')),
+]
+
+# AI提取说明 (单章与多章合并请求共用)
+_AI_EXTRACT_GUIDE = """请提取以下类型的设定信息，并区分属性层级：
+1. 角色属性：年龄、性别、外貌、性格、能力、当前身份(Identity)、出身背景(Background)、状态变化、喜好、厌恶、习惯
+2. 地点信息：地点名称、位置描述、特征
+3. 物品设定：物品名称、功能、归属
+4. 世界规则：法则、制度、限制
+
+属性层级说明：
+- Intrinsic: 固有设定/真相（如：他是穿越者，真实性别）
+- Appearance: 外在表象/伪装（如：看着像乞丐，化名，易容）
+- Evaluation: 他人评价/主观认知（如：村民觉得他是神仙，反派认为他是垃圾）
+
+特别注意：
+- 穿越/重生前的身份（如：大学生、特种兵、现代人）请归类为 "background" (出身背景)。
+- 当前世界的身份（如：王妃、宗主、废柴）请归类为 "identity" (当前身份)。
 
+请用JSON格式返回，每个设定包含：
+- type: "character"/"location"/"item"/"rule"
+- name: 实体名称
+- property: 属性名
+- value: 属性值
+- layer: "Intrinsic"/"Appearance"/"Evaluation" (默认 Intrinsic)
+- source_type: "Narrator"(旁白) 或 "Character"(特定角色名)
+- quote: 原文引用
+- confidence: 置信度(0-1)
+
+"""
+
+# 正文判断：开头起至少含 AI_MIN_CJK_CHARS 个汉字 (两个字符类互斥，匹配为线性且数够即停)
+_CJK_COUNT_RE_TEMPLATE = r'(?:[^\u4e00-\u9fa5]*[\u4e00-\u9fa5]){%d}'
+
+# AI响应解析
+_CODE_FENCE = "```"
+# 属性值类型判断：不含数字的文本只有这些写法能被 float() 接受
+_HAS_DIGIT_RE = re.compile(r'\d')
+_FLOAT_WORDS = frozenset({"inf", "infinity", "nan"})
+
+
+@lru_cache(maxsize=4096)
 def chinese_to_number(cn_str: str) -> Optional[int]:
-    """将中文数字转换为阿拉伯数字"""
+    """将中文数字转换为阿拉伯数字 (结果缓存：年龄等中文数字在各章节中高度重复)"""
     if not cn_str:
         return None
     
@@ -55,6 +184,64 @@ def chinese_to_number(cn_str: str) -> Optional[int]:
     return result if result > 0 else None
 
 
+def contains_any(content: str, keywords: Tuple[str, ...]) -> bool:
+    """章节中是否出现任一关键词"""
+    return any(keyword in content for keyword in keywords)
+
+
+def compute_content_hash(content: Optional[str]) -> str:
+    """计算章节内容哈希 (blake2b 16字节：比 sha256 快，且仅用于判断内容是否变化)"""
+    return hashlib.blake2b((content or "").encode(), digest_size=16).hexdigest()
+
+
+def rule_entity_id(rule_text: str) -> str:
+    """规则实体ID：blake2b 8字节摘要，跨进程稳定 (内置 hash() 受 PYTHONHASHSEED 影响)，且几乎不会碰撞"""
+    return f"rule_{hashlib.blake2b(rule_text.encode(), digest_size=8).hexdigest()}"
+
+
+def extract_code_block(text: str) -> Optional[str]:
+    """取出第一个 ``` 代码块中的 JSON 文本 (以 [ 或 { 开头)，没有则返回 None"""
+    start = text.find(_CODE_FENCE)
+    if start < 0:
+        return None
+    start += len(_CODE_FENCE)
+    end = text.find(_CODE_FENCE, start)
+    if end < 0:
+        return None
+    block = text[start:end].strip()
+    if block.startswith("json"):
+        block = block[4:].lstrip()
+    return block if block[:1] in ("[", "{") else None
+
+
+def find_balanced_array(text: str) -> Optional[str]:
+    """O(n) 扫描第一个括号配平的 JSON 数组 (跳过字符串内的括号)，没有则返回 None"""
+    start = text.find("[")
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
 def normalize_age_value(age_str: str) -> Tuple[str, float]:
     """
     标准化年龄值，返回 (标准值, 置信度)
@@ -64,12 +251,12 @@ def normalize_age_value(age_str: str) -> Tuple[str, float]:
     confidence = 0.8
     
     # 提取数字部分
-    num_match = re.search(r'(\d+)', age_str)
+    num_match = _AGE_DIGIT_RE.search(age_str)
     if num_match:
         return num_match.group(1), confidence
     
     # 处理中文数字
-    cn_match = re.search(r'([零一二两三四五六七八九十百]+)', age_str)
+    cn_match = _AGE_CN_RE.search(age_str)
     if cn_match:
         num = chinese_to_number(cn_match.group(1))
         if num:
@@ -95,43 +282,88 @@ class EntityInfo:
     confidence: float
 
 
+class CharacterIndex:
+    """项目角色索引 - 按名字精确查找，并缓存每个名字的匹配结果"""
+
+    __slots__ = ("characters", "_by_name", "_matches", "prompt_names")
+
+    def __init__(self, characters: List[Character]):
+        self.characters = characters
+        self._by_name: Dict[str, Character] = {}
+        for char in characters:
+            self._by_name.setdefault(char.name, char)
+        self._matches: Dict[str, Optional[Character]] = {}
+        # AI提示词中的角色列表，每个项目只拼接一次
+        self.prompt_names = "、".join(c.name for c in characters) if characters else "（暂无已定义角色）"
+
+    def find(self, name: str) -> Optional[Character]:
+        """查找匹配的角色：先精确匹配，再按顺序做部分匹配（名字包含或被包含）"""
+        name = name.strip()
+        if name in self._matches:
+            return self._matches[name]
+
+        matched = self._by_name.get(name)
+        if matched is None and len(name) >= 2:
+            for char in self.characters:
+                if name in char.name or char.name in name:
+                    matched = char
+                    break
+
+        self._matches[name] = matched
+        return matched
+
+
 class EntityExtractor:
     """实体提取器 - 从文本中提取设定信息"""
 
-    def __init__(self, ai_service: AIService = None):
+    # 批量提取时同时进行的章节提取 (AI请求) 数量
+    AI_EXTRACT_CONCURRENCY = 8
+    # 批量提取时每次AI请求合并的章节数 (每章最多 AI_CONTENT_MAX_CHARS 字，兼顾请求次数与上下文长度)
+    AI_EXTRACT_BATCH_SIZE = 4
+    # AI提取时每章截取的最大字数
+    AI_CONTENT_MAX_CHARS = 3000
+    # 章节过短或汉字过少 (多为备注/元数据) 时提取收益很低，只做规则提取，不请求AI
+    AI_MIN_CONTENT_CHARS = 300
+    AI_MIN_CJK_CHARS = 100
+    _AI_CJK_RE = re.compile(_CJK_COUNT_RE_TEMPLATE % AI_MIN_CJK_CHARS)
+
+    def __init__(
+        self,
+        ai_service: AIService = None,
+        ai_concurrency: Optional[int] = None,
+        ai_batch_size: Optional[int] = None
+    ):
         """
         Args:
             ai_service: AI服务（可选，如果不传将使用规则匹配）
+            ai_concurrency: 批量提取的最大并发数（可选，默认 AI_EXTRACT_CONCURRENCY）
+            ai_batch_size: 批量提取时每次AI请求合并的章节数（可选，默认 AI_EXTRACT_BATCH_SIZE，1 为逐章请求）
         """
         self.ai_service = ai_service
-        self._character_cache: Dict[str, List[Character]] = {}
-
-    async def _get_project_characters(self, project_id: str, db: AsyncSession) -> List[Character]:
-        """获取项目的所有角色（带缓存）"""
+        self.ai_concurrency = ai_concurrency or self.AI_EXTRACT_CONCURRENCY
+        self.ai_batch_size = max(1, ai_batch_size or self.AI_EXTRACT_BATCH_SIZE)
+        self._character_cache: Dict[str, CharacterIndex] = {}
+        # AI请求失败的章节（批量提取时不记录其内容哈希，下次仍会重新提取）
+        self._ai_failed_chapters: set = set()
+
+    async def _get_project_characters(self, project_id: str, db: AsyncSession) -> CharacterIndex:
+        """获取项目的所有角色索引（带缓存）"""
         if project_id in self._character_cache:
             return self._character_cache[project_id]
-        
+
         result = await db.execute(
             select(Character).where(
                 Character.project_id == project_id,
                 Character.is_organization == False
             )
         )
-        characters = result.scalars().all()
+        characters = CharacterIndex(result.scalars().all())
         self._character_cache[project_id] = characters
         return characters
 
-    def _find_matching_character(self, name: str, characters: List[Character]) -> Optional[Character]:
+    def _find_matching_character(self, name: str, characters: CharacterIndex) -> Optional[Character]:
         """在已有角色中查找匹配的角色"""
-        name = name.strip()
-        for char in characters:
-            # 精确匹配
-            if char.name == name:
-                return char
-            # 部分匹配（名字包含或被包含）
-            if len(name) >= 2 and (name in char.name or char.name in name):
-                return char
-        return None
+        return characters.find(name)
 
     async def extract_from_chapter(
         self,
@@ -150,21 +382,39 @@ class EntityExtractor:
             ai_model: AI模型
 
         Returns:
-            List[EntitySnapshot]: 提取的实体快照列表
+            List[EntitySnapshot]: 提取的实体快照列表（未加入会话）
         """
         if not chapter.content:
             return []
-
-        # 获取项目已有角色用于关联
         characters = await self._get_project_characters(chapter.project_id, db)
+        rows = await self._extract_chapter_rows(chapter, characters, ai_provider, ai_model)
+        return [EntitySnapshot(**row) for row in rows]
+
+    async def _extract_chapter_rows(
+        self,
+        chapter: Chapter,
+        characters: CharacterIndex,
+        ai_provider: str = None,
+        ai_model: str = None,
+        ai_snapshots: Optional[List[SnapshotRow]] = None
+    ) -> List[SnapshotRow]:
+        """提取单个章节的快照字段字典
+
+        characters: 项目已有角色索引（由调用方预先加载，提取过程不访问数据库会话）
+        ai_snapshots: 已通过多章合并请求得到的AI提取结果（可选，传入则不再单独请求AI）
+        """
+        if not chapter.content:
+            return []
 
-        ai_snapshots = []
         # 优先用AI提取
-        if self.ai_service:
-            ai_snapshots = await self._extract_with_ai(chapter, characters, ai_provider, ai_model)
+        if ai_snapshots is None:
+            ai_snapshots = []
+            if self._should_use_ai(chapter):
+                ai_snapshots = await self._extract_with_ai(chapter, characters, ai_provider, ai_model)
         
         # 总是运行规则提取（作为补充，特别是正则提取的喜好/厌恶）
-        rule_snapshots = await self._extract_with_rules(chapter, characters, db)
+        # 规则提取为纯 CPU 计算，放到线程中执行，避免阻塞事件循环上其他章节的AI请求
+        rule_snapshots = await asyncio.to_thread(self._extract_with_rules, chapter, characters)
         
         # 合并结果（简单去重）
         final_snapshots = ai_snapshots.copy()
@@ -173,14 +423,14 @@ class EntityExtractor:
         # 记录 AI 提取的 key
         for s in ai_snapshots:
             # 归一化 value 避免微小差异导致的重复
-            val = str(s.property_value).strip().lower()
-            key = f"{s.entity_id}:{s.property_name}:{val}"
+            val = str(s["property_value"]).strip().lower()
+            key = f"{s['entity_id']}:{s['property_name']}:{val}"
             existing_keys.add(key)
             
         # 合并规则提取的 key
         for s in rule_snapshots:
-            val = str(s.property_value).strip().lower()
-            key = f"{s.entity_id}:{s.property_name}:{val}"
+            val = str(s["property_value"]).strip().lower()
+            key = f"{s['entity_id']}:{s['property_name']}:{val}"
             
             # 如果 AI 没提取过这个属性值，或者属性名完全不同（如 likes vs 喜好）
             # 注意：如果 AI 提取了 "喜好:苹果"，规则提取了 "likes:苹果"，我们希望都保留？
@@ -194,17 +444,30 @@ class EntityExtractor:
                 
         return final_snapshots
 
+    def _should_use_ai(self, chapter: Chapter) -> bool:
+        """是否对该章节请求AI提取：需要配置AI服务，且章节为有一定长度的正文"""
+        content = chapter.content
+        return (
+            self.ai_service is not None
+            and content is not None
+            and len(content) >= self.AI_MIN_CONTENT_CHARS
+            and self._AI_CJK_RE.match(content) is not None
+        )
+
+    def _ai_content(self, chapter: Chapter) -> str:
+        """截取送给AI的章节内容"""
+        return chapter.content[:self.AI_CONTENT_MAX_CHARS]
+
     async def _extract_with_ai(
         self,
         chapter: Chapter,
-        characters: List[Character],
+        characters: CharacterIndex,
         ai_provider: str = None,
         ai_model: str = None
-    ) -> List[EntitySnapshot]:
+    ) -> List[SnapshotRow]:
         """使用AI提取实体"""
         # 构建已有角色列表供AI参考
-        char_names = [c.name for c in characters]
-        char_list_str = "、".join(char_names) if char_names else "（暂无已定义角色）"
+        char_list_str = characters.prompt_names
 
         prompt = f"""分析以下小说章节，提取所有角色、地点、物品的属性设定。
 
@@ -212,34 +475,9 @@ class EntityExtractor:
 
 章节标题：{chapter.title}
 章节内容：
-{chapter.content[:3000]}
-
-请提取以下类型的设定信息，并区分属性层级：
-1. 角色属性：年龄、性别、外貌、性格、能力、当前身份(Identity)、出身背景(Background)、状态变化、喜好、厌恶、习惯
-2. 地点信息：地点名称、位置描述、特征
-3. 物品设定：物品名称、功能、归属
-4. 世界规则：法则、制度、限制
-
-属性层级说明：
-- Intrinsic: 固有设定/真相（如：他是穿越者，真实性别）
-- Appearance: 外在表象/伪装（如：看着像乞丐，化名，易容）
-- Evaluation: 他人评价/主观认知（如：村民觉得他是神仙，反派认为他是垃圾）
-
-特别注意：
-- 穿越/重生前的身份（如：大学生、特种兵、现代人）请归类为 "background" (出身背景)。
-- 当前世界的身份（如：王妃、宗主、废柴）请归类为 "identity" (当前身份)。
-
-请用JSON格式返回，每个设定包含：
-- type: "character"/"location"/"item"/"rule"
-- name: 实体名称
-- property: 属性名
-- value: 属性值
-- layer: "Intrinsic"/"Appearance"/"Evaluation" (默认 Intrinsic)
-- source_type: "Narrator"(旁白) 或 "Character"(特定角色名)
-- quote: 原文引用
-- confidence: 置信度(0-1)
+{self._ai_content(chapter)}
 
-返回格式：
+{_AI_EXTRACT_GUIDE}返回格式：
 ```json
 [
   {{"type": "character", "name": "秦晚晚", "property": "background", "value": "刚毕业的大学生", "layer": "Intrinsic", "source_type": "Narrator", "quote": "穿越前只是个刚毕业的大学生", "confidence": 0.9}},
@@ -265,50 +503,126 @@ class EntityExtractor:
                 content = str(result)
 
             entities_data = self._parse_ai_response(content)
-            snapshots = []
-
-            for entity_data in entities_data:
-                entity_name = entity_data.get("name", "")
-                entity_type = entity_data.get("type", "character")
-                
-                # 尝试关联已有角色
-                matched_char = None
-                if entity_type == "character":
-                    matched_char = self._find_matching_character(entity_name, characters)
-                
-                entity_id = matched_char.id if matched_char else f"{entity_type}_{entity_name}"
-                
-                snapshot = EntitySnapshot(
-                    project_id=chapter.project_id,
-                    entity_type=entity_type,
-                    entity_id=entity_id,
-                    entity_name=matched_char.name if matched_char else entity_name,
-                    property_name=entity_data.get("property", "description"),
-                    property_value=self._format_value(entity_data.get("value", "")),
-                    property_type=self._detect_type(entity_data.get("value", "")),
-                    layer=entity_data.get("layer", "Intrinsic"),
-                    source_type=entity_data.get("source_type", "Narrator"),
-                    source_chapter_id=chapter.id,
-                    source_quote=entity_data.get("quote", "")[:200],
-                    source_context="",
-                    confidence=float(entity_data.get("confidence", 0.8)),
-                    ai_model=ai_model or "default"
-                )
-                snapshots.append(snapshot)
+            snapshots = self._build_ai_snapshots(chapter, entities_data, characters, ai_model)
 
             logger.info(f"AI提取实体: chapter_id={chapter.id}, count={len(snapshots)}")
             return snapshots
 
         except Exception as e:
             logger.error(f"AI提取实体失败: {str(e)}")
+            self._ai_failed_chapters.add(chapter.id)
             return []
 
-    async def _extract_with_rules(
-        self, 
-        chapter: Chapter, 
-        characters: List[Character],
-        db: AsyncSession
-    ) -> List[EntitySnapshot]:
+    async def _extract_with_ai_batch(
+        self,
+        chapters: List[Chapter],
+        characters: CharacterIndex,
+        ai_provider: str = None,
+        ai_model: str = None
+    ) -> Dict[str, List[SnapshotRow]]:
+        """一次AI请求提取多个章节的实体，返回 {章节ID: 快照列表}
+
+        请求失败或某章节结果缺失/无法解析时，该章节不出现在返回值中，由调用方逐章补提
+        """
+        char_list_str = characters.prompt_names
+
+        chapter_sections = "\n\n".join(
+            f"【章节 {index}】\n章节标题：{chapter.title}\n章节内容：\n{self._ai_content(chapter)}"
+            for index, chapter in enumerate(chapters, 1)
+        )
+
+        prompt = f"""分析以下 {len(chapters)} 个小说章节，分别提取每个章节中所有角色、地点、物品的属性设定。
+
+已定义的角色列表：{char_list_str}
+
+{chapter_sections}
+
+{_AI_EXTRACT_GUIDE}返回格式（以章节序号为键，每个章节的设定数组为值，每个章节都必须出现，没有设定时为空数组 []）：
+```json
+{{
+  "1": [
+    {{"type": "character", "name": "秦晚晚", "property": "identity", "value": "王妃", "layer": "Intrinsic", "source_type": "Narrator", "quote": "如今却是这王府的女主人", "confidence": 0.9}}
+  ],
+  "2": []
+}}
+```
+
+只返回JSON对象，不要其他说明。"""
+
+        try:
+            result = await self.ai_service.generate_text(
+                prompt=prompt,
+                provider=ai_provider,
+                model=ai_model,
+                temperature=0.3
+            )
+            content = result.get("content", "") if isinstance(result, dict) else str(result)
+            chapters_data = self._parse_ai_batch_response(content)
+        except Exception as e:
+            logger.error(f"AI批量提取实体失败: chapters={len(chapters)}, error={str(e)}")
+            return {}
+
+        snapshots_by_chapter = {}
+        for index, chapter in enumerate(chapters, 1):
+            entities_data = chapters_data.get(str(index))
+            if not isinstance(entities_data, list):
+                continue
+            try:
+                snapshots_by_chapter[chapter.id] = self._build_ai_snapshots(
+                    chapter, entities_data, characters, ai_model
+                )
+            except Exception as e:
+                logger.error(f"AI批量提取结果解析失败: chapter_id={chapter.id}, error={str(e)}")
+
+        logger.info(f"AI批量提取实体: chapters={len(chapters)}, 成功={len(snapshots_by_chapter)}")
+        return snapshots_by_chapter
+
+    def _build_ai_snapshots(
+        self,
+        chapter: Chapter,
+        entities_data: List[Dict[str, Any]],
+        characters: CharacterIndex,
+        ai_model: str = None
+    ) -> List[SnapshotRow]:
+        """将AI返回的设定列表转换为实体快照"""
+        snapshots = []
+
+        for entity_data in entities_data:
+            entity_name = entity_data.get("name", "")
+            entity_type = entity_data.get("type", "character")
+            
+            # 尝试关联已有角色
+            matched_char = None
+            if entity_type == "character":
+                matched_char = self._find_matching_character(entity_name, characters)
+            
+            entity_id = matched_char.id if matched_char else f"{entity_type}_{entity_name}"
+            
+            snapshot = {
+                "project_id": chapter.project_id,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "entity_name": matched_char.name if matched_char else entity_name,
+                "property_name": entity_data.get("property", "description"),
+                "property_value": self._format_value(entity_data.get("value", "")),
+                "property_type": self._detect_type(entity_data.get("value", "")),
+                "layer": entity_data.get("layer", "Intrinsic"),
+                "source_type": entity_data.get("source_type", "Narrator"),
+                "source_chapter_id": chapter.id,
+                "source_quote": entity_data.get("quote", "")[:200],
+                "source_context": "",
+                "confidence": float(entity_data.get("confidence", 0.8)),
+                "ai_model": ai_model or "default",
+            }
+            snapshots.append(snapshot)
+
+        return snapshots
+
+    def _extract_with_rules(
+        self,
+        chapter: Chapter,
+        characters: CharacterIndex
+    ) -> List[SnapshotRow]:
         """使用规则匹配提取实体（降级方案）"""
         snapshots = []
         seen_entities = set()  # 用于去重
@@ -331,27 +645,23 @@ class EntityExtractor:
     def _extract_character_attrs(
         self, 
         chapter: Chapter, 
-        characters: List[Character],
+        characters: CharacterIndex,
         seen: set
-    ) -> List[EntitySnapshot]:
+    ) -> List[SnapshotRow]:
         """提取角色属性"""
         snapshots = []
         content = chapter.content
-
-        # 年龄模式（增强版）
-        age_patterns = [
-            # 阿拉伯数字: 小明20岁、今年20岁的小明
-            (r'([\u4e00-\u9fa5]{2,4})(\d{1,3})岁', lambda m: (m.group(1), m.group(2))),
-            (r'(\d{1,3})岁的([\u4e00-\u9fa5]{2,4})', lambda m: (m.group(2), m.group(1))),
-            # 中文数字: 二十岁、二十多岁
-            (r'([\u4e00-\u9fa5]{2,4})[今年是有]?([零一二两三四五六七八九十百]+)多?岁', 
-             lambda m: (m.group(1), chinese_to_number(m.group(2)))),
-            (r'([零一二两三四五六七八九十百]+)多?岁的([\u4e00-\u9fa5]{2,4})',
-             lambda m: (m.group(2), chinese_to_number(m.group(1)))),
-        ]
-
-        for pattern, extractor in age_patterns:
-            for match in re.finditer(pattern, content):
+        # 循环中反复用到的值先绑定为局部变量
+        project_id = chapter.project_id
+        chapter_id = chapter.id
+        find_character = self._find_matching_character
+        append = snapshots.append
+
+        # 年龄
+        for keywords, pattern, extractor in _AGE_PATTERNS:
+            if not contains_any(content, keywords):
+                continue
+            for match in pattern.finditer(content):
                 try:
                     name, age = extractor(match)
                     if age is None:
@@ -365,42 +675,37 @@ class EntityExtractor:
                     seen.add(key)
                     
                     # 尝试匹配已有角色
-                    matched_char = self._find_matching_character(name, characters)
+                    matched_char = find_character(name, characters)
                     entity_id = matched_char.id if matched_char else f"char_{name}"
                     entity_name = matched_char.name if matched_char else name
                     
                     # 判断置信度
                     _, confidence = normalize_age_value(match.group(0))
                     
-                    snapshot = EntitySnapshot(
-                        project_id=chapter.project_id,
-                        entity_type="character",
-                        entity_id=entity_id,
-                        entity_name=entity_name,
-                        property_name="age",
-                        property_value=age,
-                        property_type="number",
-                        source_chapter_id=chapter.id,
-                        source_quote=match.group(0),
-                        source_context=content[max(0, match.start()-30):min(len(content), match.end()+30)],
-                        confidence=confidence,
-                        ai_model="rule_based"
-                    )
-                    snapshots.append(snapshot)
+                    snapshot = {
+                        "project_id": project_id,
+                        "entity_type": "character",
+                        "entity_id": entity_id,
+                        "entity_name": entity_name,
+                        "property_name": "age",
+                        "property_value": age,
+                        "property_type": "number",
+                        "source_chapter_id": chapter_id,
+                        "source_quote": match.group(0),
+                        "source_context": content[max(0, match.start()-30):match.end()+30],
+                        "confidence": confidence,
+                        "ai_model": "rule_based",
+                    }
+                    append(snapshot)
                 except Exception as e:
                     logger.debug(f"解析年龄失败: {e}")
                     continue
 
-        # 性别模式（增强版）
-        gender_patterns = [
-            (r'([\u4e00-\u9fa5]{2,4})是[个一位名]?(男|女)[性人子的]', lambda m: (m.group(1), m.group(2))),
-            (r'(男|女)[主人]角([\u4e00-\u9fa5]{2,4})', lambda m: (m.group(2), m.group(1))),
-            (r'([\u4e00-\u9fa5]{2,4})[,，]?[这那]个?(男|女)孩', lambda m: (m.group(1), m.group(2))),
-            (r'(他|她)叫([\u4e00-\u9fa5]{2,4})', lambda m: (m.group(2), "男" if m.group(1) == "他" else "女")),
-        ]
-
-        for pattern, extractor in gender_patterns:
-            for match in re.finditer(pattern, content):
+        # 性别
+        for keywords, pattern, extractor in _GENDER_PATTERNS:
+            if not contains_any(content, keywords):
+                continue
+            for match in pattern.finditer(content):
                 try:
                     name, gender = extractor(match)
                     
@@ -409,25 +714,25 @@ class EntityExtractor:
                         continue
                     seen.add(key)
                     
-                    matched_char = self._find_matching_character(name, characters)
+                    matched_char = find_character(name, characters)
                     entity_id = matched_char.id if matched_char else f"char_{name}"
                     entity_name = matched_char.name if matched_char else name
                     
-                    snapshot = EntitySnapshot(
-                        project_id=chapter.project_id,
-                        entity_type="character",
-                        entity_id=entity_id,
-                        entity_name=entity_name,
-                        property_name="gender",
-                        property_value=gender,
-                        property_type="string",
-                        source_chapter_id=chapter.id,
-                        source_quote=match.group(0),
-                        source_context=content[max(0, match.start()-20):min(len(content), match.end()+20)],
-                        confidence=0.7,
-                        ai_model="rule_based"
-                    )
-                    snapshots.append(snapshot)
+                    snapshot = {
+                        "project_id": project_id,
+                        "entity_type": "character",
+                        "entity_id": entity_id,
+                        "entity_name": entity_name,
+                        "property_name": "gender",
+                        "property_value": gender,
+                        "property_type": "string",
+                        "source_chapter_id": chapter_id,
+                        "source_quote": match.group(0),
+                        "source_context": content[max(0, match.start()-20):match.end()+20],
+                        "confidence": 0.7,
+                        "ai_model": "rule_based",
+                    }
+                    append(snapshot)
                 except Exception:
                     continue
 
@@ -436,22 +741,22 @@ class EntityExtractor:
     def _extract_preferences(
         self, 
         chapter: Chapter, 
-        characters: List[Character],
+        characters: CharacterIndex,
         seen: set
-    ) -> List[EntitySnapshot]:
+    ) -> List[SnapshotRow]:
         """提取角色喜好/厌恶 (正则增强)"""
         snapshots = []
         content = chapter.content
+        # 循环中反复用到的值先绑定为局部变量
+        project_id = chapter.project_id
+        chapter_id = chapter.id
+        find_character = self._find_matching_character
+        append = snapshots.append
         
-        # 喜好模式
-        # 例如: "张三最喜欢吃苹果", "李四讨厌下雨"
-        pref_patterns = [
-            (r'([\u4e00-\u9fa5]{2,4})(?:最?喜欢|最?爱|沉迷|钟爱)(?:吃|喝|玩|看)?([\u4e00-\u9fa5]{2,10})', "like"),
-            (r'([\u4e00-\u9fa5]{2,4})(?:最?讨厌|最?恨|厌恶|反感)(?:吃|喝|玩|看)?([\u4e00-\u9fa5]{2,10})', "dislike"),
-        ]
-
-        for pattern, pref_type in pref_patterns:
-            for match in re.finditer(pattern, content):
+        for keywords, pattern, pref_type in _PREFERENCE_PATTERNS:
+            if not contains_any(content, keywords):
+                continue
+            for match in pattern.finditer(content):
                 try:
                     name = match.group(1)
                     item = match.group(2)
@@ -460,7 +765,7 @@ class EntityExtractor:
                     if any(w in name for w in ['什么', '这个', '那个', '因为', '所以']):
                         continue
                     
-                    matched_char = self._find_matching_character(name, characters)
+                    matched_char = find_character(name, characters)
                     entity_id = matched_char.id if matched_char else f"char_{name}"
                     entity_name = matched_char.name if matched_char else name
                     
@@ -471,88 +776,80 @@ class EntityExtractor:
                         continue
                     seen.add(key)
                     
-                    snapshot = EntitySnapshot(
-                        project_id=chapter.project_id,
-                        entity_type="character",
-                        entity_id=entity_id,
-                        entity_name=entity_name,
-                        property_name=prop_name,
-                        property_value=item,
-                        property_type="string",
-                        layer="Intrinsic", # 默认为固有设定
-                        source_type="Narrator",
-                        source_chapter_id=chapter.id,
-                        source_quote=match.group(0),
-                        source_context=content[max(0, match.start()-20):min(len(content), match.end()+20)],
-                        confidence=0.6, # 正则提取置信度适中
-                        ai_model="rule_based"
-                    )
-                    snapshots.append(snapshot)
+                    snapshot = {
+                        "project_id": project_id,
+                        "entity_type": "character",
+                        "entity_id": entity_id,
+                        "entity_name": entity_name,
+                        "property_name": prop_name,
+                        "property_value": item,
+                        "property_type": "string",
+                        "layer": "Intrinsic", # 默认为固有设定
+                        "source_type": "Narrator",
+                        "source_chapter_id": chapter_id,
+                        "source_quote": match.group(0),
+                        "source_context": content[max(0, match.start()-20):match.end()+20],
+                        "confidence": 0.6, # 正则提取置信度适中
+                        "ai_model": "rule_based",
+                    }
+                    append(snapshot)
                 except Exception:
                     continue
                     
         return snapshots
 
-    def _extract_locations(self, chapter: Chapter, seen: set) -> List[EntitySnapshot]:
+    def _extract_locations(self, chapter: Chapter, seen: set) -> List[SnapshotRow]:
         """提取地点信息"""
         snapshots = []
         content = chapter.content
+        # 循环中反复用到的值先绑定为局部变量
+        project_id = chapter.project_id
+        chapter_id = chapter.id
+        append = snapshots.append
 
-        # 地点后缀（扩展）
-        location_suffixes = [
-            "村", "镇", "城", "市", "省", "国", "州", "府", "县",
-            "森林", "山", "山脉", "河", "河流", "湖", "海", "岛", "洲",
-            "堡", "殿", "宫", "府", "阁", "楼", "塔", "庙", "寺", "观",
-            "学院", "学校", "宗门", "门派", "帮", "会", "盟",
-            "谷", "洞", "穴", "崖", "峰", "岭"
-        ]
-
-        for suffix in location_suffixes:
-            pattern = rf'([\u4e00-\u9fa5]{{2,6}}{suffix})'
-            for match in re.finditer(pattern, content):
-                location_name = match.group(1)
-                
-                # 过滤常见非地点词
-                if any(w in location_name for w in ['什么', '这个', '那个', '一个']):
-                    continue
-                
-                key = f"loc_{location_name}:name"
-                if key in seen:
-                    continue
-                seen.add(key)
-
-                snapshot = EntitySnapshot(
-                    project_id=chapter.project_id,
-                    entity_type="location",
-                    entity_id=f"loc_{location_name}",
-                    entity_name=location_name,
-                    property_name="name",
-                    property_value=location_name,
-                    property_type="string",
-                    source_chapter_id=chapter.id,
-                    source_quote=location_name,
-                    source_context=content[max(0, match.start()-30):min(len(content), match.end()+30)],
-                    confidence=0.6,
-                    ai_model="rule_based"
-                )
-                snapshots.append(snapshot)
+        for match in _LOCATION_RE.finditer(content):
+            location_name = match.group(1)
+            
+            # 过滤常见非地点词
+            if any(w in location_name for w in ['什么', '这个', '那个', '一个']):
+                continue
+            
+            key = f"loc_{location_name}:name"
+            if key in seen:
+                continue
+            seen.add(key)
+
+            snapshot = {
+                "project_id": project_id,
+                "entity_type": "location",
+                "entity_id": f"loc_{location_name}",
+                "entity_name": location_name,
+                "property_name": "name",
+                "property_value": location_name,
+                "property_type": "string",
+                "source_chapter_id": chapter_id,
+                "source_quote": location_name,
+                "source_context": content[max(0, match.start()-30):match.end()+30],
+                "confidence": 0.6,
+                "ai_model": "rule_based",
+            }
+            append(snapshot)
 
         return snapshots
 
-    def _extract_rules(self, chapter: Chapter, seen: set) -> List[EntitySnapshot]:
+    def _extract_rules(self, chapter: Chapter, seen: set) -> List[SnapshotRow]:
         """提取世界观规则"""
         snapshots = []
         content = chapter.content
-
-        # 规则模式（增强）
-        rule_patterns = [
-            r'([\u4e00-\u9fa5]{2,20}(?:规则|法则|定律|禁忌|铁律))',
-            r'((?:修炼|晋级|突破)[\u4e00-\u9fa5]{2,30})',
-            r'([\u4e00-\u9fa5]{2,10}境界[\u4e00-\u9fa5]{0,20})',
-        ]
-
-        for pattern in rule_patterns:
-            for match in re.finditer(pattern, content):
+        # 循环中反复用到的值先绑定为局部变量
+        project_id = chapter.project_id
+        chapter_id = chapter.id
+        append = snapshots.append
+
+        for keywords, pattern in _RULE_PATTERNS:
+            if not contains_any(content, keywords):
+                continue
+            for match in pattern.finditer(content):
                 rule_text = match.group(1).strip()
                 
                 if len(rule_text) < 4:
@@ -563,50 +860,52 @@ class EntityExtractor:
                     continue
                 seen.add(key)
 
-                snapshot = EntitySnapshot(
-                    project_id=chapter.project_id,
-                    entity_type="rule",
-                    entity_id=f"rule_{hash(rule_text) % 100000}",
-                    entity_name=rule_text[:50],
-                    property_name="description",
-                    property_value=rule_text,
-                    property_type="string",
-                    source_chapter_id=chapter.id,
-                    source_quote=rule_text[:100],
-                    source_context=content[max(0, match.start()-50):min(len(content), match.end()+50)],
-                    confidence=0.5,
-                    ai_model="rule_based"
-                )
-                snapshots.append(snapshot)
+                snapshot = {
+                    "project_id": project_id,
+                    "entity_type": "rule",
+                    "entity_id": rule_entity_id(rule_text),
+                    "entity_name": rule_text[:50],
+                    "property_name": "description",
+                    "property_value": rule_text,
+                    "property_type": "string",
+                    "source_chapter_id": chapter_id,
+                    "source_quote": rule_text[:100],
+                    "source_context": content[max(0, match.start()-50):match.end()+50],
+                    "confidence": 0.5,
+                    "ai_model": "rule_based",
+                }
+                append(snapshot)
 
         return snapshots
 
     def _parse_ai_response(self, response: str) -> List[Dict[str, Any]]:
-        """解析AI返回的JSON"""
-        try:
-            data = json.loads(response)
-            if isinstance(data, list):
-                return data
-            if isinstance(data, dict) and "entities" in data:
-                return data["entities"]
-        except json.JSONDecodeError:
-            pass
+        """解析AI返回的JSON (干净的 JSON 直接解析，只有失败时才扫描代码块/数组)"""
+        stripped = response.strip()
+        if stripped[:1] in ("[", "{"):
+            try:
+                data = json.loads(stripped)
+                if isinstance(data, list):
+                    return data
+                if isinstance(data, dict) and "entities" in data:
+                    return data["entities"]
+            except json.JSONDecodeError:
+                pass
 
         # 提取JSON代码块
-        code_block = re.search(r'```(?:json)?\s*([\[\{].*?[\]\}])\s*```', response, re.DOTALL)
+        code_block = extract_code_block(stripped)
         if code_block:
             try:
-                data = json.loads(code_block.group(1))
+                data = json.loads(code_block)
                 if isinstance(data, list):
                     return data
             except json.JSONDecodeError:
                 pass
-        
+
         # 尝试直接找数组
-        array_match = re.search(r'\[[\s\S]*\]', response)
-        if array_match:
+        array_text = find_balanced_array(stripped)
+        if array_text:
             try:
-                data = json.loads(array_match.group(0))
+                data = json.loads(array_text)
                 if isinstance(data, list):
                     return data
             except json.JSONDecodeError:
@@ -615,8 +914,31 @@ class EntityExtractor:
         logger.warning("无法解析AI响应格式")
         return []
 
+    def _parse_ai_batch_response(self, response: str) -> Dict[str, Any]:
+        """解析多章合并请求返回的JSON对象 {章节序号: 设定数组}，无法解析时返回空字典"""
+        candidates = [response]
+        code_block = extract_code_block(response)
+        if code_block:
+            candidates.append(code_block)
+        start, end = response.find("{"), response.rfind("}")
+        if 0 <= start < end:
+            candidates.append(response[start:end + 1])
+
+        for candidate in candidates:
+            try:
+                data = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                return data
+
+        logger.warning("无法解析AI批量响应格式")
+        return {}
+
     def _format_value(self, value: Any) -> str:
         """格式化属性值"""
+        if isinstance(value, str):
+            return value.strip()
         if isinstance(value, (dict, list)):
             return json.dumps(value, ensure_ascii=False)
         return str(value).strip()
@@ -630,12 +952,20 @@ class EntityExtractor:
         if isinstance(value, (dict, list)):
             return "json"
         # 尝试判断是否为数字字符串
+        text = value if isinstance(value, str) else str(value)
+        if text.isdecimal():
+            return "number"
+        # 不含数字的文本 (多数中文描述) 不必再让 float() 抛异常
+        if _HAS_DIGIT_RE.search(text) is None:
+            word = text.strip()
+            if word[:1] in ("+", "-"):
+                word = word[1:]
+            return "number" if word.lower() in _FLOAT_WORDS else "string"
         try:
-            float(str(value))
+            float(text)
             return "number"
         except ValueError:
-            pass
-        return "string"
+            return "string"
 
     async def batch_extract(
         self,
@@ -654,34 +984,89 @@ class EntityExtractor:
         project_id = chapters[0].project_id
 
         # 预加载角色数据
-        await self._get_project_characters(project_id, db)
-
-        # 预加载已存在的快照键（避免每次查询数据库）
-        existing_result = await db.execute(
-            select(
-                EntitySnapshot.entity_id,
-                EntitySnapshot.property_name,
-                EntitySnapshot.source_chapter_id
-            ).where(EntitySnapshot.project_id == project_id)
+        characters = await self._get_project_characters(project_id, db)
+
+        # 跳过内容哈希与上次提取时相同的章节（重新提取时不再重复调用AI）
+        extraction_mode = "ai" if self.ai_service else "rule_based"
+        content_hashes = {chapter.id: compute_content_hash(chapter.content) for chapter in chapters}
+        hash_result = await db.execute(
+            select(ChapterContentHash.chapter_id, ChapterContentHash.content_hash).where(
+                ChapterContentHash.project_id == project_id,
+                ChapterContentHash.extraction_mode == extraction_mode
+            )
         )
+        unchanged_ids = {
+            chapter_id
+            for chapter_id, content_hash in hash_result.tuples()
+            if content_hashes.get(chapter_id) == content_hash
+        }
+        if unchanged_ids:
+            chapters = [chapter for chapter in chapters if chapter.id not in unchanged_ids]
+            logger.info(f"跳过内容未变化的章节: {len(unchanged_ids)} 章")
+            if not chapters:
+                return 0, []
+
+        # 支持 ON CONFLICT 的数据库由唯一索引去重，无需预加载项目内全部快照键；
+        # 其他数据库仍在内存中检查已存在的快照
+        dialect_insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
         existing_keys = set()
-        for row in existing_result.all():
-            existing_keys.add(f"{row[0]}:{row[1]}:{row[2]}")
+        if dialect_insert is None:
+            existing_result = await db.execute(
+                select(
+                    EntitySnapshot.entity_id,
+                    EntitySnapshot.property_name,
+                    EntitySnapshot.source_chapter_id
+                ).where(EntitySnapshot.project_id == project_id)
+            )
+            existing_keys.update(existing_result.tuples().all())
 
         # 收集所有新快照
         all_new_snapshots = []
         
-        logger.info(f"开始批量提取: 共 {len(chapters)} 章, 已存在 {len(existing_keys)} 条记录")
+        logger.info(f"开始批量提取: 共 {len(chapters)} 章")
+
+        # 各组章节并发提取 (主要耗时在AI请求；角色已预加载，提取过程不再使用数据库会话)，
+        # 每组有内容的章节合并为一次AI请求，结果按章节顺序串行去重汇总
+        semaphore = asyncio.Semaphore(self.ai_concurrency)
+        batch_size = self.ai_batch_size if self.ai_service else 1
+
+        async def extract_group(group: List[Chapter]) -> List[Any]:
+            async with semaphore:
+                ai_results: Dict[str, List[SnapshotRow]] = {}
+                ai_chapters = [c for c in group if self._should_use_ai(c)]
+                if len(ai_chapters) > 1:
+                    ai_results = await self._extract_with_ai_batch(
+                        ai_chapters, characters, ai_provider, ai_model
+                    )
+
+                group_results = []
+                for chapter in group:
+                    try:
+                        group_results.append(await self._extract_chapter_rows(
+                            chapter, characters, ai_provider, ai_model,
+                            ai_snapshots=ai_results.get(chapter.id)
+                        ))
+                    except Exception as e:
+                        group_results.append(e)
+                return group_results
+
+        groups = [chapters[i:i + batch_size] for i in range(0, len(chapters), batch_size)]
+        results = [
+            result
+            for group_results in await asyncio.gather(*(extract_group(group) for group in groups))
+            for result in group_results
+        ]
 
-        for chapter in chapters:
+        for chapter, snapshots in zip(chapters, results):
             try:
-                snapshots = await self.extract_from_chapter(chapter, db, ai_provider, ai_model)
-                
+                if isinstance(snapshots, Exception):
+                    raise snapshots
+
                 new_count = 0
                 dup_count = 0
                 for snapshot in snapshots:
-                    # 内存中检查重复
-                    key = f"{snapshot.entity_id}:{snapshot.property_name}:{snapshot.source_chapter_id}"
+                    # 内存中检查重复（本次批量内 + 非 ON CONFLICT 数据库的已有记录）
+                    key = (snapshot["entity_id"], snapshot["property_name"], snapshot["source_chapter_id"])
                     if key not in existing_keys:
                         all_new_snapshots.append(snapshot)
                         existing_keys.add(key)  # 防止本次批量内重复
@@ -697,24 +1082,68 @@ class EntityExtractor:
 
         logger.info(f"提取汇总: 待保存 {len(all_new_snapshots)} 条新记录")
 
+        # 提取成功的章节记录内容哈希 (AI请求失败的章节不记录)
+        failed_ids = set(error_chapters) | self._ai_failed_chapters
+        self._ai_failed_chapters.difference_update(content_hashes)
+        hash_rows = [
+            {
+                "chapter_id": chapter.id,
+                "project_id": project_id,
+                "content_hash": content_hashes[chapter.id],
+                "extraction_mode": extraction_mode,
+            }
+            for chapter in chapters
+            if chapter.id not in failed_ids
+        ]
+
         # 批量保存
-        if all_new_snapshots:
-            try:
-                for snapshot in all_new_snapshots:
-                    db.add(snapshot)
-                await db.commit()
-                total_extracted = len(all_new_snapshots)
-                logger.info(f"批量保存完成: project_id={project_id}, total={total_extracted}")
-            except Exception as e:
-                logger.error(f"批量保存失败: {str(e)}", exc_info=True)
-                await db.rollback()
-                error_chapters.append("batch_save")
-                return 0, error_chapters
-        else:
-            logger.info("无新记录需要保存")
+        try:
+            if all_new_snapshots:
+                # 批量 INSERT (executemany)，不经过逐对象的 unit of work；
+                # 各行补全为相同的列集合，未赋值字段 (id 等) 取列默认值
+                rows = [snapshot_insert_row(snapshot) for snapshot in all_new_snapshots]
+                if dialect_insert is not None:
+                    stmt = dialect_insert(EntitySnapshot).on_conflict_do_nothing(
+                        index_elements=list(_SNAPSHOT_UNIQUE_KEYS)
+                    ).returning(EntitySnapshot.id)
+                    result = await db.execute(stmt, rows)
+                    total_extracted = len(result.all())
+                else:
+                    await db.execute(insert(EntitySnapshot), rows)
+                    total_extracted = len(rows)
+            else:
+                logger.info("无新记录需要保存")
+
+            if hash_rows:
+                await self._save_content_hashes(db, dialect_insert, hash_rows)
+            await db.commit()
+            logger.info(f"批量保存完成: project_id={project_id}, total={total_extracted}")
+        except Exception as e:
+            logger.error(f"批量保存失败: {str(e)}", exc_info=True)
+            await db.rollback()
+            error_chapters.append("batch_save")
+            return 0, error_chapters
 
         return total_extracted, error_chapters
 
+    @staticmethod
+    async def _save_content_hashes(db: AsyncSession, dialect_insert, rows: List[Dict[str, Any]]):
+        """写入章节内容哈希 (按 chapter_id upsert，不提交)"""
+        if dialect_insert is not None:
+            stmt = dialect_insert(ChapterContentHash)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ChapterContentHash.chapter_id],
+                set_={
+                    "content_hash": stmt.excluded.content_hash,
+                    "extraction_mode": stmt.excluded.extraction_mode,
+                    "updated_at": func.now(),
+                }
+            )
+            await db.execute(stmt, rows)
+        else:
+            for row in rows:
+                await db.merge(ChapterContentHash(**row))
+
     def clear_cache(self):
         """清除角色缓存"""
         self._character_cache.clear()
@@ -1,18 +1,39 @@
 """章节关系分析服务 - 分析章节之间的逻辑关系并构建图谱"""
+import asyncio
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import re
+from typing import List, Dict, Any, Optional, Tuple, Set, FrozenSet, Iterable, Callable
 from dataclasses import dataclass
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, insert, and_, or_
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.models_new import ChapterLink, ThinkingChain
 from app.models.chapter import Chapter
 from app.services.ai_service import AIService
 from app.logger import get_logger
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = get_logger(__name__)
 
+# 尝试导入jieba，如果失败则用中文二字组近似分词
+try:
+    import jieba
+    JIEBA_AVAILABLE = True
+    # 静默jieba的日志
+    jieba.setLogLevel(jieba.logging.INFO)
+except ImportError:
+    JIEBA_AVAILABLE = False
+    logger.warning("jieba未安装，章节内容指纹将使用中文二字组")
+
 # 关系类型定义
 LINK_TYPES = {
     "causality": {"name": "因果关系", "description": "前一章节的事件导致后续章节的结果"},
@@ -23,8 +44,207 @@ LINK_TYPES = {
     "continuation": {"name": "承上启下", "description": "自然的故事延续"}
 }
 
+# 关系类型 -> 显示名称
+_LINK_TYPE_NAMES = {link_type: info["name"] for link_type, info in LINK_TYPES.items()}
+
+def _json_dumps(obj: Any) -> str:
+    """序列化为 JSON 文本 (保留中文)，orjson 不支持的对象回退到标准库"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _json_loads(text: str) -> Any:
+    """解析 JSON 文本，orjson 不接受的写法 (如 NaN) 回退到标准库"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(text)
+        except ValueError:
+            pass
+    return json.loads(text)
+
+
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]{2,}")
+
+# 内容指纹不计入的常见词：代词、虚词、常用动词等几乎每章都会出现，
+# 计入重叠只会让篇幅长的章节得分更高，而不能说明两章内容相关
+_FINGERPRINT_STOPWORDS = frozenset((
+    "他们", "她们", "我们", "你们", "它们", "咱们", "自己", "别人", "大家", "人家",
+    "一个", "一些", "一样", "一下", "一点", "一直", "一起", "一边", "一切", "这个", "那个",
+    "这些", "那些", "这样", "那样", "这么", "那么", "这里", "那里", "这时", "那时", "这种", "那种",
+    "什么", "怎么", "怎样", "为什么", "哪里", "如何", "多少",
+    "没有", "不是", "就是", "只是", "还是", "也是", "都是", "可是", "但是", "然而", "而且",
+    "因为", "所以", "如果", "虽然", "不过", "于是", "然后", "或者", "只有", "只要", "已经",
+    "知道", "觉得", "看到", "看着", "听到", "说道", "说话", "开始", "出来", "起来", "下来",
+    "过来", "过去", "回来", "上去", "下去", "进来", "出去", "时候", "现在", "刚才", "之后",
+    "之前", "以后", "以前", "一时", "不会", "不能", "可以", "应该", "需要", "可能", "终于",
+    "还有", "非常", "有些", "有点", "似乎", "仿佛", "突然", "忽然", "微微", "淡淡",
+))
+
+
+def _bigram_fingerprint(text: str) -> FrozenSet[str]:
+    """文本的中文二字组集合，用交集大小廉价估计两段文本的内容重叠 (jieba 不可用时使用)"""
+    return frozenset(
+        bigram
+        for run in _CJK_RUN_RE.findall(text)
+        for bigram in (run[i:i + 2] for i in range(len(run) - 1))
+        if bigram not in _FINGERPRINT_STOPWORDS
+    )
+
+
+def _content_fingerprint(text: Optional[str], tokens: Optional[List[str]] = None) -> FrozenSet[str]:
+    """章节内容指纹：全文 jieba 分词后，保留不在停用词表中的中文词 (至少两个字)
+
+    两章指纹的交集大小用于廉价估计内容重叠；tokens 为已有的分词结果 (可选)，
+    jieba 不可用时退回中文二字组
+    """
+    if not text:
+        return frozenset()
+    if not JIEBA_AVAILABLE:
+        return _bigram_fingerprint(text)
+    if tokens is None:
+        tokens = jieba.lcut(text)
+    return frozenset(
+        word for word in tokens
+        if len(word) >= 2 and word not in _FINGERPRINT_STOPWORDS and _CJK_RUN_RE.fullmatch(word)
+    )
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+# AI分析提示词中按分析场景给出的提示
+_CONTEXT_HINTS = {
+    "adjacent": "这是两个相邻的章节，请分析它们之间的延续和发展关系。",
+    "foreshadowing": "请特别关注是否存在伏笔埋设和回收的关系。",
+    "contrast": "请特别关注是否存在对比、冲突或反转的关系。",
+    "general": "请综合分析这两个章节之间可能存在的关系。"
+}
+
+_ANALYSIS_PROMPT_TEMPLATE = """分析以下两个小说章节之间的关系。
+
+{hint}
+
+【第{number_a}章：{title_a}】
+{content_a}
+
+【第{number_b}章：{title_b}】
+{content_b}
+
+请分析这两个章节之间的关系，并返回JSON格式结果：
+
+关系类型说明：
+- causality: 因果关系（前一章事件导致后续结果）
+- foreshadowing: 伏笔埋设（前一章埋下伏笔，后续回收）
+- callback: 伏笔回收（后续章节回收之前的伏笔）
+- parallel: 平行叙事（同时发生的不同事件）
+- contrast: 对比冲突（形成对比或冲突）
+- continuation: 承上启下（自然延续）
+- none: 无明显关系
 
-@dataclass
+请用JSON格式返回：
+```json
+{{
+  "link_type": "关系类型",
+  "description": "关系描述（一句话）",
+  "from_element": "前一章的关键元素",
+  "to_element": "后一章的对应元素",
+  "reasoning_chain": {{
+    "observation": "观察到的现象",
+    "analysis": "分析推理",
+    "conclusion": "得出的结论"
+  }},
+  "strength": 0.7,
+  "importance_score": 70,
+  "confidence": 0.8
+}}
+```
+
+只返回JSON，不要其他说明。如果没有明显关系，link_type设为"none"。"""
+
+# 支持 ON CONFLICT 的方言：重复关系交给唯一索引 uq_chapter_link 去重
+_DIALECT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+_LINK_UNIQUE_KEYS = ("project_id", "from_chapter_id", "to_chapter_id", "link_type")
+# 插入时显式写入的列 (created_at/updated_at 由数据库默认值填充)
+_LINK_INSERT_COLUMNS = tuple(c for c in ChapterLink.__table__.columns if c.server_default is None)
+
+
+def _link_row(link: ChapterLink) -> Dict[str, Any]:
+    """将未保存的 ChapterLink 对象转为插入用字段字典，未赋值的字段取列的默认值"""
+    row = {}
+    for column in _LINK_INSERT_COLUMNS:
+        value = getattr(link, column.key)
+        if value is None and column.default is not None:
+            value = column.default.arg(None) if column.default.is_callable else column.default.arg
+        row[column.key] = value
+    return row
+
+
+def _keyword_regex(word: str, exclusions: Iterable[str] = ()) -> str:
+    """关键词的正则片段；关键词作为排除词 (包含该关键词的复合词) 的一部分出现时不算命中"""
+    guards = []
+    for compound in exclusions:
+        offset = compound.find(word)
+        if offset < 0:
+            continue
+        prefix = compound[:offset]
+        rest = re.escape(compound[offset:])
+        # 不允许 "前面是 prefix 且后面接着 word+suffix"
+        guards.append(f"(?!(?<={re.escape(prefix)}){rest})" if prefix else f"(?!{rest})")
+    return "".join(guards) + re.escape(word)
+
+
+class _KeywordScanner:
+    """多类关键词扫描器 - 一次线性扫描得到文本命中的全部关键词类别
+
+    所有类别的关键词按长度降序编译为一个零宽前瞻交替式，在每个位置尝试匹配，
+    因此相互重叠的关键词不会被漏掉；与较长词同起点的短词，其类别已并入较长词的类别
+    (带排除词的关键词除外，它们需要各自检查上下文)。
+    """
+
+    __slots__ = ("_pattern", "_tags", "_category_count")
+
+    def __init__(
+        self,
+        categories: Dict[str, List[str]],
+        exclusions: Optional[Dict[str, Iterable[str]]] = None
+    ):
+        exclusions = exclusions or {}
+        words = sorted({kw for kws in categories.values() for kw in kws if kw}, key=len, reverse=True)
+        self._tags: Dict[str, FrozenSet[str]] = {
+            word: frozenset(
+                category for category, kws in categories.items()
+                if any(kw and word.startswith(kw) and (kw == word or kw not in exclusions) for kw in kws)
+            )
+            for word in words
+        }
+        self._category_count = len(categories)
+        self._pattern = re.compile(
+            "(?=(%s))" % "|".join(_keyword_regex(word, exclusions.get(word, ())) for word in words)
+        ) if words else None
+
+    def scan(self, text: Optional[str]) -> Set[str]:
+        """返回文本中出现过的关键词类别集合"""
+        hits: Set[str] = set()
+        if self._pattern is None or not text:
+            return hits
+        for match in self._pattern.finditer(text):
+            hits |= self._tags[match.group(1)]
+            if len(hits) == self._category_count:
+                break
+        return hits
+
+    def search(self, text: Optional[str]) -> bool:
+        """文本中是否出现任一关键词"""
+        return bool(self.scan(text))
+
+
+@dataclass(slots=True)
 class LinkAnalysis:
     """关系分析结果"""
     from_chapter_id: str
@@ -36,6 +256,21 @@ class LinkAnalysis:
     importance_score: float
 
 
+@dataclass(slots=True)
+class ChapterRow:
+    """关系分析使用的轻量章节记录
+
+    content 只保留提示词所需的开头片段，全文在读取时已完成关键词扫描；
+    fingerprint 为全文的内容指纹 (仅在使用AI分析时计算，供伏笔候选预筛选)
+    """
+    id: str
+    project_id: str
+    chapter_number: int
+    title: Optional[str]
+    content: str
+    fingerprint: FrozenSet[str] = frozenset()
+
+
 class LinkAnalyzer:
     """章节关系分析器 - 分析章节之间的逻辑关系"""
 
@@ -57,8 +292,52 @@ class LinkAnalyzer:
         "但是", "然而", "却", "相反", "截然不同"
     ]
 
-    def __init__(self, ai_service: AIService = None):
+    # 冲突关键词整词判断用的集合 (jieba 可用时与章节分词结果求交)
+    CONFLICT_KEYWORD_SET = frozenset(CONFLICT_KEYWORDS)
+
+    # jieba 不可用时的回退：单字关键词在这些复合词中不表示转折/冲突，不算命中 (如 "退却" 中的 "却")
+    KEYWORD_EXCLUSIONS = {
+        "却": ("退却", "冷却", "忘却", "推却", "了却", "却步")
+    }
+
+    # jieba 不可用时三类关键词共用一个扫描器，每章只需扫描一遍
+    _KEYWORD_SCANNER = _KeywordScanner({
+        "foreshadowing": FORESHADOWING_KEYWORDS,
+        "callback": CALLBACK_KEYWORDS,
+        "conflict": CONFLICT_KEYWORDS
+    }, KEYWORD_EXCLUSIONS)
+
+    # jieba 可用时冲突关键词按分词结果判断，正则扫描器只负责伏笔与回收两类
+    _CUE_KEYWORD_SCANNER = _KeywordScanner({
+        "foreshadowing": FORESHADOWING_KEYWORDS,
+        "callback": CALLBACK_KEYWORDS
+    }, KEYWORD_EXCLUSIONS)
+
+    # 只需判断单一类别时使用的预编译匹配器，命中第一个关键词即返回
+    _FORESHADOWING_MATCHER = _KeywordScanner({"foreshadowing": FORESHADOWING_KEYWORDS}, KEYWORD_EXCLUSIONS)
+    _CALLBACK_MATCHER = _KeywordScanner({"callback": CALLBACK_KEYWORDS}, KEYWORD_EXCLUSIONS)
+    _CONFLICT_MATCHER = _KeywordScanner({"conflict": CONFLICT_KEYWORDS}, KEYWORD_EXCLUSIONS)
+
+    # 同时进行的AI分析请求数量
+    AI_ANALYZE_CONCURRENCY = 8
+
+    # 提示词中每章截取的正文长度
+    PROMPT_CONTENT_MAX_CHARS = 1500
+
+    # 流式读取章节时每批的行数
+    CHAPTER_FETCH_BATCH_SIZE = 50
+
+    # 每个伏笔章节只把内容重叠度最高的前 N 个回收候选章节交给AI分析
+    FORESHADOWING_AI_TOP_K = 3
+
+    def __init__(self, ai_service: AIService = None, ai_concurrency: Optional[int] = None):
+        """
+        Args:
+            ai_service: AI服务（可选，不传则使用规则分析）
+            ai_concurrency: AI分析的最大并发请求数（可选，默认 AI_ANALYZE_CONCURRENCY）
+        """
         self.ai_service = ai_service
+        self._ai_semaphore = asyncio.Semaphore(ai_concurrency or self.AI_ANALYZE_CONCURRENCY)
 
     async def analyze_all_relationships(
         self,
@@ -68,12 +347,31 @@ class LinkAnalyzer:
         ai_model: str = None
     ) -> List[ChapterLink]:
         """分析项目中所有章节的关系"""
-        result = await db.execute(
-            select(Chapter).where(
+        # 分批流式读取章节，每批在线程中完成关键词扫描 (每章只扫描一次，三个分析阶段共用命中结果)，
+        # 扫描与下一批的读取重叠进行且不阻塞事件循环；扫描后只保留提示词所需的正文片段
+        result = await db.stream(
+            select(
+                Chapter.id,
+                Chapter.project_id,
+                Chapter.chapter_number,
+                Chapter.title,
+                Chapter.content
+            ).where(
                 Chapter.project_id == project_id
-            ).order_by(Chapter.chapter_number)
+            ).order_by(Chapter.chapter_number).execution_options(yield_per=self.CHAPTER_FETCH_BATCH_SIZE)
         )
-        chapters = result.scalars().all()
+        scan_tasks = []
+        async for partition in result.partitions():
+            scan_tasks.append(asyncio.create_task(asyncio.to_thread(self._scan_chapter_rows, partition)))
+
+        chapters: List[ChapterRow] = []
+        keyword_tags: Dict[str, Set[str]] = {}
+        chapter_index_map: Dict[str, int] = {}  # 章节ID -> 在 chapters 中的索引
+        for scanned in await asyncio.gather(*scan_tasks):
+            for chapter, tags in scanned:
+                chapter_index_map[chapter.id] = len(chapters)
+                chapters.append(chapter)
+                keyword_tags[chapter.id] = tags
 
         if len(chapters) < 2:
             logger.warning(f"章节数量不足: project_id={project_id}, count={len(chapters)}")
@@ -81,78 +379,139 @@ class LinkAnalyzer:
 
         logger.info(f"开始分析章节关系: project_id={project_id}, total={len(chapters)}")
 
-        links = []
-        
-        # 1. 分析相邻章节关系
-        adjacent_links = await self._analyze_adjacent_chapters(
-            chapters, ai_provider, ai_model
-        )
-        links.extend(adjacent_links)
-        
-        # 2. 分析伏笔-回收关系（非相邻章节）
-        foreshadowing_links = await self._analyze_foreshadowing(
-            chapters, ai_provider, ai_model
-        )
-        links.extend(foreshadowing_links)
-        
-        # 3. 分析对比/冲突关系
-        contrast_links = await self._analyze_contrasts(
-            chapters, ai_provider, ai_model
+        # 三类分析互相独立，并发进行 (AI请求总数由信号量限制)，结果按阶段顺序合并：
+        # 1. 相邻章节关系  2. 伏笔-回收关系（非相邻章节）  3. 对比/冲突关系
+        # 同一章节对在多个阶段出现时只请求一次AI，后出现的阶段复用先发起的请求结果。
+        # 各阶段在首次挂起前就登记完全部请求，gather 按参数顺序启动，因此按 对比 -> 伏笔 -> 相邻
+        # 的顺序启动，让提示更具体的阶段拥有重叠的章节对 (对比提示不会被相邻/伏笔提示抢先)
+        # 缺少前提条件的阶段直接跳过：伏笔分析需要同时存在伏笔和回收关键词，对比分析需要AI和冲突关键词
+        ai_requests: Dict[Tuple[str, str], asyncio.Future] = {}
+        found_categories = set().union(*keyword_tags.values())
+        phases = {}
+        if self.ai_service and "conflict" in found_categories:
+            phases["contrast"] = self._analyze_contrasts(
+                chapters, ai_provider, ai_model, keyword_tags, ai_requests, chapter_index_map
+            )
+        if {"foreshadowing", "callback"} <= found_categories:
+            phases["foreshadowing"] = self._analyze_foreshadowing(
+                chapters, ai_provider, ai_model, keyword_tags, ai_requests
+            )
+        phases["adjacent"] = self._analyze_adjacent_chapters(
+            chapters, ai_provider, ai_model, keyword_tags, ai_requests
         )
-        links.extend(contrast_links)
+        links_by_phase = dict(zip(phases, await asyncio.gather(*phases.values())))
+        phase_links = [
+            links_by_phase[name] for name in ("adjacent", "foreshadowing", "contrast") if name in links_by_phase
+        ]
+
+        # 复用的AI结果可能同时满足多个阶段的筛选条件，同一关系只保留一条
+        links = []
+        seen_keys = set()
+        for links_of_phase in phase_links:
+            for link in links_of_phase:
+                key = (link.from_chapter_id, link.to_chapter_id, link.link_type)
+                if key not in seen_keys:
+                    seen_keys.add(key)
+                    links.append(link)
 
         logger.info(f"章节关系分析完成: total_links={len(links)}")
         return links
 
+    def _scan_chapter_rows(self, rows) -> List[Tuple[ChapterRow, Set[str]]]:
+        """扫描一批章节行 (id, project_id, chapter_number, title, content) 的关键词类别并截取正文片段
+
+        jieba 可用时每章全文只分词一次，冲突关键词判断与内容指纹共用分词结果；
+        使用AI分析时同时计算全文的内容指纹
+        """
+        scanned = []
+        for chapter_id, chapter_project_id, chapter_number, title, content in rows:
+            tokens = jieba.lcut(content) if JIEBA_AVAILABLE and content else None
+            scanned.append((
+                ChapterRow(
+                    id=chapter_id,
+                    project_id=chapter_project_id,
+                    chapter_number=chapter_number,
+                    title=title,
+                    content=(content or "")[:self.PROMPT_CONTENT_MAX_CHARS],
+                    fingerprint=_content_fingerprint(content, tokens) if self.ai_service else frozenset()
+                ),
+                self._scan_keywords(content, tokens)
+            ))
+        return scanned
+
+    def _scan_keywords(self, content: Optional[str], tokens: Optional[List[str]] = None) -> Set[str]:
+        """返回文本命中的关键词类别集合；冲突关键词按整词判断 (见 _contains_conflict_keyword)"""
+        if not JIEBA_AVAILABLE:
+            return self._KEYWORD_SCANNER.scan(content)
+        tags = self._CUE_KEYWORD_SCANNER.scan(content)
+        if self._contains_conflict_keyword(content, tokens):
+            tags.add("conflict")
+        return tags
+
+    def _contains_conflict_keyword(self, content: Optional[str], tokens: Optional[List[str]] = None) -> bool:
+        """是否出现冲突关键词
+
+        jieba 可用时检查关键词是否作为完整的词出现在分词结果中 ("退却"、"冷却" 等复合词中的 "却" 不算)，
+        tokens 为已有的分词结果 (可选)；否则用带排除词的正则匹配
+        """
+        if not content:
+            return False
+        if not JIEBA_AVAILABLE:
+            return self._CONFLICT_MATCHER.search(content)
+        if tokens is None:
+            tokens = jieba.lcut(content)
+        return not self.CONFLICT_KEYWORD_SET.isdisjoint(tokens)
+
     async def _analyze_adjacent_chapters(
         self,
-        chapters: List[Chapter],
+        chapters: List[ChapterRow],
         ai_provider: str = None,
-        ai_model: str = None
+        ai_model: str = None,
+        keyword_tags: Optional[Dict[str, Set[str]]] = None,
+        ai_requests: Optional[Dict[Tuple[str, str], asyncio.Future]] = None
     ) -> List[ChapterLink]:
         """分析相邻章节的关系"""
-        links = []
-
-        for i in range(len(chapters) - 1):
-            chapter_a = chapters[i]
-            chapter_b = chapters[i + 1]
+        pairs = list(zip(chapters, chapters[1:]))
 
-            if self.ai_service:
-                link = await self._analyze_with_ai(
-                    chapter_a, chapter_b, 
+        if self.ai_service:
+            results = await asyncio.gather(*(
+                self._request_ai_analysis(
+                    ai_requests, chapter_a, chapter_b,
                     ai_provider, ai_model,
                     context="adjacent"
                 )
-            else:
-                link = self._analyze_with_rules(chapter_a, chapter_b)
-
-            if link:
-                links.append(link)
+                for chapter_a, chapter_b in pairs
+            ))
+        else:
+            tags = keyword_tags or {}
+            results = [
+                self._analyze_with_rules(chapter_a, chapter_b, tags.get(chapter_a.id), tags.get(chapter_b.id))
+                for chapter_a, chapter_b in pairs
+            ]
 
-        return links
+        return [link for link in results if link]
 
     async def _analyze_foreshadowing(
         self,
-        chapters: List[Chapter],
+        chapters: List[ChapterRow],
         ai_provider: str = None,
-        ai_model: str = None
+        ai_model: str = None,
+        keyword_tags: Optional[Dict[str, Set[str]]] = None,
+        ai_requests: Optional[Dict[Tuple[str, str], asyncio.Future]] = None
     ) -> List[ChapterLink]:
         """分析伏笔-回收关系"""
-        links = []
-        
+        tags = keyword_tags or {ch.id: self._scan_keywords(ch.content) for ch in chapters}
+
         # 先找出所有可能包含伏笔的章节
-        foreshadowing_chapters = []
-        for ch in chapters:
-            if ch.content and any(kw in ch.content for kw in self.FORESHADOWING_KEYWORDS):
-                foreshadowing_chapters.append(ch)
+        foreshadowing_chapters = [ch for ch in chapters if "foreshadowing" in tags[ch.id]]
         
         # 找出所有可能回收伏笔的章节
-        callback_chapters = []
-        for ch in chapters:
-            if ch.content and any(kw in ch.content for kw in self.CALLBACK_KEYWORDS):
-                callback_chapters.append(ch)
+        callback_chapters = [ch for ch in chapters if "callback" in tags[ch.id]]
+        if not foreshadowing_chapters or not callback_chapters:
+            return []
         
         # 匹配伏笔和回收
+        pairs = []
         for fch in foreshadowing_chapters:
             for cch in callback_chapters:
                 # 回收必须在伏笔之后
@@ -163,45 +522,83 @@ class LinkAnalyzer:
                 gap = cch.chapter_number - fch.chapter_number
                 if gap < 2 or gap > 30:
                     continue
-                
-                if self.ai_service:
-                    link = await self._analyze_with_ai(
-                        fch, cch,
-                        ai_provider, ai_model,
-                        context="foreshadowing"
-                    )
-                    if link and link.link_type in ["foreshadowing", "callback", "causality"]:
-                        links.append(link)
-                else:
-                    # 简单规则：如果两章都有相关关键词，认为有关系
-                    link = self._create_foreshadowing_link(fch, cch)
-                    if link:
-                        links.append(link)
+
+                pairs.append((fch, cch))
+
+        if self.ai_service:
+            shortlist = self._shortlist_foreshadowing_pairs(pairs)
+            results = await asyncio.gather(*(
+                self._request_ai_analysis(
+                    ai_requests, fch, cch,
+                    ai_provider, ai_model,
+                    context="foreshadowing",
+                    shortlist_score=score
+                )
+                for fch, cch, score in shortlist
+            ))
+            links = [
+                link for link in results
+                if link and link.link_type in ["foreshadowing", "callback", "causality"]
+            ]
+        else:
+            # 简单规则：如果两章都有相关关键词，认为有关系
+            links = [link for link in (self._create_foreshadowing_link(fch, cch) for fch, cch in pairs) if link]
         
         return links
 
+    def _shortlist_foreshadowing_pairs(
+        self,
+        pairs: List[Tuple[ChapterRow, ChapterRow]]
+    ) -> List[Tuple[ChapterRow, ChapterRow, int]]:
+        """AI分析前的廉价预筛选
+
+        以两章全文内容指纹 (去除停用词后的分词结果) 的重叠词数为得分，每个伏笔章节只保留得分最高的
+        FORESHADOWING_AI_TOP_K 个回收章节 (同分时间隔近的优先)，返回顺序与 pairs 一致
+        """
+        fingerprints: Dict[str, FrozenSet[str]] = {}
+        candidates: Dict[str, List[Tuple[int, int]]] = {}  # 伏笔章节ID -> [(得分, pairs 下标)]
+        for idx, (fch, cch) in enumerate(pairs):
+            for ch in (fch, cch):
+                if ch.id not in fingerprints:
+                    # 未在读取时计算指纹的章节 (直接传入的记录) 退回到已有的正文片段
+                    fingerprints[ch.id] = ch.fingerprint or _content_fingerprint(ch.content)
+            score = len(fingerprints[fch.id] & fingerprints[cch.id])
+            candidates.setdefault(fch.id, []).append((score, idx))
+
+        selected: Dict[int, int] = {}  # pairs 下标 -> 得分
+        for scored in candidates.values():
+            scored.sort(key=lambda item: -item[0])
+            selected.update((idx, score) for score, idx in scored[:self.FORESHADOWING_AI_TOP_K])
+
+        if len(selected) < len(pairs):
+            logger.info(f"伏笔候选预筛选: {len(pairs)} -> {len(selected)} 对")
+        return [(*pairs[idx], selected[idx]) for idx in sorted(selected)]
+
     async def _analyze_contrasts(
         self,
-        chapters: List[Chapter],
+        chapters: List[ChapterRow],
         ai_provider: str = None,
-        ai_model: str = None
+        ai_model: str = None,
+        keyword_tags: Optional[Dict[str, Set[str]]] = None,
+        ai_requests: Optional[Dict[Tuple[str, str], asyncio.Future]] = None,
+        chapter_index_map: Optional[Dict[str, int]] = None
     ) -> List[ChapterLink]:
         """分析对比/冲突关系"""
-        links = []
-
         if not self.ai_service:
-            return links  # 对比分析需要AI
+            return []  # 对比分析需要AI
 
-        # 构建章节ID到索引的映射
-        chapter_index_map = {ch.id: idx for idx, ch in enumerate(chapters)}
+        # 章节ID到索引的映射，未传入时现场构建
+        if chapter_index_map is None:
+            chapter_index_map = {ch.id: idx for idx, ch in enumerate(chapters)}
 
         # 找出可能有冲突的章节
-        conflict_chapters = []
-        for ch in chapters:
-            if ch.content and any(kw in ch.content for kw in self.CONFLICT_KEYWORDS):
-                conflict_chapters.append(ch)
+        if keyword_tags is not None:
+            conflict_chapters = [ch for ch in chapters if "conflict" in keyword_tags.get(ch.id, ())]
+        else:
+            conflict_chapters = [ch for ch in chapters if self._contains_conflict_keyword(ch.content)]
 
         # 分析冲突章节与前面章节的关系
+        pairs = []
         for cch in conflict_chapters:
             # 获取当前章节在列表中的索引
             current_idx = chapter_index_map.get(cch.id)
@@ -211,34 +608,64 @@ class LinkAnalyzer:
             # 查看前5章是否有对比关系
             start_idx = max(0, current_idx - 5)
             for i in range(start_idx, current_idx):
-                prev_ch = chapters[i]
-                link = await self._analyze_with_ai(
-                    prev_ch, cch,
-                    ai_provider, ai_model,
-                    context="contrast"
-                )
-                if link and link.link_type in ["contrast", "causality"]:
-                    links.append(link)
+                pairs.append((chapters[i], cch))
 
-        return links
+        results = await asyncio.gather(*(
+            self._request_ai_analysis(
+                ai_requests, prev_ch, cch,
+                ai_provider, ai_model,
+                context="contrast"
+            )
+            for prev_ch, cch in pairs
+        ))
+        return [link for link in results if link and link.link_type in ["contrast", "causality"]]
+
+    def _request_ai_analysis(
+        self,
+        ai_requests: Optional[Dict[Tuple[str, str], asyncio.Future]],
+        chapter_a: ChapterRow,
+        chapter_b: ChapterRow,
+        ai_provider: str = None,
+        ai_model: str = None,
+        context: str = "general",
+        shortlist_score: Optional[int] = None
+    ) -> asyncio.Future:
+        """发起章节对的AI分析；ai_requests 中已有同一章节对的请求时直接复用 (沿用先登记者的提示)，不重复请求"""
+        key = (chapter_a.id, chapter_b.id)
+        request = ai_requests.get(key) if ai_requests is not None else None
+        if request is None:
+            request = asyncio.ensure_future(self._analyze_with_ai(
+                chapter_a, chapter_b,
+                ai_provider, ai_model,
+                context=context,
+                shortlist_score=shortlist_score
+            ))
+            if ai_requests is not None:
+                ai_requests[key] = request
+        return request
 
     async def _analyze_with_ai(
         self,
-        chapter_a: Chapter,
-        chapter_b: Chapter,
+        chapter_a: ChapterRow,
+        chapter_b: ChapterRow,
         ai_provider: str = None,
         ai_model: str = None,
-        context: str = "general"
+        context: str = "general",
+        shortlist_score: Optional[int] = None
     ) -> Optional[ChapterLink]:
-        """使用AI分析两个章节的关系"""
+        """使用AI分析两个章节的关系
+
+        shortlist_score 为预筛选得分，提供时记录到推理链中
+        """
         try:
             # 构建提示词
             prompt = self._build_analysis_prompt(chapter_a, chapter_b, context)
 
-            result = await self.ai_service.generate_text(
-                prompt=prompt,
-                temperature=0.3
-            )
+            async with self._ai_semaphore:
+                result = await self.ai_service.generate_text(
+                    prompt=prompt,
+                    temperature=0.3
+                )
 
             # generate_text 返回 Dict，需要提取 content 字段
             if isinstance(result, dict):
@@ -255,6 +682,10 @@ class LinkAnalyzer:
             if link_data.get("link_type") == "none":
                 return None
 
+            reasoning_chain = link_data.get("reasoning_chain", {})
+            if shortlist_score is not None and isinstance(reasoning_chain, dict):
+                reasoning_chain = {**reasoning_chain, "shortlist_score": shortlist_score}
+
             link = ChapterLink(
                 project_id=chapter_a.project_id,
                 from_chapter_id=chapter_a.id,
@@ -262,11 +693,11 @@ class LinkAnalyzer:
                 to_chapter_id=chapter_b.id,
                 to_chapter_title=chapter_b.title,
                 link_type=link_data.get("link_type", "continuation"),
-                link_type_display=LINK_TYPES.get(link_data.get("link_type", ""), {}).get("name", "承上启下"),
+                link_type_display=_LINK_TYPE_NAMES.get(link_data.get("link_type", ""), "承上启下"),
                 description=link_data.get("description", ""),
                 from_element=link_data.get("from_element", ""),
                 to_element=link_data.get("to_element", ""),
-                reasoning_chain=json.dumps(link_data.get("reasoning_chain", {}), ensure_ascii=False),
+                reasoning_chain=_json_dumps(reasoning_chain),
                 strength=float(link_data.get("strength", 0.5)),
                 importance_score=float(link_data.get("importance_score", 50)),
                 confidence=float(link_data.get("confidence", 0.7)),
@@ -280,26 +711,44 @@ class LinkAnalyzer:
             logger.error(f"AI分析章节关系失败: {str(e)}")
             return None
 
-    def _analyze_with_rules(self, chapter_a: Chapter, chapter_b: Chapter) -> Optional[ChapterLink]:
-        """规则分析相邻章节关系"""
+    @staticmethod
+    def _has_keyword(
+        tags: Optional[Set[str]],
+        category: str,
+        match: Callable[[Optional[str]], bool],
+        content: Optional[str]
+    ) -> bool:
+        """优先使用预扫描的类别集合判断关键词命中，没有时用 match 现场匹配"""
+        if tags is not None:
+            return category in tags
+        return match(content)
+
+    def _analyze_with_rules(
+        self,
+        chapter_a: ChapterRow,
+        chapter_b: ChapterRow,
+        tags_a: Optional[Set[str]] = None,
+        tags_b: Optional[Set[str]] = None
+    ) -> Optional[ChapterLink]:
+        """规则分析相邻章节关系
+
+        tags_a / tags_b 为预先扫描得到的关键词类别集合，未提供时现场匹配
+        """
         link_type = "continuation"
         description = f"第{chapter_a.chapter_number}章到第{chapter_b.chapter_number}章的延续"
         strength = 0.5
         importance_score = 50
 
-        content_a = chapter_a.content or ""
-        content_b = chapter_b.content or ""
-
         # 检测伏笔
-        if any(kw in content_a for kw in self.FORESHADOWING_KEYWORDS):
-            if any(kw in content_b for kw in self.CALLBACK_KEYWORDS):
+        if self._has_keyword(tags_a, "foreshadowing", self._FORESHADOWING_MATCHER.search, chapter_a.content):
+            if self._has_keyword(tags_b, "callback", self._CALLBACK_MATCHER.search, chapter_b.content):
                 link_type = "foreshadowing"
                 description = f"第{chapter_a.chapter_number}章埋下伏笔，第{chapter_b.chapter_number}章开始回收"
                 strength = 0.7
                 importance_score = 70
 
         # 检测冲突
-        if any(kw in content_b for kw in self.CONFLICT_KEYWORDS):
+        if self._has_keyword(tags_b, "conflict", self._contains_conflict_keyword, chapter_b.content):
             link_type = "contrast"
             description = f"第{chapter_b.chapter_number}章与前文形成对比或冲突"
             strength = 0.6
@@ -312,13 +761,13 @@ class LinkAnalyzer:
             to_chapter_id=chapter_b.id,
             to_chapter_title=chapter_b.title,
             link_type=link_type,
-            link_type_display=LINK_TYPES.get(link_type, {}).get("name", "承上启下"),
+            link_type_display=_LINK_TYPE_NAMES.get(link_type, "承上启下"),
             description=description,
-            reasoning_chain=json.dumps({
+            reasoning_chain=_json_dumps({
                 "method": "rule_based",
                 "from_title": chapter_a.title,
                 "to_title": chapter_b.title
-            }, ensure_ascii=False),
+            }),
             strength=strength,
             importance_score=importance_score,
             confidence=0.5,
@@ -330,8 +779,8 @@ class LinkAnalyzer:
 
     def _create_foreshadowing_link(
         self, 
-        foreshadowing_ch: Chapter, 
-        callback_ch: Chapter
+        foreshadowing_ch: ChapterRow, 
+        callback_ch: ChapterRow
     ) -> Optional[ChapterLink]:
         """创建伏笔-回收关系"""
         gap = callback_ch.chapter_number - foreshadowing_ch.chapter_number
@@ -349,10 +798,10 @@ class LinkAnalyzer:
             link_type="foreshadowing",
             link_type_display="伏笔回收",
             description=f"第{foreshadowing_ch.chapter_number}章埋下的伏笔在第{callback_ch.chapter_number}章回收（间隔{gap}章）",
-            reasoning_chain=json.dumps({
+            reasoning_chain=_json_dumps({
                 "method": "keyword_matching",
                 "gap": gap
-            }, ensure_ascii=False),
+            }),
             strength=strength,
             importance_score=importance,
             confidence=0.4,
@@ -362,88 +811,44 @@ class LinkAnalyzer:
 
     def _build_analysis_prompt(
         self, 
-        chapter_a: Chapter, 
-        chapter_b: Chapter,
+        chapter_a: ChapterRow, 
+        chapter_b: ChapterRow,
         context: str
     ) -> str:
         """构建分析提示词"""
-        context_hints = {
-            "adjacent": "这是两个相邻的章节，请分析它们之间的延续和发展关系。",
-            "foreshadowing": "请特别关注是否存在伏笔埋设和回收的关系。",
-            "contrast": "请特别关注是否存在对比、冲突或反转的关系。",
-            "general": "请综合分析这两个章节之间可能存在的关系。"
-        }
-        
-        content_a = (chapter_a.content or "")[:1500]
-        content_b = (chapter_b.content or "")[:1500]
-        
-        return f"""分析以下两个小说章节之间的关系。
-
-{context_hints.get(context, context_hints["general"])}
-
-【第{chapter_a.chapter_number}章：{chapter_a.title}】
-{content_a}
-
-【第{chapter_b.chapter_number}章：{chapter_b.title}】
-{content_b}
-
-请分析这两个章节之间的关系，并返回JSON格式结果：
-
-关系类型说明：
-- causality: 因果关系（前一章事件导致后续结果）
-- foreshadowing: 伏笔埋设（前一章埋下伏笔，后续回收）
-- callback: 伏笔回收（后续章节回收之前的伏笔）
-- parallel: 平行叙事（同时发生的不同事件）
-- contrast: 对比冲突（形成对比或冲突）
-- continuation: 承上启下（自然延续）
-- none: 无明显关系
-
-请用JSON格式返回：
-```json
-{{
-  "link_type": "关系类型",
-  "description": "关系描述（一句话）",
-  "from_element": "前一章的关键元素",
-  "to_element": "后一章的对应元素",
-  "reasoning_chain": {{
-    "observation": "观察到的现象",
-    "analysis": "分析推理",
-    "conclusion": "得出的结论"
-  }},
-  "strength": 0.7,
-  "importance_score": 70,
-  "confidence": 0.8
-}}
-```
+        return _ANALYSIS_PROMPT_TEMPLATE.format(
+            hint=_CONTEXT_HINTS.get(context, _CONTEXT_HINTS["general"]),
+            number_a=chapter_a.chapter_number,
+            title_a=chapter_a.title,
+            content_a=self._content_excerpt(chapter_a),
+            number_b=chapter_b.chapter_number,
+            title_b=chapter_b.title,
+            content_b=self._content_excerpt(chapter_b)
+        )
 
-只返回JSON，不要其他说明。如果没有明显关系，link_type设为"none"。"""
+    def _content_excerpt(self, chapter: ChapterRow) -> str:
+        """提示词中使用的章节正文片段 (读取章节时已截取的内容不会再次复制)"""
+        return (chapter.content or "")[:self.PROMPT_CONTENT_MAX_CHARS]
 
     def _parse_ai_response(self, response: str) -> Optional[Dict[str, Any]]:
-        """解析AI响应"""
+        """解析AI响应，取出其中第一个完整的 JSON 对象 (可包在代码块中或夹杂说明文字)"""
         try:
-            data = json.loads(response)
-            return data
-        except json.JSONDecodeError:
+            data = _json_loads(response)
+            if isinstance(data, dict):
+                return data
+        except ValueError:
             pass
 
-        # 提取JSON代码块
-        import re
-        match = re.search(r'```(?:json)?\s*([\{\[].*?[\}\]])\s*```', response, re.DOTALL)
-        if match:
+        # 从每个 "{" 起尝试解码，raw_decode 会自行匹配嵌套括号并忽略其后的多余文字
+        start = response.find("{")
+        while start != -1:
             try:
-                data = json.loads(match.group(1))
-                return data
-            except:
-                pass
-        
-        # 尝试直接找JSON对象
-        match = re.search(r'\{[\s\S]*\}', response)
-        if match:
-            try:
-                data = json.loads(match.group(0))
-                return data
-            except:
+                data, _ = _JSON_DECODER.raw_decode(response, start)
+                if isinstance(data, dict):
+                    return data
+            except ValueError:
                 pass
+            start = response.find("{", start + 1)
 
         logger.warning(f"无法解析AI响应")
         return None
@@ -456,39 +861,52 @@ class LinkAnalyzer:
         error_ids = []
         project_id = links[0].project_id
 
-        # 预加载已存在的关系键
-        existing_result = await db.execute(
-            select(
-                ChapterLink.from_chapter_id,
-                ChapterLink.to_chapter_id,
-                ChapterLink.link_type
-            ).where(ChapterLink.project_id == project_id)
-        )
+        # 支持 ON CONFLICT 的数据库由唯一索引去重，无需预加载项目内全部关系键；
+        # 其他数据库仍在内存中检查已存在的关系
+        dialect_insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
         existing_keys = set()
-        for row in existing_result.all():
-            existing_keys.add(f"{row[0]}:{row[1]}:{row[2]}")
+        if dialect_insert is None:
+            existing_result = await db.execute(
+                select(
+                    ChapterLink.from_chapter_id,
+                    ChapterLink.to_chapter_id,
+                    ChapterLink.link_type
+                ).where(ChapterLink.project_id == project_id)
+            )
+            existing_keys.update(existing_result.tuples().all())
 
-        # 筛选新关系
+        # 筛选新关系（本次批量内 + 非 ON CONFLICT 数据库的已有记录）
         new_links = []
         for link in links:
-            key = f"{link.from_chapter_id}:{link.to_chapter_id}:{link.link_type}"
+            key = (link.from_chapter_id, link.to_chapter_id, link.link_type)
             if key not in existing_keys:
                 new_links.append(link)
                 existing_keys.add(key)
 
-        # 批量保存
+        # 批量保存：直接以字段字典批量 INSERT，不经过逐对象的 unit of work
         if new_links:
             try:
-                db.add_all(new_links)
+                rows = [_link_row(link) for link in new_links]
+                if dialect_insert is not None:
+                    stmt = dialect_insert(ChapterLink).on_conflict_do_nothing(
+                        index_elements=list(_LINK_UNIQUE_KEYS)
+                    ).returning(ChapterLink.id)
+                    result = await db.execute(stmt, rows)
+                    saved_count = len(result.all())
+                else:
+                    await db.execute(insert(ChapterLink), rows)
+                    saved_count = len(rows)
                 await db.commit()
-                logger.info(f"保存关系完成: saved={len(new_links)}")
+                logger.info(f"保存关系完成: saved={saved_count}")
             except Exception as e:
                 logger.error(f"批量保存关系失败: {str(e)}")
                 await db.rollback()
                 error_ids.append("batch_save")
                 return 0, error_ids
 
-        return len(new_links), error_ids
+            return saved_count, error_ids
+
+        return 0, error_ids
 
     async def get_chapter_relationships(
         self,
@@ -522,68 +940,76 @@ class LinkAnalyzer:
         db: AsyncSession
     ) -> Dict[str, Any]:
         """构建图谱数据"""
-        links = await self.get_chapter_relationships(project_id, db)
-
-        # 收集节点
-        chapter_ids = set()
-        for link in links:
-            chapter_ids.add(link.from_chapter_id)
-            chapter_ids.add(link.to_chapter_id)
-
-        # 查询章节信息
-        if chapter_ids:
-            chapters = await db.execute(
-                select(Chapter.id, Chapter.title, Chapter.chapter_number).where(
-                    Chapter.id.in_(list(chapter_ids))
-                )
+        # 一次查询取出边所需的列及两端章节信息，不加载完整的 ORM 对象
+        from_chapter = aliased(Chapter)
+        to_chapter = aliased(Chapter)
+        result = await db.execute(
+            select(
+                ChapterLink.from_chapter_id,
+                ChapterLink.to_chapter_id,
+                ChapterLink.link_type,
+                ChapterLink.description,
+                ChapterLink.strength,
+                ChapterLink.importance_score,
+                from_chapter.id,
+                from_chapter.title,
+                from_chapter.chapter_number,
+                to_chapter.id,
+                to_chapter.title,
+                to_chapter.chapter_number
             )
-            chapter_map = {ch[0]: ch for ch in chapters.all()}
-        else:
-            chapter_map = {}
+            .outerjoin(from_chapter, from_chapter.id == ChapterLink.from_chapter_id)
+            .outerjoin(to_chapter, to_chapter.id == ChapterLink.to_chapter_id)
+            .where(ChapterLink.project_id == project_id)
+            .order_by(ChapterLink.importance_score.desc())
+        )
+
+        # 单次遍历构建边，同时统计节点的关系数量（章节已不存在的一端不作为节点）
+        node_info: Dict[str, list] = {}  # 章节ID -> [标题, 章节序号, 关系数量]
+        edges = []
+        link_types = set()
+        for (from_id, to_id, link_type, description, strength, importance_score,
+             *chapter_columns) in result.all():
+            for ch_id, title, number in (chapter_columns[:3], chapter_columns[3:]):
+                if ch_id is None:
+                    continue
+                info = node_info.get(ch_id)
+                if info is None:
+                    node_info[ch_id] = info = [title, number, 0]
+                info[2] += 1
+
+            link_types.add(link_type)
+            edges.append({
+                "source": from_id,
+                "target": to_id,
+                "type": link_type,
+                "description": description or "",
+                "strength": strength or 0.5,
+                "importance": importance_score or 50
+            })
 
         # 构建节点（计算重要性）
-        node_link_count = {}
-        for link in links:
-            node_link_count[link.from_chapter_id] = node_link_count.get(link.from_chapter_id, 0) + 1
-            node_link_count[link.to_chapter_id] = node_link_count.get(link.to_chapter_id, 0) + 1
-
-        nodes = []
-        for ch_id in chapter_ids:
-            ch = chapter_map.get(ch_id)
-            if ch:
-                count = node_link_count.get(ch_id, 0)
-                importance = min(100, 30 + count * 15)
-                
-                nodes.append({
-                    "id": ch_id,
-                    "title": ch[1],
-                    "chapterNumber": ch[2],
-                    "importance": importance,
-                    "size": min(35, 12 + count * 4)
-                })
+        nodes = [
+            {
+                "id": ch_id,
+                "title": title,
+                "chapterNumber": number,
+                "importance": min(100, 30 + count * 15),
+                "size": min(35, 12 + count * 4)
+            }
+            for ch_id, (title, number, count) in node_info.items()
+        ]
 
         # 排序节点
         nodes.sort(key=lambda x: x["chapterNumber"])
 
-        # 构建边
-        edges = []
-        for link in links:
-            edges.append({
-                "source": link.from_chapter_id,
-                "target": link.to_chapter_id,
-                "type": link.link_type,
-                "description": link.description or "",
-                "strength": link.strength or 0.5,
-                "importance": link.importance_score or 50
-            })
-
         return {
             "nodes": nodes,
             "links": edges,
             "summary": {
                 "totalNodes": len(nodes),
                 "totalLinks": len(edges),
-                "linkTypes": list(set(link.link_type for link in links)) if links else []
+                "linkTypes": list(link_types)
             }
         }
 
@@ -596,8 +1022,31 @@ class LinkAnalyzer:
         """分析章节重要性"""
         links = await self.get_chapter_relationships(project_id, db, chapter_id=chapter_id)
 
-        incoming = [l for l in links if l.to_chapter_id == chapter_id]
-        outgoing = [l for l in links if l.from_chapter_id == chapter_id]
+        # 单次遍历完成入边/出边划分和特殊关系计数
+        special_types = {"foreshadowing", "callback", "causality"}
+        incoming = []
+        outgoing = []
+        special_count = 0
+        for l in links:
+            type_display = _LINK_TYPE_NAMES.get(l.link_type, l.link_type)
+            if l.to_chapter_id == chapter_id:
+                incoming.append({
+                    "fromChapterId": l.from_chapter_id,
+                    "title": l.from_chapter_title,
+                    "type": l.link_type,
+                    "typeDisplay": type_display,
+                    "description": l.description
+                })
+            if l.from_chapter_id == chapter_id:
+                outgoing.append({
+                    "toChapterId": l.to_chapter_id,
+                    "title": l.to_chapter_title,
+                    "type": l.link_type,
+                    "typeDisplay": type_display,
+                    "description": l.description
+                })
+            if l.link_type in special_types:
+                special_count += 1
 
         # 计算综合重要性
         base_score = 50
@@ -605,8 +1054,6 @@ class LinkAnalyzer:
         outgoing_score = len(outgoing) * 10
         
         # 特殊关系加分
-        special_types = ["foreshadowing", "callback", "causality"]
-        special_count = sum(1 for l in links if l.link_type in special_types)
         special_score = special_count * 8
         
         importance = min(100, base_score + incoming_score + outgoing_score + special_score)
@@ -617,24 +1064,6 @@ class LinkAnalyzer:
             "incomingCount": len(incoming),
             "outgoingCount": len(outgoing),
             "specialRelations": special_count,
-            "incoming": [
-                {
-                    "fromChapterId": l.from_chapter_id,
-                    "title": l.from_chapter_title,
-                    "type": l.link_type,
-                    "typeDisplay": LINK_TYPES.get(l.link_type, {}).get("name", l.link_type),
-                    "description": l.description
-                }
-                for l in incoming
-            ],
-            "outgoing": [
-                {
-                    "toChapterId": l.to_chapter_id,
-                    "title": l.to_chapter_title,
-                    "type": l.link_type,
-                    "typeDisplay": LINK_TYPES.get(l.link_type, {}).get("name", l.link_type),
-                    "description": l.description
-                }
-                for l in outgoing
-            ]
+            "incoming": incoming,
+            "outgoing": outgoing
         }
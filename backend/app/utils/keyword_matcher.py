@@ -0,0 +1,48 @@
+"""多关键词匹配 - 将整个词典编译为单个正则，一次扫描文本即可匹配全部关键词"""
+import re
+from collections import Counter
+from typing import Iterable, Iterator, Set, Tuple
+
+
+class KeywordMatcher:
+    """多关键词匹配器
+
+    所有关键词按长度降序组成一个正则交替式，一次从左到右扫描文本。
+    匹配语义为"最左最长、互不重叠"：同一位置优先匹配较长的词，
+    已被较长词覆盖的短词不会重复计数 (如 "勃然大怒" 中的 "大怒")。
+    """
+
+    __slots__ = ("keywords", "_pattern")
+
+    def __init__(self, keywords: Iterable[str]):
+        words = sorted({k for k in keywords if k}, key=len, reverse=True)
+        self.keywords: Tuple[str, ...] = tuple(words)
+        self._pattern = re.compile("|".join(map(re.escape, words))) if words else None
+
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """依次返回 (起始位置, 关键词)"""
+        if self._pattern is None or not text:
+            return
+        for match in self._pattern.finditer(text):
+            yield match.start(), match.group()
+
+    def count(self, text: str) -> Counter:
+        """统计每个关键词的出现次数"""
+        if self._pattern is None or not text:
+            return Counter()
+        return Counter(self._pattern.findall(text))
+
+    def found(self, text: str) -> Set[str]:
+        """返回文本中出现过的关键词集合"""
+        if self._pattern is None or not text:
+            return set()
+        return set(self._pattern.findall(text))
+
+    def search(self, text: str) -> bool:
+        """文本中是否出现任一关键词"""
+        if self._pattern is None or not text:
+            return False
+        return self._pattern.search(text) is not None
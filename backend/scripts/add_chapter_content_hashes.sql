@@ -0,0 +1,18 @@
+-- 创建章节内容哈希表
+-- 用途：批量实体提取时跳过内容未变化的章节（不再重复调用AI）
+-- 说明：哈希在每次提取成功后写入；章节内容修改后哈希不再匹配，下次提取自动重新处理
+
+CREATE TABLE IF NOT EXISTS chapter_content_hashes (
+    chapter_id VARCHAR(36) PRIMARY KEY REFERENCES chapters(id) ON DELETE CASCADE,
+    project_id VARCHAR(36) NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    content_hash VARCHAR(32) NOT NULL,
+    extraction_mode VARCHAR(20) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_chapter_content_hashes_project_id
+    ON chapter_content_hashes (project_id);
+
+COMMENT ON TABLE chapter_content_hashes IS '章节内容哈希表 - 记录最近一次实体提取时的章节内容哈希';
+COMMENT ON COLUMN chapter_content_hashes.content_hash IS '章节内容 blake2b 哈希（16字节十六进制）';
+COMMENT ON COLUMN chapter_content_hashes.extraction_mode IS '提取方式: ai/rule_based';
@@ -0,0 +1,23 @@
+-- 为章节关系表添加 (project_id, from_chapter_id, to_chapter_id, link_type) 唯一索引
+-- 说明: 保存关系改为 INSERT ... ON CONFLICT DO NOTHING，由数据库去重，
+--       不再每次预加载项目内全部关系键。建索引前先删除历史重复记录
+--       (同组中保留最早创建的一条)。
+
+BEGIN;
+
+DELETE FROM chapter_links l
+ USING (
+    SELECT id,
+           FIRST_VALUE(id) OVER (
+               PARTITION BY project_id, from_chapter_id, to_chapter_id, link_type
+               ORDER BY created_at, id
+           ) AS keep_id
+    FROM chapter_links
+ ) ranked
+ WHERE l.id = ranked.id
+   AND ranked.id <> ranked.keep_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_chapter_link
+    ON chapter_links (project_id, from_chapter_id, to_chapter_id, link_type);
+
+COMMIT;
@@ -0,0 +1,5 @@
+-- 为章节版本表添加 (chapter_id, version_number) 复合索引
+-- 下一个版本号改为取 MAX(version_number)+1，可直接走索引，无需统计全部版本行
+
+CREATE INDEX IF NOT EXISTS idx_chapter_version_number
+    ON chapter_versions (chapter_id, version_number);
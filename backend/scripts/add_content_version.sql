@@ -0,0 +1,12 @@
+-- 为章节添加内容版本号，供套路化分析缓存判断内容是否变化
+-- 内容每次修改时由应用递增，缓存有效性只需比较整数，无需重新计算全文哈希
+
+-- 1. 章节内容版本号
+ALTER TABLE chapters ADD COLUMN IF NOT EXISTS content_version INTEGER NOT NULL DEFAULT 1;
+
+-- 2. 缓存记录对应的内容版本号 (旧缓存为空，首次分析时自动重建)
+ALTER TABLE chapter_pattern_cache ADD COLUMN IF NOT EXISTS content_version INTEGER;
+
+-- 3. 添加注释 (PostgreSQL 特有语法，如果是 SQLite 可忽略)
+COMMENT ON COLUMN chapters.content_version IS '内容版本号(内容每次修改时递增)';
+COMMENT ON COLUMN chapter_pattern_cache.content_version IS '缓存对应的章节内容版本号';
@@ -0,0 +1,38 @@
+-- 为实体快照表添加 (project_id, entity_id, property_name, source_chapter_id) 唯一索引
+-- 说明: 批量提取改为 INSERT ... ON CONFLICT DO NOTHING，由数据库去重，
+--       不再每次预加载项目内全部快照键。建索引前先合并历史重复记录，
+--       冲突记录中引用的重复快照改指向保留的那条 (同组中最早创建的一条)。
+
+BEGIN;
+
+CREATE TEMP TABLE entity_snapshot_duplicates ON COMMIT DROP AS
+SELECT id, keep_id
+FROM (
+    SELECT id,
+           FIRST_VALUE(id) OVER (
+               PARTITION BY project_id, entity_id, property_name, source_chapter_id
+               ORDER BY created_at, id
+           ) AS keep_id
+    FROM entity_snapshots
+    WHERE source_chapter_id IS NOT NULL
+) ranked
+WHERE id <> keep_id;
+
+UPDATE conflicts c
+   SET snapshot_a_id = d.keep_id
+  FROM entity_snapshot_duplicates d
+ WHERE c.snapshot_a_id = d.id;
+
+UPDATE conflicts c
+   SET snapshot_b_id = d.keep_id
+  FROM entity_snapshot_duplicates d
+ WHERE c.snapshot_b_id = d.id;
+
+DELETE FROM entity_snapshots s
+ USING entity_snapshot_duplicates d
+ WHERE s.id = d.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_entity_snapshot_source
+    ON entity_snapshots (project_id, entity_id, property_name, source_chapter_id);
+
+COMMIT;
@@ -0,0 +1,6 @@
+-- 为 project_pattern_analysis 表添加内容指纹字段
+-- 用途：章节内容未变化时直接返回已保存的套路化分析结果
+
+ALTER TABLE project_pattern_analysis ADD COLUMN IF NOT EXISTS content_fingerprint VARCHAR(64);
+
+COMMENT ON COLUMN project_pattern_analysis.content_fingerprint IS '章节内容指纹 (所有章节内容哈希的汇总)';
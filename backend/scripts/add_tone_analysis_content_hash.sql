@@ -0,0 +1,6 @@
+-- 为 chapter_tone_analysis 表添加检测文本哈希字段
+-- 用途：同一章节内容重复检测时，已保存的结果不再重复写入
+
+ALTER TABLE chapter_tone_analysis ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+COMMENT ON COLUMN chapter_tone_analysis.content_hash IS '检测文本MD5哈希 (相同内容不重复写入)';
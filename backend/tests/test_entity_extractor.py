@@ -0,0 +1,103 @@
+"""实体提取批量保存测试"""
+import json
+import unittest
+
+try:
+    import aiosqlite  # noqa: F401
+    AIOSQLITE_AVAILABLE = True
+except ImportError:
+    AIOSQLITE_AVAILABLE = False
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.database import Base
+from app.models.chapter import Chapter
+from app.models_new import EntitySnapshot
+from app.services_new.entity_extractor import EntityExtractor, snapshot_insert_row
+
+
+# 正文过短，只做规则提取 (年龄/喜好/地点) 的章节
+SHORT_CONTENT = "王五今年二十岁。赵六喜欢喝酒。他们来到了落霞镇。"
+
+# 同时触发AI提取 (正文足够长) 与多类规则提取的章节
+LONG_CONTENT = (
+    "张三今年十八岁，是村里最年轻的猎户。李四喜欢吃红烧肉，每天都要去集市转一圈。"
+    "两人一起来到了青云山，山上云雾缭绕，传说有仙人居住。"
+) * 6
+
+
+class FakeAIService:
+    """返回固定提取结果的AI服务"""
+
+    async def generate_text(self, prompt: str, **kwargs):
+        return {"content": json.dumps([
+            {"type": "character", "name": "张三", "property": "identity", "value": "猎户",
+             "layer": "Intrinsic", "source_type": "Narrator", "quote": "是村里最年轻的猎户", "confidence": 0.9}
+        ], ensure_ascii=False)}
+
+
+@unittest.skipUnless(AIOSQLITE_AVAILABLE, "需要 aiosqlite")
+class BatchExtractSaveTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_mixed_ai_and_rule_snapshots_are_saved_together(self):
+        """AI快照与各类规则快照字段不同，应在同一次批量插入中全部保存 (规则快照在前、AI快照在后)"""
+        async with self.session_factory() as db:
+            chapters = [
+                Chapter(id="c1", project_id="p1", chapter_number=1, title="第一章", content=SHORT_CONTENT),
+                Chapter(id="c2", project_id="p1", chapter_number=2, title="第二章", content=LONG_CONTENT),
+            ]
+            db.add_all(chapters)
+            await db.commit()
+
+            extractor = EntityExtractor(ai_service=FakeAIService())
+            saved, errors = await extractor.batch_extract(chapters, db)
+
+            self.assertEqual(errors, [])
+            rows = (await db.execute(select(EntitySnapshot))).scalars().all()
+            self.assertEqual(saved, len(rows))
+            models = {row.ai_model for row in rows}
+            self.assertIn("rule_based", models)
+            self.assertTrue(models - {"rule_based"}, "AI提取的快照应一并保存")
+            properties = {row.property_name for row in rows}
+            self.assertTrue({"age", "likes"} <= properties)
+            for row in rows:
+                self.assertIsNotNone(row.id)
+                self.assertEqual(row.is_confirmed, "N")
+                self.assertIsNotNone(row.layer)
+
+    async def test_insert_rows_share_one_key_set(self):
+        """不同来源的快照字段补全后键集合一致，可直接用于 Core executemany"""
+        base = {
+            "project_id": "p1", "entity_type": "character", "entity_id": "char_张三",
+            "entity_name": "张三", "property_type": "string", "source_chapter_id": None,
+        }
+        snapshots = [
+            dict(base, property_name="age", property_value="18",
+                 source_context="张三今年18岁"),
+            dict(base, property_name="identity", property_value="猎户", layer="Appearance",
+                 source_type="Narrator", source_context=""),
+        ]
+        rows = [snapshot_insert_row(snapshot) for snapshot in snapshots]
+        self.assertEqual(rows[0].keys(), rows[1].keys())
+        self.assertEqual(rows[0]["layer"], "Intrinsic")
+        self.assertEqual(rows[1]["layer"], "Appearance")
+        self.assertNotEqual(rows[0]["id"], rows[1]["id"])
+
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(EntitySnapshot), rows)
+            count = len((await conn.execute(select(EntitySnapshot.id))).all())
+        self.assertEqual(count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()